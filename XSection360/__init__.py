@@ -22,6 +22,10 @@ To Use:
 6) Wait for XSection360 Render & Process to complete
         DO NOT OPEN OUTPUT FILE DURING RENDER PROCESS
         as this will cause an access error, crashing the script
+
+Optionally, click Export Snapshot to write the Output geometry and camera to an .npz
+snapshot; profiles can then be computed without Blender:
+        python -m XSection360 profile snapshot.npz -f=profile.png -x=90 -y=45
 """
 
 
@@ -35,12 +39,15 @@ bl_info = {
     "category": "Render"
 }
 
-from . import blender_gui
+# blender_gui is imported on registration only, so that the bpy-free modules
+# (and python -m XSection360) can be used outside Blender
 
 
 def register():
+    from . import blender_gui
     blender_gui.register()
 
 
 def unregister():
+    from . import blender_gui
     blender_gui.unregister()
@@ -0,0 +1,444 @@
+"""
+Standalone XSection360 command line, run in plain CPython (no Blender required)
+Profiles are computed from a geometry snapshot exported by the addon ("Export Snapshot")
+
+Example usage:
+
+python -m XSection360 profile snapshot.npz -f=profile.png -x=90 -y=45
+python -m XSection360 profile snapshot.npz -f=profile.png -x=90 -y=45 --engine=exact
+python -m XSection360 profile snapshot.npz -f=profile.png -x=90 -y=45 --engine=silhouette
+python -m XSection360 info snapshot.npz
+python -m XSection360 query snapshot.npz attitudes.csv -o=areas.csv --cache=xs360_cache.db
+python -m XSection360 voxels grid.npy -f=profile.png -x=90 -y=45 --voxel-size=0.05
+
+Render farm (see farm.py):
+
+python -m XSection360 coordinator -f=profile.png -x=90 -y=45 --port=8360
+python -m XSection360 worker http://host:8360 snapshot.npz
+
+Benchmark (see benchmark.py):
+
+python -m XSection360 bench --backends=raster,exact --json=bench.json
+"""
+
+import argparse
+import sys
+from time import time
+
+
+def parse_window(args):
+    """
+    Angular region of interest from --window argument (None if not given)
+    """
+    from .equirectangular import Window
+
+    return Window.parse(args.window) if args.window is not None else None
+
+
+def window_metadata(resolution, window):
+    """
+    Metadata recording sampled window (written next to output); None for full sphere profiles
+    """
+    if window is None:
+        return None
+    return {'resolution': list(resolution), 'window': window.to_dict()}
+
+
+def run_profile(args):
+    """
+    Compute profile image from geometry snapshot
+    Equivalent to background.run_background, using the software rasterizer (raster engine)
+    or exact projected areas (exact engine, no pixel quantization; silhouette engine, closed meshes)
+    """
+    from .processing import ProcessRaw
+    from .progress import GeneratorLength, ProgressBar
+    from .projection import pose_table
+    from .raster import coverage_count
+    from .snapshot import Snapshot
+    from .xstools import OutImage
+
+    snapshot = Snapshot.load(args.snapshot)
+    resolution = (args.x_resolution, args.y_resolution)
+    window = parse_window(args)
+    save_file = OutImage.modify_filename(args.save_file)
+
+    print(f'\n~~~ Running XSection360 (snapshot) ~~~\n( Snapshot: {args.snapshot}, Output: {save_file}\n'
+          f'Resolution: {resolution}, Render Res: {snapshot.render_res}\n')
+
+    poses = pose_table(resolution, window)
+    start = time()
+
+    if args.engine == 'exact':
+        from .exact import profile_areas
+
+        # exact union areas, across directions in process pool
+        directions = list(zip(poses['long'], poses['lat']))
+        areas = profile_areas(snapshot.triangles, directions, args.processes, cull_backfaces=not args.open_mesh)
+        result_raw = [area for area in ProgressBar(GeneratorLength(areas, len(directions)), desc="Rendering")]
+    elif args.engine == 'silhouette':
+        from .silhouette import profile_areas
+
+        # exact areas from silhouette edges only (closed meshes)
+        directions = list(zip(poses['long'], poses['lat']))
+        areas = profile_areas(snapshot.triangles, directions, args.processes, object_index=snapshot.object_index)
+        result_raw = [area for area in ProgressBar(GeneratorLength(areas, len(directions)), desc="Rendering")]
+    else:
+        # RENDER (rasterize)
+        result_raw = []
+        for pixel in ProgressBar(range(len(poses['long'])), desc="Rendering"):
+            result_raw.append(coverage_count(snapshot.triangles, poses['long'][pixel], poses['lat'][pixel],
+                                             snapshot.ortho_scale, snapshot.render_res))
+
+    print(f"\n Finished Rendering ({round(time() - start, 2)}s). Starting Processing...\n")
+
+    # PROCESS
+    for i in ProgressBar(ProcessRaw(result_raw, save_file, resolution, window_metadata(resolution, window), window=window), desc="Processing"):
+        pass
+
+
+def run_voxels(args):
+    """
+    Compute profile image from voxel occupancy grid (projected area in world units, see voxels.py)
+    """
+    from .processing import ProcessRaw
+    from .progress import GeneratorLength, ProgressBar
+    from .projection import pose_table
+    from .voxels import load_occupancy, profile_areas
+    from .xstools import OutImage
+
+    occupancy = load_occupancy(args.grid, args.threshold)
+    resolution = (args.x_resolution, args.y_resolution)
+    window = parse_window(args)
+    save_file = OutImage.modify_filename(args.save_file)
+
+    print(f'\n~~~ Running XSection360 (voxels) ~~~\n( Grid: {args.grid} {occupancy.shape}, Output: {save_file}\n'
+          f'Resolution: {resolution}, Occupied voxels: {int(occupancy.sum())}\n')
+
+    poses = pose_table(resolution, window)
+    directions = list(zip(poses['long'], poses['lat']))
+    start = time()
+
+    areas = profile_areas(occupancy, directions, args.voxel_size, args.origin, args.samples, args.cell_size,
+                          args.processes)
+    result_raw = [area for area in ProgressBar(GeneratorLength(areas, len(directions)), desc="Rendering")]
+
+    print(f"\n Finished Rendering ({round(time() - start, 2)}s). Starting Processing...\n")
+
+    # PROCESS
+    for i in ProgressBar(ProcessRaw(result_raw, save_file, resolution, window_metadata(resolution, window),
+                                    window=window), desc="Processing"):
+        pass
+
+
+def run_query(args):
+    """
+    Evaluate raw values at arbitrary directions from geometry snapshot, memoized in result cache (see query.py)
+    """
+    from functools import partial
+    from .cache import ResultCache
+    from .query import load_directions, query_directions, save_results
+    from .snapshot import Snapshot
+
+    snapshot = Snapshot.load(args.snapshot)
+    directions = load_directions(args.directions)
+
+    pool = None
+    if args.engine == 'exact':
+        from .exact import profile_areas, triangle_pool
+
+        # one pool for all batches, triangles loaded once per worker: start-up would dominate sparse queries
+        pool = triangle_pool(snapshot.triangles, args.processes)
+
+        def evaluate_batch(batch):
+            return list(profile_areas(snapshot.triangles, batch, cull_backfaces=not args.open_mesh, pool=pool))
+    elif args.engine == 'silhouette':
+        from .silhouette import SilhouetteIndex, direction_areas
+
+        index = SilhouetteIndex(snapshot.triangles, snapshot.object_index)
+
+        def evaluate_batch(batch):
+            return direction_areas(index, batch)
+    else:
+        from .raster import coverage_count
+
+        def evaluate_batch(batch):
+            count = partial(coverage_count, snapshot.triangles, ortho_scale=snapshot.ortho_scale,
+                            render_res=snapshot.render_res)
+            return [count(long=long, lat=lat) for long, lat in batch]
+
+    cache, cache_key = None, None
+    if args.cache_file is not None:
+        cache = ResultCache(args.cache_file, args.cache_size)
+        engine_settings = {'engine': args.engine, 'open_mesh': args.open_mesh}
+        cache_key = ResultCache.make_key(snapshot.geometry_hash, snapshot.ortho_scale, snapshot.render_res,
+                                         engine_settings)
+
+    start = time()
+    try:
+        values = query_directions(evaluate_batch, directions, cache, cache_key, args.batch_size, args.quantum)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    print(f"\n Finished ({round(time() - start, 2)}s)")
+
+    if cache is not None:
+        cache.close()
+        print(cache.summary())
+
+    if args.output is None:
+        for (long, lat), value in zip(directions, values):
+            print(f'{long:.6f}, {lat:.6f}: {value}')
+    else:
+        save_results(args.output, directions, values)
+        print(f'Results written to {args.output}')
+
+
+def run_coordinator(args):
+    """
+    Serve profile job to render farm workers; write profile once all chunks are complete
+    """
+    from .farm import Coordinator, JobQueue
+    from .processing import ProcessRaw
+    from .progress import ProgressBar
+    from .xstools import OutImage
+
+    resolution = (args.x_resolution, args.y_resolution)
+    window = parse_window(args)
+    save_file = OutImage.modify_filename(args.save_file)
+
+    queue = JobQueue(resolution, args.chunk_size, args.lease_time, args.max_attempts, window=window, key=args.key)
+    coordinator = Coordinator(queue, args.host, args.port)
+    coordinator.start()
+
+    print(f'\n~~~ XSection360 Coordinator ~~~\n( Workers connect to: {coordinator.url}, Output: {save_file}\n'
+          f'Resolution: {resolution}, Chunks: {len(queue.chunks)}\n')
+
+    result_raw = coordinator.wait()
+
+    print("\n Finished Rendering. Starting Processing...\n")
+
+    for i in ProgressBar(ProcessRaw(result_raw, save_file, resolution, window_metadata(resolution, window), window=window), desc="Processing"):
+        pass
+
+
+def run_worker(args):
+    """
+    Render farm worker: compute leased chunks from geometry snapshot
+    """
+    from functools import partial
+    from .cache import ResultCache
+    from .farm import Worker
+    from .raster import coverage_count
+    from .snapshot import Snapshot
+
+    snapshot = Snapshot.load(args.snapshot)
+    evaluate = partial(coverage_count, snapshot.triangles,
+                       ortho_scale=snapshot.ortho_scale, render_res=snapshot.render_res)
+
+    # same key as raster engine queries of this snapshot
+    key = ResultCache.make_key(snapshot.geometry_hash, snapshot.ortho_scale, snapshot.render_res,
+                               {'engine': 'raster', 'open_mesh': False})
+
+    worker = Worker(args.url, evaluate, key=key)
+    completed = worker.run()
+
+    print(f'Worker {worker.worker_id} finished: {completed} chunks completed')
+
+
+def run_info(args):
+    """
+    Print snapshot summary
+    """
+    from .snapshot import Snapshot
+
+    snapshot = Snapshot.load(args.snapshot)
+
+    print(f'Snapshot: {args.snapshot}')
+    print(f'Content hash: {snapshot.content_hash}')
+    print(f'Triangles: {len(snapshot.triangles)}, Objects: {", ".join(snapshot.object_names)}')
+    print(f'Ortho scale: {snapshot.ortho_scale}, Render Res: {snapshot.render_res}, '
+          f'Camera distance: {snapshot.cam_distance}')
+
+
+def run_bench(args):
+    """
+    Run accuracy-versus-cost benchmark on analytic primitives (see benchmark.py)
+    """
+    import json
+    from .benchmark import BACKENDS, TABLE_HEADER, run_benchmark
+
+    backends = args.backends.split(',')
+    for backend in backends:
+        if backend not in BACKENDS:
+            raise Exception(f'Unknown backend "{backend}"; available: {", ".join(BACKENDS)}')
+
+    render_resolutions = [int(r) for r in args.render_res.split(',')]
+    profile_resolutions = [tuple(int(r) for r in p.split('x')) for p in args.profile_res.split(',')]
+    names = args.primitives.split(',') if args.primitives else None
+
+    print(TABLE_HEADER)
+    results = run_benchmark(backends, render_resolutions, profile_resolutions, names, args.segments)
+
+    if args.json_file is not None:
+        with open(args.json_file, 'w') as file:
+            json.dump(results, file, indent=2)
+        print(f'\nResults written to {args.json_file}')
+
+
+WINDOW_HELP = ("Only sample angular window, at output resolution: lonlat:LONG_MIN:LONG_MAX:LAT_MIN:LAT_MAX "
+               "or alphabeta:ALPHA_MIN:ALPHA_MAX:BETA_MIN:BETA_MAX (image x axis: longitude / beta)")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m XSection360', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command')
+
+    # profile
+    profile = commands.add_parser('profile', help="Compute profile image from geometry snapshot")
+    profile.add_argument("snapshot", help="Geometry snapshot (.npz)")
+    profile.add_argument(
+        "-f", "--file", dest="save_file", metavar='FILE', required=True,
+        help="Save the generated file to the specified path",
+    )
+    profile.add_argument(
+        "-x", "--xres", dest="x_resolution", type=int, required=True,
+        help="Horizontal (X) resolution of output image (different to render resolution)",
+    )
+    profile.add_argument(
+        "-y", "--yres", dest="y_resolution", type=int, required=True,
+        help="Vertical (Y) resolution of output image (different to render resolution)",
+    )
+    profile.add_argument(
+        "-e", "--engine", choices=('raster', 'exact', 'silhouette'), default='raster',
+        help="raster: count covered pixels at snapshot render resolution (as Blender render); "
+             "exact: exact projected area (world units), no pixel quantization; "
+             "silhouette: exact projected area from silhouette edges (closed meshes; fast on large meshes)",
+    )
+    profile.add_argument("--window", metavar='MODE:MIN:MAX:MIN:MAX', default=None, help=WINDOW_HELP)
+    profile.add_argument("--processes", type=int, default=None,
+                         help="Worker processes for exact & silhouette engines (default: CPU count)")
+    profile.add_argument("--open-mesh", dest="open_mesh", action='store_true',
+                         help="Exact engine: project back faces too (needed for meshes that are not closed)")
+    profile.set_defaults(func=run_profile)
+
+    # voxels
+    voxels = commands.add_parser('voxels', help="Compute profile image from voxel occupancy grid (.npy)")
+    voxels.add_argument("grid", help="3D occupancy array (.npy, or .npz with 'occupancy' array), indexed (x, y, z)")
+    voxels.add_argument(
+        "-f", "--file", dest="save_file", metavar='FILE', required=True,
+        help="Save the generated file to the specified path",
+    )
+    voxels.add_argument(
+        "-x", "--xres", dest="x_resolution", type=int, required=True,
+        help="Horizontal (X) resolution of output image",
+    )
+    voxels.add_argument(
+        "-y", "--yres", dest="y_resolution", type=int, required=True,
+        help="Vertical (Y) resolution of output image",
+    )
+    voxels.add_argument("--voxel-size", dest="voxel_size", type=float, default=1.0,
+                        help="Voxel edge length (world units)")
+    voxels.add_argument("--origin", type=float, nargs=3, default=None, metavar=('X', 'Y', 'Z'),
+                        help="World position of voxel (0, 0, 0) centre (default: grid centred on origin)")
+    voxels.add_argument("--threshold", type=float, default=0.5,
+                        help="Values above this are occupied (non-boolean grids)")
+    voxels.add_argument("--samples", type=int, default=2, help="Sample points per voxel axis")
+    voxels.add_argument("--cell-size", dest="cell_size", type=float, default=None,
+                        help="Projection grid cell size (default: voxel size / samples)")
+    voxels.add_argument("--window", metavar='MODE:MIN:MAX:MIN:MAX', default=None, help=WINDOW_HELP)
+    voxels.add_argument("--processes", type=int, default=None, help="Worker processes (default: CPU count)")
+    voxels.set_defaults(func=run_voxels)
+
+    # query
+    query = commands.add_parser('query', help="Raw values at arbitrary directions (memoized), from geometry snapshot")
+    query.add_argument("snapshot", help="Geometry snapshot (.npz)")
+    query.add_argument("directions", help="Directions file (.npy or CSV): long, lat columns, or x, y, z vectors "
+                                          "(pointing from model towards camera)")
+    query.add_argument("-o", "--output", metavar='FILE', default=None,
+                       help="Write results to FILE (.npy: values, otherwise CSV of long, lat, value); default: print")
+    query.add_argument("-e", "--engine", choices=('raster', 'exact', 'silhouette'), default='raster',
+                       help="raster: covered pixel count at snapshot render resolution; exact: projected area; "
+                            "silhouette: projected area from silhouette edges (closed meshes)")
+    query.add_argument("-c", "--cache", dest="cache_file", metavar='FILE', default=None,
+                       help="Result cache file; directions evaluated before (same geometry & settings) are reused")
+    query.add_argument("--cache-size", dest="cache_size", type=int, default=1000000,
+                       help="Maximum number of samples kept in result cache")
+    query.add_argument("--quantum", type=float, default=None,
+                       help="Memoization angle step (degrees): directions are snapped to multiples of it")
+    query.add_argument("--batch-size", dest="batch_size", type=int, default=64, help="Directions per batch")
+    query.add_argument("--processes", type=int, default=None,
+                       help="Worker processes for exact engine (default: CPU count)")
+    query.add_argument("--open-mesh", dest="open_mesh", action='store_true',
+                       help="Exact engine: project back faces too (needed for meshes that are not closed)")
+    query.set_defaults(func=run_query)
+
+    # coordinator
+    coordinator = commands.add_parser('coordinator', help="Serve profile job to render farm workers")
+    coordinator.add_argument(
+        "-f", "--file", dest="save_file", metavar='FILE', required=True,
+        help="Save the generated file to the specified path",
+    )
+    coordinator.add_argument(
+        "-x", "--xres", dest="x_resolution", type=int, required=True,
+        help="Horizontal (X) resolution of output image (different to render resolution)",
+    )
+    coordinator.add_argument(
+        "-y", "--yres", dest="y_resolution", type=int, required=True,
+        help="Vertical (Y) resolution of output image (different to render resolution)",
+    )
+    coordinator.add_argument("--window", metavar='MODE:MIN:MAX:MIN:MAX', default=None, help=WINDOW_HELP)
+    coordinator.add_argument("--host", default='0.0.0.0', help="Interface to listen on")
+    coordinator.add_argument("--port", type=int, default=8360, help="Port to listen on")
+    coordinator.add_argument("--chunk-size", dest="chunk_size", type=int, default=16,
+                             help="Profile pixels per chunk")
+    coordinator.add_argument("--lease-time", dest="lease_time", type=float, default=60,
+                             help="Seconds a chunk lease lasts without worker heartbeat")
+    coordinator.add_argument("--max-attempts", dest="max_attempts", type=int, default=3,
+                             help="Failed attempts (or expired leases) per chunk before the job is aborted")
+    coordinator.add_argument("--key", default=None,
+                             help="Cache key of geometry & render settings workers must match "
+                                  "(default: key of the first worker)")
+    coordinator.set_defaults(func=run_coordinator)
+
+    # worker
+    worker = commands.add_parser('worker', help="Render farm worker (snapshot based, no Blender)")
+    worker.add_argument("url", help="Coordinator URL, e.g. http://host:8360")
+    worker.add_argument("snapshot", help="Geometry snapshot (.npz)")
+    worker.set_defaults(func=run_worker)
+
+    # info
+    info = commands.add_parser('info', help="Print geometry snapshot summary")
+    info.add_argument("snapshot", help="Geometry snapshot (.npz)")
+    info.set_defaults(func=run_info)
+
+    # bench
+    bench = commands.add_parser('bench', help="Accuracy-versus-cost benchmark on analytic primitives")
+    bench.add_argument("--backends", default='raster,exact',
+                       help="Comma separated backends: raster, exact, silhouette, blender (inside Blender only)")
+    bench.add_argument("--render-res", dest="render_res", default='64,128,256',
+                       help="Comma separated (square) render resolutions")
+    bench.add_argument("--profile-res", dest="profile_res", default='8x4,16x8',
+                       help="Comma separated profile resolutions, XxY")
+    bench.add_argument("--primitives", default=None,
+                       help="Comma separated primitives: sphere, cube, cylinder, ellipsoid, two_boxes (default: all)")
+    bench.add_argument("--segments", type=int, default=96, help="Tessellation segments of curved primitives")
+    bench.add_argument("--json", dest="json_file", metavar='FILE', default=None, help="Write results to JSON file")
+    bench.set_defaults(func=run_bench)
+
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.command is None:
+        parser.print_help()
+        return
+
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
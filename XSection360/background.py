@@ -1,12 +1,37 @@
 """
 Blender background script in which XSection360 processing is performed
-Outputs a temporary txt file containing raw drag profile data
-(No. white pixels rendered for each profile pixel)
+Renders one view per profile pixel; raw values (total lightness: No. white pixels rendered
+for each profile pixel) are normalized into the profile image (png), written with a .json
+metadata file holding the run settings and raw value range
 
 Called by "Run" in XS360 Blender Addon
 Example usage:
 
 blender example.blend --background --python background.py -- -s="Scene" -f=temp.txt -x=255 -y=255 -d=15
+Optionally reuse previously rendered directions: -c=xs360_cache.db
+Only sample an angular window (angle of attack & sideslip, or longitude & latitude), at its own resolution:
+
+blender example.blend --background --python background.py -- -s="Scene" -f=roi.png -x=80 -y=120 -d=15 --window=alphabeta:-30:30:-20:20
+
+Re-render only the silhouette edge tiles of each view at 4x render resolution (see supersample.py):
+
+blender example.blend --background --python background.py -- -s="Scene" -f=out.png -x=90 -y=45 -d=15 --supersample=4
+
+Profile sequence (one profile per frame, or per shape key with --shape-keys), written to .npz:
+
+blender example.blend --background --python background.py -- -s="Scene" -f=seq.npz -x=90 -y=45 -d=15 --frames=1:48
+
+Sparse direction query (see query.py), results written to CSV (or .npy):
+
+blender example.blend --background --python background.py -- -s="Scene" -d=15 --query=attitudes.csv -f=areas.csv
+
+Persistent daemon, keeping the scene loaded for jobs sent over a Unix socket (see daemon.py):
+
+blender example.blend --background --python background.py -- -s="Scene" -d=15 --daemon=/tmp/xs360.sock
+
+Render farm worker (see farm.py):
+
+blender example.blend --background --python background.py -- -s="Scene" -d=15 --worker=http://host:8360
 """
 
 import os
@@ -48,27 +73,900 @@ class Suppressor:
         os.close(self.old)
 
 
-def start_message(scene_name, save_file, resolution, render_res):
+def start_message(scene_name, save_file, resolution, render_res, window=None):
     """
     Generates console message displayed upon running process.
     :param scene_name: Name of target scene
     :param save_file: Output (drag profile) image file
     :param resolution: Output (drag profile) temp file (txt)
     :param render_res: Render resolution for each drag profile pixel
+    :param window: Angular region of interest; if None, full sphere
     :return: Full message (str)
     """
     message = f'\n~~~ Running XSection360 ~~~\n( Scene: {scene_name}, Output: {save_file}\n'
     message += f'Resolution: {resolution}, Render Res: {render_res}\n'
+    if window is not None:
+        message += f'Window: {window}\n'
     return message
 
 
-def run_background(scene_name, save_file, resolution: tuple, cam_distance):
+def render_view(camera, cam_distance, long, lat, suppressor, border=None):
+    """
+    Render single profile direction to scene render filepath
+    :param camera: Scene camera
+    :param cam_distance: Distance of camera from center (sphere radius)
+    :param long: Projected longitude
+    :param lat: Projected latitude
+    :param suppressor: Suppressor for render console output
+    :param border: Render border (min_x, max_x, min_y, max_y) containing geometry; if None, full frame
+    """
+    from XSection360 import xstools
+
+    # apply to camera
+    xstools.transform_camera(camera, cam_distance, long, lat)
+
+    # only render region which can contain geometry
+    if border is not None:
+        xstools.set_render_border(bpy.context.scene, border)
+
+    # render (suppress render console output)
+    suppressor.enter()
+    bpy.ops.render.render(write_still=True)
+    suppressor.exit()
+
+
+def render_direction(camera, cam_distance, long, lat, render_file, suppressor, border=None, components=False,
+                     reduction=None, supersample=None, phases=None):
+    """
+    Render single profile direction and process result
+    :param camera: Scene camera
+    :param cam_distance: Distance of camera from center (sphere radius)
+    :param long: Projected longitude
+    :param lat: Projected latitude
+    :param render_file: File the render is written to (scene.render.filepath)
+    :param suppressor: Suppressor for render console output
+    :param border: Render border (min_x, max_x, min_y, max_y) containing geometry; if None, full frame
+    :param components: Scene set up with component ID colours (setup.assign_component_materials)
+    :param reduction: Reduction (compositor reduction tree); if None, full render read back
+    :param supersample: Supersample (edge tiles re-rendered at higher resolution); if None, single render
+    :param phases: Phases (rotating parts averaged over rotation phase); if None, current frame only
+    :return: Raw profile value (total lightness)
+    """
+    import numpy as np
+    from XSection360.processing import ProcessRender
+
+    if phases is not None:
+        return float(phases.average(lambda: render_direction(camera, cam_distance, long, lat, render_file, suppressor,
+                                                             border, components, reduction, supersample)))
+
+    if supersample is not None and not components:
+        return supersample.render(camera, cam_distance, long, lat, render_file, suppressor, border)
+
+    if reduction is not None and reduction.active and not components:
+        return reduction.render(camera, cam_distance, long, lat, render_file, suppressor)
+
+    render_view(camera, cam_distance, long, lat, suppressor, border)
+
+    pixels = ProcessRender.load_pixels(render_file)
+    check_frame_edges(pixels, camera, long, lat, border)
+
+    # ID colour render: count pixels of any component
+    if components:
+        return float(np.count_nonzero(ProcessRender.component_ids(pixels)))
+
+    # process render result
+    return ProcessRender.lightness(pixels)
+
+
+class Reduction:
+    # largest relative difference from full readback accepted when verifying first view
+    TOLERANCE = 1e-4
+    # smallest tile grid (per axis) whose outer tiles leave interior tiles to screen frame edges with
+    MIN_EDGE_TILES = 3
+
+    def __init__(self, scene, tiles):
+        """
+        Compositor reduction of renders (see setup.build_reduction_tree): only the reduced tile grid is written
+        and read back, so per-view transfer cost does not grow with render resolution
+        Render borders are not used for reduced renders (cropped render sizes do not halve exactly)
+        :param scene: Rendered scene
+        :param tiles: Minimum tile grid size per axis
+        """
+        from XSection360.setup import build_reduction_tree
+
+        self.scene = scene
+        self.tiles = tiles
+        self.size = build_reduction_tree(scene, tiles)  # rebuilt for current render resolution
+        self.active = self.size is not None
+        self.verified = False
+        self.frame_check = True  # views covering outer tiles are read in full (from_scene)
+        self.edge_renders = 0
+
+    @staticmethod
+    def from_scene(scene, frame_check=True):
+        """
+        :param frame_check: Renders must be checked for geometry on the frame edge: reduced views touching the
+            outer tiles are read in full (check_frame_edges); needs a tile grid of at least MIN_EDGE_TILES
+        :return: Reduction, or None if scene set up without reduction (or render resolution cannot be reduced)
+        """
+        from XSection360.setup import get_reduction
+
+        tiles = get_reduction(scene)
+        if tiles is None:
+            return None
+
+        reduction = Reduction(scene, tiles)
+        if not reduction.active:
+            print('Compositor reduction unavailable: render resolution not divisible by 2; reading full renders')
+            return None
+
+        if frame_check and min(reduction.size) < Reduction.MIN_EDGE_TILES:
+            print(f'Compositor reduction disabled: {reduction.size[0]}x{reduction.size[1]} tile grid cannot show '
+                  f'geometry on the frame edge (needs {Reduction.MIN_EDGE_TILES} tiles per axis, or '
+                  f'--skip-frame-check); reading full renders')
+            return None
+
+        reduction.frame_check = frame_check
+        print(f'Compositor reduction: renders averaged to {reduction.size[0]}x{reduction.size[1]} tiles')
+        return reduction
+
+    def render(self, camera, cam_distance, long, lat, render_file, suppressor):
+        """
+        Render direction through reduction tree
+        First view is also read in full; reduction is switched off if they differ (e.g. compositor version)
+        Tile averages only show whether any pixel of a tile is covered, so views covering an outer tile are
+        read in full, where frame edge pixels are checked (check_frame_edges)
+        :return: Raw profile value (total lightness)
+        """
+        from XSection360 import xstools
+        from XSection360.processing import ProcessRender
+
+        render = self.scene.render
+        settings = render.image_settings
+        reduced_file = os.path.splitext(render_file)[0] + '_reduced.exr'
+
+        # float output: tile averages must not be quantized
+        previous = render.filepath, settings.file_format, settings.color_depth, render.use_compositing
+        render.filepath = reduced_file
+        settings.file_format = 'OPEN_EXR'
+        settings.color_depth = '32'
+        render.use_compositing = True
+
+        xstools.set_render_border(self.scene, None)
+        try:
+            render_view(camera, cam_distance, long, lat, suppressor)
+        finally:
+            render.filepath, settings.file_format, settings.color_depth, render.use_compositing = previous
+
+        pixels = ProcessRender.load_pixels(reduced_file)
+        os.remove(reduced_file)
+
+        # outer tiles all zero: no pixel on the frame edge can be covered
+        if self.frame_check and len(ProcessRender.frame_edge_pixels(pixels)):
+            self.edge_renders += 1
+            return render_direction(camera, cam_distance, long, lat, render_file, suppressor)
+
+        # sum of tile averages, scaled to render pixels
+        res_x, res_y = xstools.get_render_resolution(self.scene)
+        value = ProcessRender.lightness(pixels) * (res_x * res_y) / (self.size[0] * self.size[1])
+
+        if not self.verified:
+            self.verified = True
+            full = render_direction(camera, cam_distance, long, lat, render_file, suppressor)
+
+            if abs(value - full) > self.TOLERANCE * max(full, 1):
+                print(f'Compositor reduction disabled: reduced value {value} differs from full render {full}')
+                self.active = False
+                return full
+
+        return value
+
+
+class Supersample:
+    def __init__(self, scene, factor, tile=16, max_renders=16):
+        """
+        Edge-adaptive supersampling of total-area views (see supersample.py)
+        :param scene: Rendered scene
+        :param factor: Resolution factor of edge tile renders
+        :param tile: Tile size (base render pixels)
+        :param max_renders: Largest number of edge renders per view (beyond it, one border around all edges)
+        """
+        self.scene = scene
+        self.factor = factor
+        self.tile = tile
+        self.max_renders = max_renders
+
+        # rendered pixels (base + edge renders, in render pixels), against full supersampled renders
+        self.views = 0
+        self.renders = 0
+        self.pixels = 0
+        self.full_pixels = 0
+
+    def render(self, camera, cam_distance, long, lat, render_file, suppressor, border=None):
+        """
+        Render direction at base resolution, then re-render its edge tiles at factor x resolution
+        :param border: Render border of base render; if None, full frame
+        :return: Raw profile value (total lightness, base render pixels)
+        """
+        from XSection360 import xstools
+        from XSection360.processing import ProcessRender
+        from XSection360.supersample import edge_rects, rect_border, rect_pixels, refined_area
+
+        render = self.scene.render
+        render_res = xstools.get_render_resolution(self.scene)
+
+        render_view(camera, cam_distance, long, lat, suppressor, border)
+        pixels = ProcessRender.load_pixels(render_file)
+        check_frame_edges(pixels, camera, long, lat, border)
+
+        weights = pixels[..., :3].mean(axis=-1)
+        offset = (0, 0)
+        if border is not None:
+            offset = int(border[0] * render_res[0]), int(border[2] * render_res[1])
+
+        rects = edge_rects(weights, self.tile, offset, self.max_renders)
+
+        values = []
+        render.resolution_x, render.resolution_y = (r * self.factor for r in render_res)
+        try:
+            for rect in rects:
+                render_view(camera, cam_distance, long, lat, suppressor, rect_border(rect, render_res, self.factor))
+                values.append(ProcessRender.lightness(ProcessRender.load_pixels(render_file)))
+        finally:
+            render.resolution_x, render.resolution_y = render_res
+            xstools.set_render_border(self.scene, border)
+
+        self.views += 1
+        self.renders += len(rects)
+        self.pixels += weights.size + rect_pixels(rects) * self.factor ** 2
+        self.full_pixels += weights.size * self.factor ** 2
+
+        return refined_area(weights, rects, values, self.factor, offset)
+
+    def summary(self):
+        """
+        :return: Metadata dict: settings, edge renders per view, fraction of supersampled pixels rendered
+        """
+        return {
+            'factor': self.factor,
+            'tile': self.tile,
+            'renders_per_view': self.renders / max(self.views, 1),
+            'pixel_fraction': self.pixels / max(self.full_pixels, 1),
+        }
+
+
+class Phases:
+    def __init__(self, scene, count):
+        """
+        Average views over rotation phase of rotating parts (setup.setup_rotors, method PHASES): rotating parts
+        turn once per frame, so each view is rendered at [count] evenly spaced subframes
+        :param scene: Rendered scene
+        :param count: Renders per view
+        """
+        self.scene = scene
+        self.count = count
+
+    @staticmethod
+    def from_collection(scene, collection):
+        """
+        :param collection: Setup Output collection
+        :return: Phases, or None if setup without rotating parts (or with motion blur averaging)
+        """
+        from XSection360.setup import get_rotors
+
+        rotors = get_rotors(collection)
+        if rotors is None or rotors['method'] != 'PHASES':
+            return None
+
+        print(f'Rotating parts ({", ".join(rotors["objects"])}): {rotors["phases"]} phases per view\n')
+        return Phases(scene, rotors['phases'])
+
+    def average(self, render):
+        """
+        :param render: Function () -> value (number or array) rendering current view
+        :return: Mean value over phases
+        """
+        import numpy as np
+
+        frame = self.scene.frame_current
+        values = []
+        try:
+            for k in range(self.count):
+                self.scene.frame_set(frame, subframe=k / self.count)
+                values.append(render())
+        finally:
+            self.scene.frame_set(frame)
+
+        return np.mean(values, axis=0)
+
+
+# spread of directions rendered during resolution calibration (long, lat)
+CALIBRATION_PROBES = [(0, 0), (90, 0), (0, 89), (45, 30), (-135, -30), (150, 60)]
+
+
+def calibrate_resolution(scene, camera, cam_distance, target_error, render_file, suppressor, directions,
+                         max_res=4096, probes=CALIBRATION_PROBES, components=False):
+    """
+    Find smallest render resolution meeting relative area error target
+    Probe directions are rendered at doubling resolutions (keeping aspect ratio); the quantization error
+    is estimated from silhouette boundary pixels (ProcessRender.quantization_error).
+    The chosen resolution is applied to the scene.
+    :param scene: Target scene
+    :param camera: Scene camera
+    :param cam_distance: Distance of camera from center (sphere radius)
+    :param target_error: Maximum relative area error (e.g. 0.01 for 1%)
+    :param render_file: File the render is written to (scene.render.filepath)
+    :param suppressor: Suppressor for render console output
+    :param directions: Profile directions (for predicted run cost)
+    :param max_res: Largest render resolution tried (longer side)
+    :param probes: Probe directions (long, lat)
+    :param components: Scene set up with component ID colours (coverage is any non-zero ID)
+    :return: Calibration metadata dict
+    """
+    from XSection360.processing import ProcessRender
+
+    res_x, res_y = scene.render.resolution_x, scene.render.resolution_y
+    aspect = res_y / res_x
+
+    # doubling resolutions (longer side), up to max_res
+    sides = [64]
+    while sides[-1] < max_res:
+        sides.append(min(sides[-1] * 2, max_res))
+
+    steps = []
+    print(f'Calibrating render resolution (target error {target_error * 100}%)...')
+
+    for side in sides:
+        if aspect <= 1:
+            res = side, max(1, round(side * aspect))
+        else:
+            res = max(1, round(side / aspect)), side
+        scene.render.resolution_x, scene.render.resolution_y = res
+
+        errors = []
+        start = time()
+        for long, lat in probes:
+            render_view(camera, cam_distance, long, lat, suppressor)
+            pixels = ProcessRender.load_pixels(render_file)
+            if components:
+                mask = ProcessRender.component_ids(pixels) > 0
+            else:
+                mask = ProcessRender.get_mask(pixels)
+            errors.append(ProcessRender.quantization_error(mask))
+        seconds_per_view = (time() - start) / len(probes)
+
+        step = {'render_res': list(res), 'error': max(errors), 'seconds_per_view': seconds_per_view}
+        steps.append(step)
+        print(f'  {res}: estimated error {round(step["error"] * 100, 3)}%, {round(seconds_per_view, 3)}s per view')
+
+        if step['error'] <= target_error:
+            break
+    else:
+        print(f'  Target error not reached at maximum resolution {max_res}')
+
+    chosen = steps[-1]
+    scene.render.resolution_x, scene.render.resolution_y = chosen['render_res']
+
+    calibration = {
+        'target_error': target_error,
+        'render_res': chosen['render_res'],
+        'predicted_error': chosen['error'],
+        'predicted_seconds': chosen['seconds_per_view'] * len(directions),
+        'steps': steps,
+    }
+    print(f'Render resolution set to {tuple(chosen["render_res"])}; '
+          f'predicted run time {round(calibration["predicted_seconds"])}s\n')
+
+    return calibration
+
+
+def scene_cache_key(scene, camera, render_res, supersample=None):
+    """
+    Create result cache key for scene: hash of evaluated Output geometry, camera and render settings
+    :param scene: Target scene
+    :param camera: Scene camera (in setup Output collection)
+    :param render_res: Render resolution
+    :param supersample: Supersample used for renders; if None, single renders
+    :return: Cache key string
+    """
+    from XSection360.cache import ResultCache
+    from XSection360.snapshot import collection_triangles, geometry_hash
+
+    # setup places camera in Output collection
+    depsgraph = scene.view_layers[0].depsgraph
+    depsgraph.update()
+    triangles, _, _ = collection_triangles(camera.users_collection[0], depsgraph)
+
+    settings = engine_settings(scene)
+    if supersample is not None:
+        settings['supersample'] = [supersample.factor, supersample.tile]
+
+    return ResultCache.make_key(geometry_hash(triangles), camera.data.ortho_scale, render_res, settings)
+
+
+def engine_settings(scene):
+    """
+    Render settings affecting rendered results (part of cache keys)
+    """
+    from XSection360.setup import get_rotors
+
+    settings = {
+        'engine': scene.render.engine,
+        'samples': scene.eevee.taa_render_samples,
+        'filter_size': scene.render.filter_size,
+        'view_transform': scene.view_settings.view_transform,
+        'resolution_percentage': scene.render.resolution_percentage,
+    }
+
+    # phase averaging of rotating parts
+    rotors = get_rotors(scene.camera.users_collection[0]) if scene.camera is not None else None
+    if rotors is not None:
+        settings['rotors'] = rotors
+        settings['motion_blur'] = [scene.eevee.use_motion_blur, scene.eevee.motion_blur_shutter]
+
+    return settings
+
+
+def profile_directions(resolution: tuple, window=None):
+    """
+    Calculate projected longitude & latitude of each profile pixel
+    :param resolution: Output image resolution
+    :param window: Angular region of interest (equirectangular.Window); if None, full sphere
+    :return: List of (long, lat) tuples; start bottom left, go right
+    """
+    from XSection360 import xstools
+    from XSection360.equirectangular import Equirectangular
+
+    if window is not None:
+        long, lat = window.grid_to_spherical(resolution)
+        return [(float(lo), float(la)) for lo, la in zip(long, lat)]
+
+    res_x, res_y = resolution
+
+    return [
+        Equirectangular.Pixel.coord_to_spherical(xstools.OutImage.pixel_to_coord(pixel, res_x), resolution)
+        for pixel in range(xstools.product(resolution))
+    ]
+
+
+def direction_borders(scene, camera, directions, render_res):
+    """
+    Precompute render border for each direction from projected Output bounding boxes
+    :param scene: Target scene
+    :param camera: Scene camera (in setup Output collection)
+    :param directions: List of (long, lat) tuples
+    :param render_res: Render resolution
+    :return: Array (N, 4) of borders (see projection.render_borders)
+    """
+    import numpy as np
+    from XSection360 import xstools
+    from XSection360.projection import border_fraction, render_borders
+
+    depsgraph = scene.view_layers[0].depsgraph
+    hull = xstools.collection_hull_points(camera.users_collection[0], depsgraph)
+
+    long, lat = np.array(directions, dtype=np.float64).reshape(-1, 2).T
+    borders = render_borders(hull, long, lat, camera.data.ortho_scale, render_res)
+
+    print(f'Auto render border: {round(100 * border_fraction(borders), 1)}% of frame pixels rendered on average\n')
+
+    return borders
+
+
+class Cancelled(Exception):
+    def __init__(self, result_raw, moments, components=None):
+        """
+        Raised when job is cancelled (cancel file created); carries partial results
+        :param result_raw: Raw profile values; None where not rendered
+        :param moments: Moment channels (or None), as result_raw
+        :param components: Component pixel counts (or None), as result_raw
+        """
+        super().__init__("XSection360 job cancelled")
+        self.result_raw = result_raw
+        self.moments = moments
+        self.components = components
+
+
+class FrameClipped(Exception):
+    def __init__(self, directions, suggested_scale, pixels=None):
+        """
+        Raised when geometry extends outside the camera frame (profile values would be too small)
+        :param directions: Offending directions (long, lat)
+        :param suggested_scale: Camera ortho scale keeping geometry in frame
+        :param pixels: Covered frame edge pixels (x, y) found in render; None for pre-flight check
+        """
+        listed = ', '.join(f'({long:.1f}, {lat:.1f})' for long, lat in directions[:10])
+        if len(directions) > 10:
+            listed += f' ... ({len(directions)} total)'
+
+        message = f'Geometry outside camera frame in direction(s) {listed}'
+        if pixels is not None:
+            message += f'; {len(pixels)} frame edge pixels covered, e.g. {[tuple(p) for p in pixels[:5].tolist()]}'
+        message += f'. Suggested camera ortho scale: {suggested_scale:.4g}'
+
+        super().__init__(message)
+        self.directions = directions
+        self.suggested_scale = suggested_scale
+        self.pixels = pixels
+
+
+# rotation phases sampled by frame check (setup.setup_rotors): extents between samples are underestimated by < 2%
+ROTOR_CHECK_PHASES = 16
+
+
+def frame_requirements(scene, camera, directions, render_res):
+    """
+    Ortho scale needed to keep Output geometry in frame, for each direction (vectorized)
+    Evaluated mesh vertices are reduced to approximate convex hull vertices first
+    With rotating parts (setup.setup_rotors), geometry is sampled at ROTOR_CHECK_PHASES phases
+    :param scene: Target scene
+    :param camera: Scene camera (in setup Output collection)
+    :param directions: List of (long, lat) tuples
+    :param render_res: Render resolution
+    :return: Array (N,) of required ortho scales
+    """
+    import numpy as np
+    from XSection360.projection import hull_candidates, required_ortho_scale
+    from XSection360.setup import get_rotors
+    from XSection360.snapshot import collection_triangles
+
+    collection = camera.users_collection[0]
+    samples = ROTOR_CHECK_PHASES if get_rotors(collection) is not None else 1
+    frame = scene.frame_current
+
+    points = []
+    try:
+        for k in range(samples):
+            if samples > 1:
+                scene.frame_set(frame, subframe=k / samples)
+
+            depsgraph = scene.view_layers[0].depsgraph
+            depsgraph.update()
+            triangles, _, _ = collection_triangles(collection, depsgraph)
+            points.append(hull_candidates(np.unique(triangles.reshape(-1, 3), axis=0)))
+    finally:
+        if samples > 1:
+            scene.frame_set(frame)
+
+    points = np.concatenate(points)
+    long, lat = np.array(directions, dtype=np.float64).reshape(-1, 2).T
+
+    return required_ortho_scale(points, long, lat, render_res)
+
+
+def check_frame(scene, camera, directions, render_res):
+    """
+    Pre-flight check: raise FrameClipped if geometry leaves the camera frame in any direction
+    """
+    import numpy as np
+
+    required = frame_requirements(scene, camera, directions, render_res)
+    ortho_scale = camera.data.ortho_scale
+
+    clipped = np.nonzero(required > ortho_scale)[0]
+    if len(clipped):
+        raise FrameClipped([tuple(directions[i]) for i in clipped], float(required.max()) * 1.02)
+
+    print(f'Frame check: geometry in frame in all {len(directions)} directions '
+          f'(needs ortho scale {round(float(required.max()), 4)} of {ortho_scale})\n')
+
+
+def check_frame_edges(pixels, camera, long, lat, border=None):
+    """
+    In-run check: raise FrameClipped if render covers camera frame edge pixels
+    :param pixels: Rendered pixel array (cropped to border if used)
+    :param border: Render border used; if None, full frame
+    """
+    from XSection360 import xstools
+    from XSection360.processing import ProcessRender
+
+    scene = bpy.context.scene
+    render_res = xstools.get_render_resolution(scene)
+
+    edges = ProcessRender.frame_edge_pixels(pixels, border, render_res)
+    if len(edges) == 0:
+        return
+
+    required = float(frame_requirements(scene, camera, [(long, lat)], render_res)[0])
+    raise FrameClipped([(long, lat)], max(required, camera.data.ortho_scale) * 1.02, edges)
+
+
+def render_profile(camera, cam_distance, directions, render_file, suppressor, cache=None, cache_key=None,
+                   borders=None, grid=None, cancel_file=None, initial=None, components=None, reduction=None,
+                   supersample=None, phases=None):
+    """
+    Render raw profile values for list of directions
+    :param camera: Scene camera
+    :param cam_distance: Distance of camera from center (sphere radius)
+    :param directions: List of (long, lat) tuples
+    :param render_file: File the render is written to (scene.render.filepath)
+    :param suppressor: Suppressor for render console output
+    :param cache: ResultCache; cached directions are not rendered. If None, no cache
+    :param cache_key: Cache key for current scene state (scene_cache_key)
+    :param borders: Render border for each direction (direction_borders); if None, full frame
+    :param grid: PixelGrid for render resolution; if given, silhouette moments are computed in the same pass
+    :param cancel_file: If this file is created, rendering stops and Cancelled is raised
+    :param initial: (raw, moments, components) results from checkpoint; rendered values (not None) are kept
+    :param components: Component names, if scene set up with component ID colours; visible pixels of each
+        component are counted in the same pass
+    :param reduction: Reduction for total-only renders (no grid or components); if None, full renders read
+    :param supersample: Supersample for total-only renders (no grid or components); if None, single renders
+    :param phases: Phases averaging rotating parts over rotation phase (no grid); if None, current frame only
+    :return: (raw profile values, moments, component counts) in direction order
+        moments: dict of processing.MOMENT_CHANNELS -> list of values; None if no grid
+        component counts: dict of component name -> list of values; None if no components
+    """
+    import numpy as np
+    from XSection360.processing import MOMENT_CHANNELS, ProcessRender
+    from XSection360.progress import ProgressBar
+
+    # processed pixels; reuse cached directions
+    result_raw = [None] * len(directions)
+    moments = {name: [None] * len(directions) for name in MOMENT_CHANNELS} if grid is not None else None
+    counts = {name: [None] * len(directions) for name in components} if components is not None else None
+
+    if cache is not None:
+        result_raw = cache.get_many(cache_key, directions)
+        if moments is not None:
+            # each moment channel cached under its own key
+            moments = {name: cache.get_many(f'{cache_key}/{name}', directions) for name in MOMENT_CHANNELS}
+        if counts is not None:
+            counts = {name: cache.get_many(f'{cache_key}/component/{name}', directions) for name in components}
+
+    def merge(channels, initial_channels):
+        if channels is None or initial_channels is None:
+            return channels
+        return {name: [c if c is not None else i for c, i in zip(values, initial_channels[name])]
+                for name, values in channels.items()}
+
+    # resume from checkpoint
+    if initial is not None:
+        initial_raw, initial_moments, initial_counts = initial
+        result_raw = [r if r is not None else i for r, i in zip(result_raw, initial_raw)]
+        moments = merge(moments, initial_moments)
+        counts = merge(counts, initial_counts)
+
+    def is_pending(pixel):
+        if result_raw[pixel] is None:
+            return True
+        return any(values[pixel] is None for channels in (moments, counts) if channels is not None
+                   for values in channels.values())
+
+    pending = [pixel for pixel in range(len(directions)) if is_pending(pixel)]
+
+    # begin pixel render process (set up progress bar)
+    for pixel in ProgressBar(pending, desc="Rendering"):
+        # graceful cancel (see supervisor.py)
+        if cancel_file is not None and os.path.isfile(cancel_file):
+            raise Cancelled(result_raw, moments, counts)
+
+        long, lat = directions[pixel]
+
+        border = borders[pixel] if borders is not None else None
+
+        if grid is None and components is None:
+            total_lightness = render_direction(camera, cam_distance, long, lat, render_file, suppressor, border,
+                                               reduction=reduction, supersample=supersample, phases=phases)
+        elif phases is not None and grid is None:
+            # component counts averaged over rotation phase
+            def view_counts():
+                render_view(camera, cam_distance, long, lat, suppressor, border)
+                pixels = ProcessRender.load_pixels(render_file)
+                check_frame_edges(pixels, camera, long, lat, border)
+                return ProcessRender.component_counts(ProcessRender.component_ids(pixels), len(components))
+
+            view = phases.average(view_counts)
+            total_lightness = float(view.sum())
+
+            for name, count in zip(components, view):
+                counts[name][pixel] = float(count)
+                if cache is not None:
+                    cache.put(f'{cache_key}/component/{name}', long, lat, float(count), commit=False)
+        else:
+            render_view(camera, cam_distance, long, lat, suppressor, border)
+            pixels = ProcessRender.load_pixels(render_file)
+            check_frame_edges(pixels, camera, long, lat, border)
+
+            if components is not None:
+                # histogram of component IDs
+                ids = ProcessRender.component_ids(pixels)
+                view_counts = ProcessRender.component_counts(ids, len(components))
+                total_lightness = float(np.count_nonzero(ids))
+
+                for name, count in zip(components, view_counts):
+                    counts[name][pixel] = float(count)
+                    if cache is not None:
+                        cache.put(f'{cache_key}/component/{name}', long, lat, float(count), commit=False)
+
+                pixels = (ids > 0)[..., None].astype(np.float32)  # coverage, for moments
+
+            if grid is not None:
+                view = ProcessRender.moments(pixels, grid, border)
+                if components is None:
+                    total_lightness = view['area'] / grid.pixel_area
+
+                for name in MOMENT_CHANNELS:
+                    moments[name][pixel] = view[name]
+                    if cache is not None:
+                        cache.put(f'{cache_key}/{name}', long, lat, view[name], commit=False)
+
+        result_raw[pixel] = total_lightness
+
+        if cache is not None:
+            cache.put(cache_key, long, lat, total_lightness)
+
+    return result_raw, moments, counts
+
+
+def render_incremental(scene, camera, cam_distance, directions, render_file, suppressor, cache, render_res,
+                       borders=None, cancel_file=None):
+    """
+    Render profile from per-object cached areas (see incremental.py); requires component ID colours
+    In each direction, objects of overlap groups with uncached members are rendered, all others hidden
+    :param scene: Target scene
+    :param camera: Scene camera (in setup Output collection)
+    :param cache: ResultCache holding per-object counts
+    :param render_res: Render resolution
+    :param borders: Render border for each direction (direction_borders); if None, full frame
+    :param cancel_file: If this file is created, rendering stops and Cancelled is raised (rendered counts stay cached)
+    :return: (raw profile values, component counts) in direction order
+    """
+    import numpy as np
+    from mathutils import Vector
+    from XSection360.cache import ResultCache
+    from XSection360.incremental import IncrementalPlan
+    from XSection360.processing import ProcessRender
+    from XSection360.progress import ProgressBar
+    from XSection360.projection import pixel_size
+    from XSection360.setup import get_components
+    from XSection360.snapshot import geometry_hash, mesh_object_triangles
+
+    collection = camera.users_collection[0]
+    components = get_components(collection)
+    objects = [obj for obj in collection.objects if obj.type == 'MESH']  # component ID order
+
+    if components is None or len(components) != len(objects):
+        raise Exception('Incremental profiles need Per-Object Areas setup, with Output objects unchanged since setup')
+
+    depsgraph = scene.view_layers[0].depsgraph
+    depsgraph.update()
+
+    # objects hidden by user stay hidden (zero area)
+    rendered = [i for i, obj in enumerate(objects) if not obj.hide_render]
+
+    keys, points = [], []
+    for i in rendered:
+        obj = objects[i]
+        eval_obj = obj.evaluated_get(depsgraph)
+        keys.append(f'{obj.name}:{geometry_hash(mesh_object_triangles(obj, depsgraph))}')
+        points.append([tuple(eval_obj.matrix_world @ Vector(corner)) for corner in eval_obj.bound_box])
+
+    base_key = ResultCache.make_key('incremental', camera.data.ortho_scale, render_res, engine_settings(scene))
+    plan = IncrementalPlan(keys, points, directions, base_key, pixel_size(camera.data.ortho_scale, render_res))
+
+    counts = plan.lookup(cache)
+    pending = [d for d in range(len(directions)) if plan.render_objects(counts, d)]
+    print(f'Incremental: {len(pending)} of {len(directions)} directions need rendering\n')
+
+    try:
+        for d in ProgressBar(pending, desc="Rendering"):
+            if cancel_file is not None and os.path.isfile(cancel_file):
+                raise Cancelled(None, None)
+
+            targets = plan.render_objects(counts, d)
+            for j, i in enumerate(rendered):
+                objects[i].hide_render = j not in targets
+
+            long, lat = directions[d]
+            border = borders[d] if borders is not None else None
+            render_view(camera, cam_distance, long, lat, suppressor, border)
+
+            pixels = ProcessRender.load_pixels(render_file)
+            check_frame_edges(pixels, camera, long, lat, border)
+
+            ids = ProcessRender.component_ids(pixels)
+            view = ProcessRender.component_counts(ids, len(objects))
+            values = [float(view[rendered[j]]) for j in targets]
+
+            counts[d, targets] = values
+            plan.store(cache, d, targets, values)
+            cache.flush()
+    finally:
+        for i in rendered:
+            objects[i].hide_render = False
+
+    # disjoint groups: areas add
+    per_object = np.zeros((len(directions), len(objects)))
+    per_object[:, rendered] = counts
+
+    component_counts = {name: per_object[:, k].tolist() for k, name in enumerate(components)}
+
+    return per_object.sum(axis=1).tolist(), component_counts
+
+
+def checkpoint_file(save_file):
+    """
+    Checkpoint file for requested output file (before renaming to avoid overwriting)
+    """
+    return os.path.splitext(save_file)[0] + '_checkpoint.npz'
+
+
+def save_checkpoint(file_path, settings: dict, result_raw, moments=None, components=None):
+    """
+    Save partial results of cancelled job
+    :param file_path: Checkpoint file
+    :param settings: Run settings; checkpoint only resumed if equal
+    :param result_raw: Raw profile values; None where not rendered
+    :param moments: Moment channels (or None), as result_raw
+    :param components: Component pixel counts (or None), as result_raw
+    """
+    import json
+    import numpy as np
+
+    def to_array(values):
+        return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+    channels = {f'moment_{name}': to_array(values) for name, values in (moments or {}).items()}
+    channels.update({f'component_{name}': to_array(values) for name, values in (components or {}).items()})
+    np.savez(file_path, settings=json.dumps(settings, sort_keys=True), raw=to_array(result_raw), **channels)
+
+    done = sum(v is not None for v in result_raw)
+    print(f"\n Checkpoint saved ({done}/{len(result_raw)} directions): {file_path}\n")
+
+
+def load_checkpoint(file_path, settings: dict):
+    """
+    Load partial results saved by save_checkpoint
+    :param file_path: Checkpoint file
+    :param settings: Current run settings
+    :return: (raw, moments, components) as render_profile initial; None if no matching checkpoint
+    """
+    import json
+    import numpy as np
+
+    if not os.path.isfile(file_path):
+        return None
+
+    with np.load(file_path) as data:
+        if str(data['settings']) != json.dumps(settings, sort_keys=True):
+            print(f"Checkpoint {file_path} does not match run settings; ignored")
+            return None
+
+        def to_list(values):
+            return [None if np.isnan(v) else float(v) for v in values]
+
+        result_raw = to_list(data['raw'])
+        moments = {key[len('moment_'):]: to_list(data[key]) for key in data.files if key.startswith('moment_')}
+        components = {key[len('component_'):]: to_list(data[key])
+                      for key in data.files if key.startswith('component_')}
+
+    print(f"Resuming from checkpoint: {sum(v is not None for v in result_raw)}/{len(result_raw)} directions done")
+    return result_raw, moments or None, components or None
+
+
+def run_background(scene_name, save_file, resolution: tuple, cam_distance, cache_file=None, cache_size=1000000,
+                   auto_border=False, target_error=None, moments=False, cancel_file=None, window=None,
+                   incremental=False, frame_check=True, supersample=None, supersample_tile=16, cache_tolerance=0):
     """
     Run XS360 process.
     :param scene_name: Name of target scene
     :param save_file: Output image file (png)
     :param resolution: Output image resolution
     :param cam_distance: Distance of camera from center (sphere radius)
+    :param cache_file: Result cache file; previously rendered directions are reused. If None, no cache
+    :param cache_size: Maximum number of samples kept in result cache
+    :param auto_border: Only render region of each view which can contain geometry (render border)
+    :param target_error: Relative area error target; if given, render resolution is calibrated first
+    :param moments: Also compute silhouette centroid and second moments (written to _moments.npz)
+    :param cancel_file: Stop gracefully (saving checkpoint) when this file is created
+    :param window: Angular region of interest (equirectangular.Window) sampled at resolution; if None, full sphere
+    :param incremental: Reuse per-object cached areas, rendering only changed objects (see incremental.py);
+        requires cache_file and Per-Object Areas setup
+    :param frame_check: Check geometry stays in camera frame in every direction before rendering
+    :param supersample: Re-render edge tiles of each view at this factor x render resolution (see supersample.py);
+        if None, single renders
+    :param supersample_tile: Supersampling tile size (render pixels)
+    :param cache_tolerance: Reuse nearest cached direction within this angle (degrees); if 0, exact matches only
     """
 
     # run_background is called from the command line
@@ -77,20 +975,36 @@ def run_background(scene_name, save_file, resolution: tuple, cam_distance):
     # therefore, modules must be imported using full module path
 
     from XSection360 import xstools
-    from XSection360.equirectangular import Equirectangular
+    from XSection360.cache import ResultCache
     from XSection360.progress import ProgressBar
-    from XSection360.processing import ProcessRaw, ProcessRender
+    from XSection360.processing import PixelGrid, ProcessRaw
+    from XSection360.setup import get_components, get_rotors
 
     # retrieve scene data
     scene: bpy.types.Scene = bpy.data.scenes[scene_name]
     camera = scene.camera
     render_res = xstools.get_render_resolution(scene)
 
+    # per-component areas, if set up with ID colours (setup places camera in Output collection)
+    components = get_components(camera.users_collection[0])
+
+    if incremental and (cache_file is None or components is None or moments):
+        raise Exception('Incremental profiles need a cache file and Per-Object Areas setup (without moments)')
+
+    # rotating parts averaged by renders at several phases
+    phases = Phases.from_collection(scene, camera.users_collection[0])
+    if phases is not None and (moments or incremental):
+        raise Exception('Rotating parts averaged by phase renders do not support Centroid & Moments or '
+                        'incremental profiles')
+
     suppressor = Suppressor()
 
     # if directory not changed, access may be denied (to blender addons folder)
     os.chdir(bpy.path.abspath('//'))
 
+    # partial results of cancelled run, for same requested output
+    checkpoint = checkpoint_file(save_file)
+
     # modify output name to ensure no overwriting
     save_file = xstools.OutImage.modify_filename(save_file)
 
@@ -99,44 +1013,481 @@ def run_background(scene_name, save_file, resolution: tuple, cam_distance):
     scene.render.filepath = temp_file
 
     # print start message
-    print(start_message(scene_name, save_file, resolution, render_res))
-    max_pixel = xstools.product(resolution)
+    print(start_message(scene_name, save_file, resolution, render_res, window))
 
-    # processed pixels
-    result_raw = []
+    directions = profile_directions(resolution, window)
+    metadata = {
+        'scene': scene_name,
+        'resolution': list(resolution),
+        'ortho_scale': camera.data.ortho_scale,
+        'cam_distance': cam_distance,
+    }
+    if window is not None:
+        metadata['window'] = window.to_dict()
+    if components is not None:
+        metadata['components'] = components
+    if get_rotors(camera.users_collection[0]) is not None:
+        metadata['rotors'] = get_rotors(camera.users_collection[0])
+
+    # choose render resolution for target precision
+    if target_error is not None:
+        metadata['calibration'] = calibrate_resolution(scene, camera, cam_distance, target_error, temp_file,
+                                                       suppressor, directions, components=components is not None)
+        render_res = xstools.get_render_resolution(scene)
+    metadata['render_res'] = list(render_res)
+
+    # refine edge tiles of total-only renders (needs full readback: no compositor reduction)
+    sampler = None
+    if supersample is not None and supersample > 1:
+        if components is None and not moments:
+            sampler = Supersample(scene, supersample, supersample_tile)
+            print(f'Supersampling: edge tiles ({supersample_tile}px) re-rendered at {supersample}x resolution\n')
+        else:
+            print('Supersampling unavailable with Centroid & Moments or Per-Object Areas; single renders used\n')
+
+    # reduce total-only renders in compositor (tree built for calibrated resolution)
+    reduction = (Reduction.from_scene(scene, frame_check) if components is None and not moments and sampler is None
+                 else None)
+    if reduction is not None:
+        metadata['reduction'] = list(reduction.size)
+
+    # fail before rendering if camera would clip geometry
+    if frame_check:
+        check_frame(scene, camera, directions, render_res)
+
+    cache, cache_key = None, None
+    if cache_file is not None:
+        cache = ResultCache(bpy.path.abspath(cache_file), cache_size, cache_tolerance)
+        cache_key = scene_cache_key(scene, camera, render_res, sampler)
 
     # RENDER
-    # begin pixel render process (set up progress bar)
-    for pixel in ProgressBar(range(max_pixel), desc="Rendering"):
-        # get xy pixel coordinates
-        res_x, res_y = resolution
-        pixel_coord = xstools.OutImage.pixel_to_coord(pixel, res_x)
+    borders = direction_borders(scene, camera, directions, render_res) if auto_border else None
+    grid = PixelGrid(camera.data.ortho_scale, render_res) if moments else None
+
+    # checkpoint only resumed for identical geometry and every setting affecting raw values
+    settings = {
+        'key': cache_key or scene_cache_key(scene, camera, render_res, sampler),
+        'resolution': list(resolution),
+        'render_res': list(render_res),
+        'moments': moments,
+        'components': components,
+        'window': str(window) if window is not None else None,
+        'auto_border': auto_border,
+        'target_error': target_error,
+        'supersample': [sampler.factor, sampler.tile] if sampler is not None else None,
+        'reduction': list(reduction.size) if reduction is not None else None,
+        'phases': phases.count if phases is not None else None,
+    }
+    initial = load_checkpoint(checkpoint, settings)
 
-        # get projected longitude & latitude
-        long, lat = Equirectangular.Pixel.coord_to_spherical(pixel_coord, resolution)
-        # apply to camera
-        xstools.transform_camera(camera, cam_distance, long, lat)
+    try:
+        if incremental:
+            # progress kept in per-object cache: no checkpoint
+            result_moments = None
+            result_raw, result_components = render_incremental(scene, camera, cam_distance, directions, temp_file,
+                                                               suppressor, cache, render_res, borders, cancel_file)
+        else:
+            result_raw, result_moments, result_components = render_profile(
+                camera, cam_distance, directions, temp_file, suppressor, cache, cache_key, borders, grid,
+                cancel_file, initial, components, reduction, sampler, phases)
+    except Cancelled as cancelled:
+        if not incremental:
+            save_checkpoint(checkpoint, settings, cancelled.result_raw, cancelled.moments, cancelled.components)
+        if os.path.isfile(temp_file):
+            os.remove(temp_file)  # partial render; next run reuses output name
+        if cache is not None:
+            cache.close()
+        raise
 
-        # render (suppress render console output)
-        suppressor.enter()
-        bpy.ops.render.render(write_still=True)
-        suppressor.exit()
+    if os.path.isfile(checkpoint):
+        os.remove(checkpoint)
 
-        # process render result,  to file
-        total_lightness = ProcessRender.process(temp_file)
-        result_raw.append(total_lightness)
+    if sampler is not None:
+        metadata['supersample'] = sampler.summary()
+
+    if reduction is not None and reduction.edge_renders:
+        print(f'Compositor reduction: {reduction.edge_renders} of {len(directions)} views read in full '
+              f'(geometry in outer tiles)')
 
     print("\n Finished Rendering. Starting Processing...\n")
 
+    if cache is not None:
+        cache.close()
+        print(cache.summary() + '\n')
+
     # PROCESS
-    for i in ProgressBar(ProcessRaw(result_raw, save_file, resolution), desc="Processing"):
+    for i in ProgressBar(ProcessRaw(result_raw, save_file, resolution, metadata, result_moments, window,
+                                    result_components), desc="Processing"):
         # Processing executed within ProcessRaw() generator:
         #     - Process raw data into profile pixels
         #     - Write pixels to image
         #     - Save image to file
+        #     - Save metadata to file (.json)
+        #     - Save silhouette moments to file (_moments.npz)
+        #     - Save per-component pixel counts to file (_components.npz)
         pass  # wait
 
 
+def sequence_states(scene, collection, frames=None, shape_keys=False):
+    """
+    Generate scene states for profile sequence: animation frames or named shape key states
+    Each state is applied to the scene as it is yielded
+    :param scene: Target scene
+    :param collection: Collection containing processed objects (setup 'Output')
+    :param frames: Frame numbers (range); used if shape_keys is False
+    :param shape_keys: Use shape key states: 'Basis', then each named key at value 1 (others 0)
+    :return: Generator of state labels
+    """
+    if not shape_keys:
+        for frame in frames:
+            scene.frame_set(frame)
+            yield f'frame {frame}'
+        return
+
+    # shape keys of all processed meshes (shared mesh data listed once)
+    key_blocks = {}
+    for obj in collection.all_objects:
+        if obj.type == 'MESH' and obj.data.shape_keys is not None:
+            for block in obj.data.shape_keys.key_blocks[1:]:  # skip reference key (Basis)
+                key_blocks.setdefault(block.name, []).append(block)
+
+    all_blocks = [block for blocks in key_blocks.values() for block in blocks]
+
+    for name in ['Basis'] + list(key_blocks):
+        for block in all_blocks:
+            block.value = 1.0 if block.name == name else 0.0
+
+        scene.view_layers[0].update()
+        yield name
+
+
+def run_sequence(scene_name, save_file, resolution: tuple, cam_distance, frames=None, shape_keys=False,
+                 cache_file=None, cache_size=1000000, auto_border=False, cancel_file=None, window=None,
+                 frame_check=True, cache_tolerance=0, incremental=False):
+    """
+    Run XS360 process for each animation frame (or shape key state)
+    Writes stacked raw profiles to .npz: profiles (states, y, x), labels, geometry keys
+    (and component_names, components (states, components, y, x) if set up with component ID colours)
+    States whose evaluated geometry (and render settings) are unchanged reuse an earlier profile;
+    with a result cache, rendered directions are also reused across runs.
+    With incremental, each state is rendered from per-object cached areas (render_incremental), so
+    objects unchanged since an earlier state are not rendered again where they overlap no changed object
+    :param scene_name: Name of target scene
+    :param save_file: Output file (.npz)
+    :param resolution: Output image resolution
+    :param cam_distance: Distance of camera from center (sphere radius)
+    :param frames: Frame numbers (range); used if shape_keys is False
+    :param shape_keys: Use named shape key states instead of frames
+    :param cache_file: Result cache file. If None, no cache
+    :param cache_size: Maximum number of samples kept in result cache
+    :param auto_border: Only render region of each view which can contain geometry (render border)
+    :param cancel_file: Stop when this file is created (rendered directions are kept in result cache)
+    :param window: Angular region of interest (equirectangular.Window); if None, full sphere
+    :param frame_check: Check geometry stays in camera frame (each new state) before rendering it
+    :param cache_tolerance: Reuse nearest cached direction within this angle (degrees); if 0, exact matches only
+    :param incremental: Render states from per-object cached areas; requires cache_file and Per-Object Areas setup
+    """
+    import numpy as np
+    from XSection360 import xstools
+    from XSection360.cache import ResultCache
+    from XSection360.setup import get_components
+
+    scene: bpy.types.Scene = bpy.data.scenes[scene_name]
+    camera = scene.camera
+    render_res = xstools.get_render_resolution(scene)
+    collection = camera.users_collection[0]  # setup places camera in Output collection
+    components = get_components(collection)
+
+    if incremental and (cache_file is None or components is None):
+        raise Exception('Incremental profiles need a cache file and Per-Object Areas setup')
+
+    suppressor = Suppressor()
+
+    # if directory not changed, access may be denied (to blender addons folder)
+    os.chdir(bpy.path.abspath('//'))
+
+    save_file = xstools.OutImage.modify_filename(os.path.splitext(save_file)[0] + '.npz')
+    temp_file = os.path.splitext(save_file)[0] + '_render.png'
+    scene.render.filepath = temp_file
+
+    print(start_message(scene_name, save_file, resolution, render_res, window))
+
+    cache = None
+    if cache_file is not None:
+        cache = ResultCache(bpy.path.abspath(cache_file), cache_size, cache_tolerance)
+
+    reduction = Reduction.from_scene(scene, frame_check) if components is None else None
+    phases = Phases.from_collection(scene, collection)
+
+    if incremental and phases is not None:
+        raise Exception('Rotating parts averaged by phase renders do not support incremental profiles')
+
+    directions = profile_directions(resolution, window)
+    res_x, res_y = resolution
+
+    labels, keys, profiles, component_profiles = [], [], [], []
+    computed = {}  # cache key -> (profile, component counts)
+
+    for label in sequence_states(scene, collection, frames, shape_keys):
+        key = scene_cache_key(scene, camera, render_res)
+
+        if key in computed:
+            print(f'{label}: geometry unchanged, reusing profile')
+        else:
+            print(f'\n{label}:')
+            if frame_check:
+                check_frame(scene, camera, directions, render_res)
+            borders = direction_borders(scene, camera, directions, render_res) if auto_border else None
+            try:
+                if incremental:
+                    # unchanged objects reuse their cached areas from earlier states
+                    result_raw, counts = render_incremental(scene, camera, cam_distance, directions, temp_file,
+                                                            suppressor, cache, render_res, borders, cancel_file)
+                else:
+                    result_raw, _, counts = render_profile(camera, cam_distance, directions, temp_file, suppressor,
+                                                           cache, key, borders, cancel_file=cancel_file,
+                                                           components=components, reduction=reduction, phases=phases)
+            except Cancelled:
+                if cache is not None:
+                    cache.close()
+                raise
+            if counts is not None:
+                counts = np.array([counts[name] for name in components], dtype=np.float64).reshape(-1, res_y, res_x)
+            computed[key] = np.array(result_raw, dtype=np.float64).reshape(res_y, res_x), counts
+
+        profile, counts = computed[key]
+        labels.append(label)
+        keys.append(key)
+        profiles.append(profile)
+        component_profiles.append(counts)
+
+    extra = {}
+    if components is not None:
+        extra = {'component_names': np.array(components), 'components': np.stack(component_profiles)}
+
+    np.savez(save_file, profiles=np.stack(profiles), labels=np.array(labels), keys=np.array(keys),
+             window=str(window) if window is not None else '', **extra)
+
+    if os.path.isfile(temp_file):
+        os.remove(temp_file)
+
+    print(f"\n Finished: {len(labels)} states, {len(computed)} rendered ({len(labels) - len(computed)} reused)")
+    print(f" Saved to {save_file}\n")
+
+    if cache is not None:
+        cache.close()
+        print(cache.summary() + '\n')
+
+
+def run_query(scene_name, query_file, save_file, cam_distance, cache_file=None, cache_size=1000000,
+              auto_border=False, quantum=None, frame_check=True):
+    """
+    Render raw values at arbitrary directions (see query.py), memoized in result cache
+    :param scene_name: Name of target scene
+    :param query_file: Directions file: long, lat columns or direction vectors (query.load_directions)
+    :param save_file: Output file (.npy: values, otherwise CSV of long, lat, value)
+    :param cam_distance: Distance of camera from center (sphere radius)
+    :param cache_file: Result cache file. If None, only duplicate directions are reused
+    :param cache_size: Maximum number of samples kept in result cache
+    :param auto_border: Only render region of each view which can contain geometry (render border)
+    :param quantum: Memoization angle step (degrees); directions are snapped to it. If None, exact
+    """
+    from XSection360 import xstools
+    from XSection360.cache import ResultCache
+    from XSection360.query import load_directions, query_directions, save_results
+    from XSection360.setup import get_components
+
+    scene: bpy.types.Scene = bpy.data.scenes[scene_name]
+    camera = scene.camera
+    render_res = xstools.get_render_resolution(scene)
+    id_colours = get_components(camera.users_collection[0]) is not None  # total only
+
+    suppressor = Suppressor()
+
+    # if directory not changed, access may be denied (to blender addons folder)
+    os.chdir(bpy.path.abspath('//'))
+
+    directions = load_directions(bpy.path.abspath(query_file))
+    temp_file = os.path.splitext(save_file)[0] + '_render.png'
+    scene.render.filepath = temp_file
+
+    print(start_message(scene_name, save_file, f'{len(directions)} directions', render_res))
+
+    cache, cache_key = None, None
+    if cache_file is not None:
+        cache = ResultCache(bpy.path.abspath(cache_file), cache_size)
+        cache_key = scene_cache_key(scene, camera, render_res)
+
+    reduction = None if id_colours else Reduction.from_scene(scene, frame_check)
+    phases = Phases.from_collection(scene, camera.users_collection[0])
+
+    def evaluate_batch(batch):
+        borders = direction_borders(scene, camera, batch, render_res) if auto_border else [None] * len(batch)
+        return [render_direction(camera, cam_distance, long, lat, temp_file, suppressor, border, id_colours,
+                                 reduction, phases=phases)
+                for (long, lat), border in zip(batch, borders)]
+
+    if frame_check:
+        check_frame(scene, camera, directions, render_res)
+
+    values = query_directions(evaluate_batch, directions, cache, cache_key, quantum=quantum)
+    save_results(save_file, directions, values)
+
+    if os.path.isfile(temp_file):
+        os.remove(temp_file)
+
+    print(f"\n Saved {len(values)} values to {save_file}\n")
+
+    if cache is not None:
+        cache.close()
+        print(cache.summary() + '\n')
+
+
+def run_daemon(scene_name, socket_path, cam_distance, idle_timeout=600, max_memory=None):
+    """
+    Run as persistent daemon: keep blend file loaded (and Eevee warm) and run jobs received over Unix socket
+    :param scene_name: Default scene for jobs
+    :param socket_path: Socket file to listen on
+    :param cam_distance: Default camera distance for jobs
+    :param idle_timeout: Seconds without requests after which the daemon exits
+    :param max_memory: Peak memory (MB) after which the daemon exits (after returning current job's result)
+    """
+    import tempfile
+    from XSection360 import xstools
+    from XSection360.cache import ResultCache
+    from XSection360.daemon import DaemonServer, StreamChannel
+    from XSection360.equirectangular import Window
+    from XSection360.processing import ProcessRaw
+    from XSection360.progress import ProgressBar
+    from XSection360.setup import get_components
+
+    suppressor = Suppressor()
+
+    # if directory not changed, access may be denied (to blender addons folder)
+    os.chdir(bpy.path.abspath('//'))
+
+    temp_file = os.path.join(tempfile.gettempdir(), f'xs360_daemon_{os.getpid()}.png')
+    reductions = {}  # scene name -> Reduction (tree built once per scene)
+
+    def handle_job(job, send):
+        """
+        Render job: profile (resolution, optional window and output image) or listed directions
+        :return: Result dict: values (raw, direction order), components, output
+        """
+        scene: bpy.types.Scene = bpy.data.scenes[job.get('scene', scene_name)]
+        camera = scene.camera
+        distance = job.get('distance', cam_distance)
+        render_res = xstools.get_render_resolution(scene)
+        components = get_components(camera.users_collection[0])
+
+        scene.render.filepath = temp_file
+
+        resolution, window = None, None
+        if 'directions' in job:
+            directions = [tuple(direction) for direction in job['directions']]
+        else:
+            resolution = tuple(job['resolution'])
+            window = Window.parse(job['window']) if job.get('window') else None
+            directions = profile_directions(resolution, window)
+
+        cache, cache_key = None, None
+        if job.get('cache'):
+            cache = ResultCache(bpy.path.abspath(job['cache']), job.get('cache_size', 1000000))
+            cache_key = scene_cache_key(scene, camera, render_res)
+
+        borders = direction_borders(scene, camera, directions, render_res) if job.get('auto_border') else None
+
+        reduction = None
+        if components is None:
+            if scene.name not in reductions:
+                reductions[scene.name] = Reduction.from_scene(scene)
+            reduction = reductions[scene.name]
+
+        # stream progress to client
+        ProgressBar.channel = StreamChannel(send)
+        try:
+            result_raw, _, counts = render_profile(camera, distance, directions, temp_file, suppressor, cache,
+                                                   cache_key, borders, components=components, reduction=reduction,
+                                                   phases=Phases.from_collection(scene, camera.users_collection[0]))
+        finally:
+            ProgressBar.channel = None
+            if cache is not None:
+                cache.close()
+
+        save_file = None
+        if job.get('output') and resolution is not None:
+            save_file = xstools.OutImage.modify_filename(bpy.path.abspath(job['output']))
+            metadata = {
+                'scene': scene.name,
+                'resolution': list(resolution),
+                'ortho_scale': camera.data.ortho_scale,
+                'cam_distance': distance,
+                'render_res': list(render_res),
+            }
+            if window is not None:
+                metadata['window'] = window.to_dict()
+
+            for i in ProcessRaw(result_raw, save_file, resolution, metadata, window=window, components=counts):
+                pass
+
+        if os.path.isfile(temp_file):
+            os.remove(temp_file)
+
+        # JSON response: plain floats
+        values = [float(v) for v in result_raw]
+        if counts is not None:
+            counts = {name: [float(v) for v in column] for name, column in counts.items()}
+
+        return {'values': values, 'components': counts, 'output': save_file}
+
+    DaemonServer(socket_path, handle_job, idle_timeout, max_memory).serve()
+
+
+def run_worker(scene_name, url, cam_distance, auto_border=False):
+    """
+    Run as render farm worker: render chunks leased from coordinator (see farm.py)
+    :param scene_name: Name of target scene
+    :param url: Coordinator URL
+    :param cam_distance: Distance of camera from center (sphere radius)
+    :param auto_border: Only render region of each view which can contain geometry (render border)
+    """
+    import tempfile
+    from XSection360 import xstools
+    from XSection360.farm import Worker
+    from XSection360.setup import get_components
+
+    scene: bpy.types.Scene = bpy.data.scenes[scene_name]
+    camera = scene.camera
+    id_colours = get_components(camera.users_collection[0]) is not None  # total only
+    suppressor = Suppressor()
+
+    # if directory not changed, access may be denied (to blender addons folder)
+    os.chdir(bpy.path.abspath('//'))
+
+    # render to worker-specific temporary file
+    temp_file = os.path.join(tempfile.gettempdir(), f'xs360_worker_{os.getpid()}.png')
+    scene.render.filepath = temp_file
+
+    render_res = xstools.get_render_resolution(scene)
+    reduction = None if id_colours else Reduction.from_scene(scene)
+    phases = Phases.from_collection(scene, camera.users_collection[0])
+
+    def evaluate(long, lat):
+        border = None
+        if auto_border:
+            border = direction_borders(scene, camera, [(long, lat)], render_res)[0]
+
+        return render_direction(camera, cam_distance, long, lat, temp_file, suppressor, border, id_colours,
+                                reduction, phases=phases)
+
+    # coordinator rejects workers with different geometry or render settings
+    worker = Worker(url, evaluate, key=scene_cache_key(scene, camera, render_res))
+    print(f'\n~~~ XSection360 Worker {worker.worker_id} ~~~\n( Scene: {scene_name}, Coordinator: {url}\n')
+
+    completed = worker.run()
+    print(f'Worker finished: {completed} chunks completed')
+
+
 def main():
     import sys  # to get command line args
     import argparse  # to parse options for us and print a nice help message
@@ -165,21 +1516,113 @@ def main():
         help="",
     )
     parser.add_argument(
-        "-f", "--file", dest="save_file", metavar='FILE', required=True,
+        "-f", "--file", dest="save_file", metavar='FILE',
         help="Save the generated file to the specified path",
     )
     parser.add_argument(
-        "-x", "--xres", dest="x_resolution", type=int, required=True,
+        "-x", "--xres", dest="x_resolution", type=int,
         help="Horizontal (X) resolution of output image (different to render resolution)",
     )
     parser.add_argument(
-        "-y", "--yres", dest="y_resolution", type=int, required=True,
+        "-y", "--yres", dest="y_resolution", type=int,
         help="Vertical (Y) resolution of output image (different to render resolution)",
     )
     parser.add_argument(
         "-d", "--distance", dest="cam_distance", type=float, required=True,
         help="Camera sphere projection distance",
     )
+    parser.add_argument(
+        "-c", "--cache", dest="cache_file", metavar='FILE', default=None,
+        help="Result cache file; directions already rendered with the same geometry and settings are reused",
+    )
+    parser.add_argument(
+        "--cache-size", dest="cache_size", type=int, default=1000000,
+        help="Maximum number of samples kept in result cache (least recently used are evicted)",
+    )
+    parser.add_argument(
+        "--cache-tolerance", dest="cache_tolerance", type=float, default=0,
+        help="Reuse the nearest cached direction within this angle (degrees) when a direction is not cached "
+             "exactly, e.g. half the previous profile pixel size to refine 180x90 to 360x180 (default: exact only)",
+    )
+    parser.add_argument(
+        "-w", "--worker", dest="worker_url", metavar='URL', default=None,
+        help="Run as render farm worker for coordinator at URL (file and resolution are set by coordinator)",
+    )
+    parser.add_argument(
+        "-b", "--auto-border", dest="auto_border", action='store_true',
+        help="Only render the region of each view which can contain geometry (projected bounding boxes)",
+    )
+    parser.add_argument(
+        "-e", "--target-error", dest="target_error", type=float, default=None,
+        help="Calibrate render resolution first: smallest resolution with estimated relative area error below this",
+    )
+    parser.add_argument(
+        "-m", "--moments", dest="moments", action='store_true',
+        help="Also compute silhouette centroid and second moments for each direction (_moments.npz output)",
+    )
+    parser.add_argument(
+        "--supersample", dest="supersample", type=int, default=None,
+        help="Re-render only the edge tiles of each view at this factor x render resolution (total area only)",
+    )
+    parser.add_argument(
+        "--supersample-tile", dest="supersample_tile", type=int, default=16,
+        help="Supersampling tile size (render pixels)",
+    )
+    parser.add_argument(
+        "--skip-frame-check", dest="skip_frame_check", action='store_true',
+        help="Skip pre-flight check that geometry stays in camera frame (frame edges are still checked in renders)",
+    )
+    parser.add_argument(
+        "--incremental", dest="incremental", action='store_true',
+        help="Reuse per-object cached areas, rendering only changed objects where they overlap others "
+             "(requires --cache and Per-Object Areas setup)",
+    )
+    parser.add_argument(
+        "--window", dest="window", metavar='MODE:MIN:MAX:MIN:MAX', default=None,
+        help="Only sample angular window, at output resolution: lonlat:LONG_MIN:LONG_MAX:LAT_MIN:LAT_MAX "
+             "or alphabeta:ALPHA_MIN:ALPHA_MAX:BETA_MIN:BETA_MAX (image x axis: longitude / beta)",
+    )
+    parser.add_argument(
+        "--query", dest="query_file", metavar='FILE', default=None,
+        help="Render only the directions listed in FILE (long, lat or x, y, z per line); "
+             "values are written to -f/--file (.npy, otherwise CSV)",
+    )
+    parser.add_argument(
+        "--quantum", dest="quantum", type=float, default=None,
+        help="Query memoization angle step (degrees): directions are snapped to multiples of it",
+    )
+    parser.add_argument(
+        "--daemon", dest="daemon_socket", metavar='SOCKET', default=None,
+        help="Run as persistent daemon accepting jobs on Unix socket file SOCKET (see daemon.py)",
+    )
+    parser.add_argument(
+        "--idle-timeout", dest="idle_timeout", type=float, default=600,
+        help="Daemon: exit after this many seconds without requests",
+    )
+    parser.add_argument(
+        "--max-memory", dest="max_memory", type=float, default=None,
+        help="Daemon: exit (recycle) once peak memory exceeds this many MB",
+    )
+    parser.add_argument(
+        "--progress-port", dest="progress_port", type=int, default=None,
+        help="Send throttled progress events to local UDP port (XSection360 panel)",
+    )
+    parser.add_argument(
+        "--job-id", dest="job_id", default=None,
+        help="Job name used in progress events (default: process id)",
+    )
+    parser.add_argument(
+        "--cancel-file", dest="cancel_file", metavar='FILE', default=None,
+        help="Stop gracefully when FILE is created, saving a checkpoint that is resumed by the next run",
+    )
+    parser.add_argument(
+        "--frames", dest="frames", metavar='START:END[:STEP]', default=None,
+        help="Profile sequence: one profile per animation frame (inclusive), stacked into .npz output",
+    )
+    parser.add_argument(
+        "--shape-keys", dest="shape_keys", action='store_true',
+        help="Profile sequence: one profile per named shape key state, stacked into .npz output",
+    )
 
     args = parser.parse_args(argv)  # In this example we won't use the args
 
@@ -187,12 +1630,85 @@ def main():
         parser.print_help()
         return
 
-    res = (args.x_resolution, args.y_resolution)
-    run_background(args.scene, args.save_file, res, args.cam_distance)
+    # report progress to Blender UI
+    if args.progress_port is not None:
+        from XSection360.channel import ProgressSender
+        from XSection360.progress import ProgressBar
+
+        ProgressBar.channel = ProgressSender(args.progress_port, args.job_id or os.getpid())
+
+    from XSection360.supervisor import CANCELLED_EXIT_CODE
+
+    try:
+        run(args, parser)
+    except Cancelled:
+        if args.progress_port is not None:
+            ProgressBar.channel.send('Cancelled', 0, 0, 0, 0)
+        print("Cancelled, exiting...")
+        sys.exit(CANCELLED_EXIT_CODE)
+    except BaseException:
+        if args.progress_port is not None:
+            ProgressBar.channel.send('Failed', 0, 0, 0, 0)
+        raise
+
+    if args.progress_port is not None:
+        ProgressBar.channel.send('Finished', 1, 1, 0, 0)
 
     print("Done, exiting...")
     sleep(1)
 
 
+def run(args, parser):
+    """
+    Run mode selected by command line arguments
+    """
+    if args.worker_url is not None:
+        run_worker(args.scene, args.worker_url, args.cam_distance, args.auto_border)
+        return
+
+    if args.daemon_socket is not None:
+        run_daemon(args.scene, args.daemon_socket, args.cam_distance, args.idle_timeout, args.max_memory)
+        return
+
+    if args.query_file is not None:
+        if args.save_file is None:
+            parser.error("the following arguments are required: -f/--file")
+
+        run_query(args.scene, args.query_file, args.save_file, args.cam_distance, args.cache_file, args.cache_size,
+                  args.auto_border, args.quantum, not args.skip_frame_check)
+        return
+
+    if None in (args.save_file, args.x_resolution, args.y_resolution):
+        parser.error("the following arguments are required: -f/--file, -x/--xres, -y/--yres")
+
+    res = (args.x_resolution, args.y_resolution)
+    window = None
+    if args.window is not None:
+        from XSection360.equirectangular import Window
+        window = Window.parse(args.window)
+
+    if args.frames is not None or args.shape_keys:
+        # options of single profiles only: fail rather than silently ignore them
+        unsupported = [flag for flag, used in (('--target-error', args.target_error is not None),
+                                               ('--moments', args.moments),
+                                               ('--supersample', (args.supersample or 1) > 1)) if used]
+        if unsupported:
+            parser.error(f"{', '.join(unsupported)} not supported with --frames / --shape-keys")
+
+        frames = None
+        if args.frames is not None:
+            start, end, *step = (int(f) for f in args.frames.split(':'))
+            frames = range(start, end + 1, *step)
+
+        run_sequence(args.scene, args.save_file, res, args.cam_distance, frames, args.shape_keys,
+                     args.cache_file, args.cache_size, args.auto_border, args.cancel_file, window,
+                     not args.skip_frame_check, args.cache_tolerance, args.incremental)
+        return
+
+    run_background(args.scene, args.save_file, res, args.cam_distance, args.cache_file, args.cache_size,
+                   args.auto_border, args.target_error, args.moments, args.cancel_file, window, args.incremental,
+                   not args.skip_frame_check, args.supersample, args.supersample_tile, args.cache_tolerance)
+
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,347 @@
+"""
+Accuracy-versus-cost benchmark on analytic primitives.
+
+Primitives with closed-form projected areas (sphere, cube, cylinder, ellipsoid, union of
+two offset boxes) are run through each backend at a sweep of render and profile
+resolutions. Relative area error is reported against seconds per view and total wall
+time, as a table and JSON.
+
+Backends:
+    raster  - software rasterizer (raster.py), pixel counts at render resolution
+    exact   - exact projected area (exact.py); render resolution not used
+    silhouette - exact projected area from silhouette edges (silhouette.py); render resolution not used
+    blender - Blender render loop (background.render_profile), only inside Blender
+
+Note: curved primitives are tessellated (see --segments), so their reference areas carry
+a small tessellation error (about 0.1% at 96 segments); the exact backend shows this floor.
+
+Example usage:
+
+python -m XSection360 bench --backends=raster,exact --render-res=64,128,256 --profile-res=8x4,16x8
+blender --background --python-expr "from XSection360 import benchmark; benchmark.main()" -- --backends=blender
+"""
+
+import sys
+from time import time
+
+import numpy as np
+
+from .equirectangular import Equirectangular
+from .projection import camera_basis
+
+
+# PRIMITIVE MESHES
+
+def quad_grid(point, n_u, n_v):
+    """
+    Triangulate parametric surface over unit square
+    :param point: Function (u, v) -> (x, y, z), u and v in [0, 1] (arrays)
+    :param n_u: Segments along u
+    :param n_v: Segments along v
+    :return: Triangle array (2 * n_u * n_v, 3, 3), counter-clockwise seen from outside
+    """
+    u, v = np.meshgrid(np.linspace(0, 1, n_u + 1), np.linspace(0, 1, n_v + 1), indexing='ij')
+    p = np.stack(point(u, v), axis=-1)
+
+    a, b, c, d = p[:-1, :-1], p[1:, :-1], p[1:, 1:], p[:-1, 1:]
+
+    return np.concatenate([np.stack([a, b, c], axis=-2).reshape(-1, 3, 3),
+                           np.stack([a, c, d], axis=-2).reshape(-1, 3, 3)])
+
+
+def ellipsoid_mesh(a, b, c, segments=96):
+    def point(u, v):
+        lon, lat = 2 * np.pi * u, np.pi * (v - 0.5)
+        return a * np.cos(lat) * np.cos(lon), b * np.cos(lat) * np.sin(lon), c * np.sin(lat)
+
+    return quad_grid(point, segments, segments // 2)
+
+
+def box_mesh(size, centre=(0, 0, 0)):
+    """
+    :param size: Box edge lengths (x, y, z)
+    :param centre: Box centre
+    :return: Triangle array (12, 3, 3)
+    """
+    corners = np.array([[x, y, z] for x in (-0.5, 0.5) for y in (-0.5, 0.5) for z in (-0.5, 0.5)])
+    corners = corners * size + centre
+
+    # quads, counter-clockwise seen from outside
+    faces = [(0, 1, 3, 2), (4, 6, 7, 5), (0, 4, 5, 1), (2, 3, 7, 6), (0, 2, 6, 4), (1, 5, 7, 3)]
+
+    return np.array([corners[list(tri)] for a, b, c, d in faces for tri in ((a, b, c), (a, c, d))])
+
+
+def cylinder_mesh(radius, height, segments=96):
+    """
+    Closed cylinder along z axis, centred on origin
+    """
+    def side(u, v):
+        angle = 2 * np.pi * u
+        return radius * np.cos(angle), radius * np.sin(angle), height * (v - 0.5)
+
+    def cap(z, flip):
+        angle = 2 * np.pi * np.arange(segments + 1) / segments
+        rim = np.stack([radius * np.cos(angle), radius * np.sin(angle), np.full(segments + 1, z)], axis=-1)
+        centre = np.broadcast_to([0, 0, z], (segments, 3))
+        a, b = (rim[1:], rim[:-1]) if flip else (rim[:-1], rim[1:])
+        return np.stack([centre, a, b], axis=1)
+
+    return np.concatenate([quad_grid(side, segments, 1), cap(height / 2, False), cap(-height / 2, True)])
+
+
+# ANALYTIC PROJECTED AREAS (d: unit view directions (N, 3))
+
+def convex_hull(points):
+    """
+    2D convex hull (monotone chain)
+    :param points: Array (P, 2)
+    :return: Hull vertices (H, 2), counter-clockwise
+    """
+    points = sorted(map(tuple, np.round(points, 12)))
+
+    def cross(o, a, b):
+        return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+    def half(sequence):
+        chain = []
+        for p in sequence:
+            while len(chain) >= 2 and cross(chain[-2], chain[-1], p) <= 0:
+                chain.pop()
+            chain.append(p)
+        return chain[:-1]
+
+    return np.array(half(points) + half(reversed(points)))
+
+
+def polygon_area(polygon):
+    """
+    Shoelace formula
+    """
+    if len(polygon) < 3:
+        return 0.0
+
+    x, y = polygon[:, 0], polygon[:, 1]
+    return 0.5 * abs(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1)))
+
+
+def clip_convex(subject, clip):
+    """
+    Intersection of convex polygons (Sutherland-Hodgman)
+    :param subject: Polygon (P, 2)
+    :param clip: Convex polygon (Q, 2), counter-clockwise
+    :return: Intersection polygon (R, 2)
+    """
+    output = list(subject)
+
+    for a, b in zip(clip, np.roll(clip, -1, axis=0)):
+        if not output:
+            break
+
+        def inside(p):
+            return (b[0] - a[0]) * (p[1] - a[1]) - (b[1] - a[1]) * (p[0] - a[0]) >= 0
+
+        def intersect(p, q):
+            dp, dq = p - q, a - b
+            denom = dp[0] * dq[1] - dp[1] * dq[0]
+            t = ((p[0] - a[0]) * dq[1] - (p[1] - a[1]) * dq[0]) / denom
+            return p - t * dp
+
+        points, output = output, []
+        for p, q in zip(points, points[1:] + points[:1]):
+            if inside(q):
+                if not inside(p):
+                    output.append(intersect(p, q))
+                output.append(q)
+            elif inside(p):
+                output.append(intersect(p, q))
+
+    return np.array(output)
+
+
+def boxes_union_area(boxes, long, lat):
+    """
+    Projected area of union of two boxes: A1 + A2 - A(P1 n P2), with exact convex clipping
+    :param boxes: Two (size, centre) tuples
+    """
+    right, up, _ = camera_basis(long, lat)
+
+    hulls = []
+    for size, centre in boxes:
+        corners = box_mesh(size, centre).reshape(-1, 3)
+        hulls.append(convex_hull(np.stack([corners @ right, corners @ up], axis=-1)))
+
+    overlap = clip_convex(hulls[0], hulls[1])
+
+    return polygon_area(hulls[0]) + polygon_area(hulls[1]) - polygon_area(overlap)
+
+
+TWO_BOXES = (((1.2, 0.5, 0.5), (-0.3, 0, 0)), ((0.5, 1.0, 0.6), (0.35, 0.2, 0.25)))
+
+
+def primitives(segments=96):
+    """
+    Benchmark primitives
+    :param segments: Tessellation segments of curved primitives
+    :return: dict: name -> (triangles, reference function (long, lat) -> area, bounding radius)
+    """
+    def view(long, lat):
+        return np.abs(camera_basis(long, lat)[2])
+
+    return {
+        'sphere': (ellipsoid_mesh(1, 1, 1, segments), lambda lo, la: np.pi, 1),
+        'cube': (box_mesh((1, 1, 1)), lambda lo, la: view(lo, la).sum(), np.sqrt(3) / 2),
+        'cylinder': (cylinder_mesh(0.5, 1.5, segments),
+                     lambda lo, la: 2 * 0.5 * 1.5 * np.sqrt(1 - view(lo, la)[2] ** 2) + np.pi * 0.25 * view(lo, la)[2],
+                     np.hypot(0.5, 0.75)),
+        'ellipsoid': (ellipsoid_mesh(1, 0.6, 0.3, segments),
+                      lambda lo, la: np.pi * np.sqrt(np.dot([0.18 ** 2, 0.3 ** 2, 0.6 ** 2], view(lo, la) ** 2)), 1),
+        'two_boxes': (np.concatenate([box_mesh(*box) for box in TWO_BOXES]),
+                      lambda lo, la: boxes_union_area(TWO_BOXES, lo, la), 1.1),
+    }
+
+
+# BACKENDS: function (triangles, directions, ortho_scale, render_res) -> areas (world units)
+
+def raster_backend(triangles, directions, ortho_scale, render_res):
+    from .projection import pixel_size
+    from .raster import coverage_count
+
+    pixel_area = pixel_size(ortho_scale, render_res) ** 2
+    return [coverage_count(triangles, long, lat, ortho_scale, render_res) * pixel_area for long, lat in directions]
+
+
+def exact_backend(triangles, directions, ortho_scale, render_res):
+    from .exact import direction_areas
+    return direction_areas(triangles, directions)
+
+
+def silhouette_backend(triangles, directions, ortho_scale, render_res):
+    from .silhouette import SilhouetteIndex, direction_areas
+    return direction_areas(SilhouetteIndex(triangles), directions)
+
+
+def blender_backend(triangles, directions, ortho_scale, render_res):
+    """
+    Run primitive through Blender render loop: setup, then background.render_profile
+    """
+    import os
+    import tempfile
+    try:
+        import bpy
+    except ImportError:
+        raise Exception('blender backend only available inside Blender, see benchmark.py')
+    from . import background, setup
+    from .projection import pixel_size
+
+    scene = bpy.context.scene
+
+    # source object
+    mesh = bpy.data.meshes.new('XS360 Benchmark')
+    mesh.from_pydata(triangles.reshape(-1, 3).tolist(), [], np.arange(len(triangles) * 3).reshape(-1, 3).tolist())
+    obj = bpy.data.objects.new('XS360 Benchmark', mesh)
+    source = bpy.data.collections.new('XS360 Benchmark')
+    scene.collection.children.link(source)
+    source.objects.link(obj)
+
+    camera = setup.apply_setup(source)
+    camera.data.ortho_scale = ortho_scale
+    scene.render.resolution_x, scene.render.resolution_y = render_res
+    scene.render.resolution_percentage = 100
+
+    render_file = os.path.join(tempfile.gettempdir(), 'xs360_benchmark.png')
+    scene.render.filepath = render_file
+
+    try:
+        raw, _, _ = background.render_profile(camera, 20, directions, render_file, background.Suppressor())
+    finally:
+        # remove setup output (and source) again
+        output = camera.users_collection[0]
+        for collection in (output, source):
+            for member in list(collection.objects):
+                bpy.data.objects.remove(member)
+            bpy.data.collections.remove(collection)
+        bpy.data.meshes.remove(mesh)
+
+    pixel_area = pixel_size(ortho_scale, render_res) ** 2
+    return [value * pixel_area for value in raw]
+
+
+BACKENDS = {'raster': raster_backend, 'exact': exact_backend, 'silhouette': silhouette_backend,
+            'blender': blender_backend}
+
+# backends whose result does not depend on render resolution
+RESOLUTION_INDEPENDENT = ('exact', 'silhouette')
+
+
+def run_benchmark(backends, render_resolutions, profile_resolutions, names=None, segments=96):
+    """
+    Run benchmark sweep
+    :param backends: Backend names (BACKENDS)
+    :param render_resolutions: Render resolutions (square, pixels)
+    :param profile_resolutions: Profile resolutions ((x, y) tuples)
+    :param names: Primitive names; if None, all
+    :param segments: Tessellation segments of curved primitives
+    :return: List of result dicts
+    """
+    results = []
+
+    for name, (triangles, reference, radius) in primitives(segments).items():
+        if names is not None and name not in names:
+            continue
+
+        ortho_scale = 2.2 * radius  # primitive in frame from every direction
+
+        for resolution in profile_resolutions:
+            long, lat = Equirectangular.Pixel.grid_to_spherical(resolution)
+            directions = list(zip(long, lat))
+            expected = np.array([reference(lo, la) for lo, la in directions])
+
+            for backend in backends:
+                render_sweep = [None] if backend in RESOLUTION_INDEPENDENT else render_resolutions
+
+                for render_res in render_sweep:
+                    start = time()
+                    areas = np.array(BACKENDS[backend](triangles, directions, ortho_scale, (render_res, render_res)))
+                    seconds = time() - start
+
+                    error = np.abs(areas - expected) / expected
+                    results.append({
+                        'primitive': name,
+                        'backend': backend,
+                        'render_res': render_res,
+                        'profile_res': list(resolution),
+                        'triangles': len(triangles),
+                        'mean_error': float(error.mean()),
+                        'max_error': float(error.max()),
+                        'seconds_per_view': seconds / len(directions),
+                        'wall_time': seconds,
+                    })
+                    print(format_row(results[-1]))
+
+    return results
+
+
+TABLE_HEADER = f"{'primitive':<10} {'backend':<10} {'render':>6} {'profile':>8} " \
+               f"{'mean err %':>10} {'max err %':>10} {'s/view':>9} {'wall s':>8}"
+
+
+def format_row(result):
+    render = result['render_res'] if result['render_res'] is not None else '-'
+    profile = 'x'.join(str(r) for r in result['profile_res'])
+
+    return (f"{result['primitive']:<10} {result['backend']:<10} {render:>6} {profile:>8} "
+            f"{result['mean_error'] * 100:>10.4f} {result['max_error'] * 100:>10.4f} "
+            f"{result['seconds_per_view']:>9.4f} {result['wall_time']:>8.2f}")
+
+
+def main(argv=None):
+    """
+    Run "bench" command; entry point inside Blender (script arguments follow "--")
+    """
+    from .__main__ import main as cli
+
+    if argv is None:
+        argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else sys.argv[1:]
+
+    cli(['bench'] + argv)
@@ -1,8 +1,10 @@
 # import sys
 # import os
 import bpy
+import json
 from bpy_extras.io_utils import ExportHelper
-from subprocess import Popen, CREATE_NEW_CONSOLE
+import os
+import subprocess
 
 # set local path & allow local imports
 # filepath = bpy.path.abspath("//")
@@ -10,9 +12,39 @@ from subprocess import Popen, CREATE_NEW_CONSOLE
 # sys.path.append(__file__)
 # os.chdir(filepath)
 
-from .setup import apply_setup
-from .equirectangular import Equirectangular
+from .setup import apply_setup, write_worker_file, WORKER_SCENE, STRIP_PROPERTY
+from .equirectangular import Equirectangular, Window
 from . import xstools
+from .channel import ProgressReceiver, describe
+from .supervisor import JobSupervisor, QUEUED, RUNNING, CANCELLING
+
+# progress events from background processes (see channel.py); created on register
+progress_receiver: ProgressReceiver = None
+
+# background jobs (see supervisor.py)
+supervisor = JobSupervisor()
+
+# seconds between progress / job polls
+PROGRESS_POLL_INTERVAL = 0.5
+
+
+def poll_progress():
+    """
+    Timer: update background jobs, read progress events and redraw XSection360 panel
+    :return: Seconds until next call
+    """
+    changed = supervisor.update()
+
+    if progress_receiver is not None and progress_receiver.poll():
+        changed = True
+
+    if changed:
+        for window in bpy.context.window_manager.windows:
+            for area in window.screen.areas:
+                if area.type == 'PROPERTIES':
+                    area.tag_redraw()
+
+    return PROGRESS_POLL_INTERVAL
 
 
 class XS360PanelSettings:
@@ -50,14 +82,88 @@ class XS360Panel(XS360PanelSettings, bpy.types.Panel):
         row.prop(xs360, "output_x", text="X")
         row.prop(xs360, "output_y", text="Y")
 
+        # angular region of interest
+        layout.prop(xs360, "window_mode")
+        if xs360.window_mode != 'NONE':
+            axes = ("Long", "Lat") if xs360.window_mode == 'LONLAT' else ("Beta", "Alpha")
+            col = layout.column(align=True)
+            row = col.row(align=True)
+            row.prop(xs360, "window_x", text=axes[0])
+            row = col.row(align=True)
+            row.prop(xs360, "window_y", text=axes[1])
+
+        # render border per view
+        layout.prop(xs360, "auto_border")
+
+        # render resolution calibration
+        row = layout.row(align=True)
+        row.prop(xs360, "auto_resolution", text="")
+        sub = row.row(align=True)
+        sub.active = xs360.auto_resolution
+        sub.prop(xs360, "target_error")
+
+        # re-render edge tiles at higher resolution
+        row = layout.row(align=True)
+        row.prop(xs360, "supersample")
+        sub = row.row(align=True)
+        sub.active = xs360.supersample > 1
+        sub.prop(xs360, "supersample_tile")
+
+        # centroid & second moments output
+        layout.prop(xs360, "moments")
+
+        # profile sequence (animated geometry)
+        layout.prop(xs360, "sequence")
+
+        # result cache
+        row = layout.row(align=True)
+        row.prop(xs360, "use_cache", text="")
+        sub = row.row(align=True)
+        sub.active = xs360.use_cache
+        sub.prop(xs360, "cache_file", text="Cache")
+
+        # per-object area cache (Per-Object Areas setup)
+        row = layout.row()
+        row.active = xs360.use_cache
+        row.prop(xs360, "incremental")
+
         # run button
         row = layout.row()
         row.scale_y = 2.0
         row.operator("wm.run_xs360", text="Run")
+        layout.operator("wm.xs360_queue_all")
 
         # open in new console bool
         layout.prop(xs360, "new_console")
 
+        # slim worker .blend
+        layout.prop(xs360, "use_worker_file")
+
+        # background jobs
+        if supervisor.jobs:
+            box = layout.box()
+            box.prop(xs360, "max_jobs")
+
+            for index, job in enumerate(supervisor.jobs):
+                row = box.row(align=True)
+
+                # state; progress while running
+                text = f"{job.name}: {job.state}"
+                event = progress_receiver.events.get(job.name) if progress_receiver is not None else None
+                if job.state == RUNNING and event is not None:
+                    text = f"{job.name}: {describe(event)}"
+                row.label(text=text)
+
+                if job.state in (QUEUED, RUNNING):
+                    row.operator("wm.xs360_cancel_job", text="", icon='CANCEL').index = index
+                elif job.state != CANCELLING:
+                    row.operator("wm.xs360_restart_job", text="", icon='FILE_REFRESH').index = index
+
+            box.operator("wm.xs360_clear_jobs")
+
+        # export geometry snapshot (for Blender-free processing)
+        layout.operator("wm.xs360_export_snapshot", icon="EXPORT")
+
 
 class XS360SetupSub(XS360PanelSettings, bpy.types.Panel):
     """
@@ -76,6 +182,28 @@ class XS360SetupSub(XS360PanelSettings, bpy.types.Panel):
         # target collection
         layout.prop(xs360, "setup_collection")
 
+        # ID colour per object: per-component areas from the same renders
+        layout.prop(xs360, "components")
+
+        # remove faces hidden from every direction (CAD interiors)
+        layout.prop(xs360, "strip_interior")
+        row = layout.row()
+        row.enabled = xs360.strip_interior
+        row.prop(xs360, "strip_tolerance")
+
+        # average renders down in compositor: few pixels read per view
+        layout.prop(xs360, "reduction_tiles")
+
+        # rotating parts (rotors, propellers) averaged over rotation phase
+        layout.prop(xs360, "rotor_collection")
+        col = layout.column()
+        col.enabled = xs360.rotor_collection is not None
+        row = col.row()
+        row.prop(xs360, "rotor_axis", expand=True)
+        row = col.row(align=True)
+        row.prop(xs360, "rotor_method", text="")
+        row.prop(xs360, "rotor_phases")
+
         # setup button
         layout.operator("wm.setup_xs360")
 
@@ -111,6 +239,9 @@ class XS360CameraSub(XS360PanelSettings, bpy.types.Panel):
             row.prop(xs360, "debug_camera", text='')  # do debug?
             row.prop(xs360, "pixel_debug", text='Pixel')  # pixel position to debug
 
+            # geometry in frame from every profile direction?
+            layout.operator('wm.xs360_check_frame')
+
     @staticmethod
     def do_camera_debug(self, context):
         """
@@ -135,8 +266,12 @@ class XS360CameraSub(XS360PanelSettings, bpy.types.Panel):
         # get pixel coordinate
         coord = xstools.OutImage.pixel_to_coord(pixel, rX)
 
-        # get projected longitude and latitude
-        long, lat = Equirectangular.Pixel.coord_to_spherical(coord, (rX, rY))
+        # get projected longitude and latitude (within angular window, if set)
+        window = XS360Properties.get_window(context.scene)
+        if window is None:
+            long, lat = Equirectangular.Pixel.coord_to_spherical(coord, (rX, rY))
+        else:
+            long, lat = window.coord_to_spherical(coord, (rX, rY))
 
         # apply to debug
         camera = self.camera_360
@@ -167,6 +302,42 @@ class XS360FileSelect(bpy.types.Operator, ExportHelper):
         return {'FINISHED'}
 
 
+class XS360ExportSnapshot(bpy.types.Operator, ExportHelper):
+    """Export Output geometry and camera to snapshot, for processing without Blender"""
+    bl_idname = 'wm.xs360_export_snapshot'
+    bl_label = 'Export Snapshot'
+
+    filename_ext = ".npz"
+
+    filter_glob: bpy.props.StringProperty(
+        default="*.npz",
+        options={'HIDDEN'},
+        maxlen=255,
+    )
+
+    def execute(self, context):
+        from .snapshot import Snapshot
+
+        xs360 = context.scene.xs360
+        camera = xs360.camera_360
+
+        # setup places camera in Output collection
+        collection = camera.users_collection[0]
+
+        snapshot = Snapshot.from_scene(context.scene, collection, xs360.camera_distance, camera)
+        snapshot.save(self.filepath)
+
+        self.report({'INFO'}, f"Exported {len(snapshot.triangles)} triangles to {self.filepath}")
+        return {'FINISHED'}
+
+    @classmethod
+    def poll(cls, context):
+        """
+        Only enable if XSection360 camera has been set
+        """
+        return context.scene.xs360.camera_360 is not None
+
+
 class RunXS360(bpy.types.Operator):
     """
     Run XSection360 on current scene
@@ -177,34 +348,130 @@ class RunXS360(bpy.types.Operator):
 
     def execute(self, context):
         blend_file = bpy.data.filepath  # get blend file path
-        xs360 = context.scene.xs360
+
+        unsupported = self.sequence_conflicts(context.scene)
+        if unsupported:
+            self.report({'ERROR'}, f"{', '.join(unsupported)} not supported with profile sequences")
+            return {'CANCELLED'}
 
         # save blend file
         bpy.ops.wm.save_as_mainfile(filepath=blend_file)
 
-        # get usable variables
-        scene = context.scene.name
-        save_file = bpy.path.abspath(xs360.output_file)
-        distance = xs360.camera_distance
+        self.submit(context.scene, blend_file)
 
-        # set creation flags - open in new console?
+        return {'FINISHED'}
+
+    @staticmethod
+    def sequence_conflicts(scene):
+        """
+        Find enabled options which profile sequences do not support
+        :param scene: Target scene (XSection360 settings)
+        :return: List of option names (empty if none, or not a sequence)
+        """
+        xs360 = scene.xs360
+        if xs360.sequence == 'NONE':
+            return []
+
+        options = (("Auto Resolution", xs360.auto_resolution), ("Centroid & Moments", xs360.moments),
+                   ("Supersample", xs360.supersample > 1))
+        return [name for name, used in options if used]
+
+    @staticmethod
+    def submit(scene, blend_file):
+        """
+        Queue background job for scene (started when a job slot is free)
+        :param scene: Target scene
+        :param blend_file: Saved blend file
+        :return: Job
+        """
+        xs360 = scene.xs360
+
+        # set creation flags - open in new console? (Windows only)
         flags = 0
         if xs360.new_console:
-            flags = CREATE_NEW_CONSOLE
+            flags = getattr(subprocess, 'CREATE_NEW_CONSOLE', 0)
+
+        name = supervisor.next_name(scene.name)
+        scene_name = scene.name
+
+        # slim worker file: faster to load, less memory per process
+        if xs360.use_worker_file and xs360.camera_360 is not None:
+            base, extension = os.path.splitext(blend_file)
+            worker_file = f'{base}_xs360_{bpy.path.clean_name(scene.name)}{extension}'
+
+            write_worker_file(scene, xs360.camera_360, worker_file)
+            blend_file, scene_name = worker_file, WORKER_SCENE
+
+        command = RunXS360.build_command(scene, blend_file, scene_name, name)
+        print(" ".join(command))
+
+        # run background script
+        return supervisor.submit(name, command, flags)
+
+    @staticmethod
+    def build_command(scene, blend_file, scene_name, job_name):
+        """
+        Build background process command line for scene
+        :param scene: Target scene (XSection360 settings)
+        :param blend_file: Saved blend file (or worker file)
+        :param scene_name: Name of scene in blend_file
+        :param job_name: Job name (progress job id)
+        :return: Command (list)
+        """
+        xs360 = scene.xs360
+
+        # get usable variables
+        save_file = bpy.path.abspath(xs360.output_file)
+        distance = xs360.camera_distance
 
         # get output profile resolution
-        x, y = XS360Properties.get_resolution(context.scene)
+        x, y = XS360Properties.get_resolution(scene)
 
         from . import background
-        command = ['blender',  blend_file, '--background', '--python', background.__file__, '--',
-                   f'--scene={scene}',
+        command = ['blender',  blend_file, '--background', '--python-exit-code', '1',
+                   '--python', background.__file__, '--',
+                   f'--scene={scene_name}',
                    f'--file={save_file}', f'-x={x}', f'-y={y}', f'--distance={distance}']
-        print(" ".join(command))
 
-        # run background script
-        Popen(command, creationflags=flags)
+        # only sample angular window
+        if xs360.window_mode != 'NONE':
+            command.append(f'--window={XS360Properties.get_window(scene)}')
 
-        return {'FINISHED'}
+        # only render region of each view which can contain geometry
+        if xs360.auto_border:
+            command.append('--auto-border')
+
+        # calibrate render resolution for target precision
+        if xs360.auto_resolution:
+            command.append(f'--target-error={xs360.target_error / 100}')
+
+        # edge-adaptive supersampling
+        if xs360.supersample > 1:
+            command += [f'--supersample={xs360.supersample}', f'--supersample-tile={xs360.supersample_tile}']
+
+        # silhouette centroid & second moments
+        if xs360.moments:
+            command.append('--moments')
+
+        # report progress to XSection360 panel
+        if progress_receiver is not None:
+            command += [f'--progress-port={progress_receiver.port}', f'--job-id={job_name}']
+
+        # one profile per frame / shape key state, stacked into .npz
+        if xs360.sequence == 'FRAMES':
+            command.append(f'--frames={scene.frame_start}:{scene.frame_end}:{scene.frame_step}')
+        elif xs360.sequence == 'SHAPE_KEYS':
+            command.append('--shape-keys')
+
+        # reuse previously rendered directions
+        if xs360.use_cache:
+            command.append(f'--cache={bpy.path.abspath(xs360.cache_file)}')
+
+            # per-object areas: only re-render changed objects (also across sequence states)
+            if xs360.incremental:
+                command.append('--incremental')
+
+        return command
 
     @classmethod
     def poll(cls, context):
@@ -214,10 +481,100 @@ class RunXS360(bpy.types.Operator):
         return context.scene.camera is not None
 
 
+class QueueAllXS360(bpy.types.Operator):
+    """
+    Queue XSection360 jobs for every scene with a camera (each scene uses its own XSection360 settings)
+    """
+    bl_idname = 'wm.xs360_queue_all'
+    bl_label = 'Queue All Scenes'
+
+    def execute(self, context):
+        blend_file = bpy.data.filepath
+
+        # save blend file
+        bpy.ops.wm.save_as_mainfile(filepath=blend_file)
+
+        scenes = [scene for scene in bpy.data.scenes if scene.camera is not None]
+        skipped = [scene.name for scene in scenes if RunXS360.sequence_conflicts(scene)]
+        for scene in scenes:
+            if scene.name not in skipped:
+                RunXS360.submit(scene, blend_file)
+
+        self.report({'INFO'}, f"Queued {len(scenes) - len(skipped)} XSection360 jobs")
+        if skipped:
+            self.report({'WARNING'}, f"Skipped (options not supported with profile sequences): {', '.join(skipped)}")
+        return {'FINISHED'}
+
+
+class XS360CancelJob(bpy.types.Operator):
+    """Cancel background job (progress is checkpointed and resumed on restart)"""
+    bl_idname = 'wm.xs360_cancel_job'
+    bl_label = 'Cancel Job'
+
+    index: bpy.props.IntProperty()
+
+    def execute(self, context):
+        supervisor.cancel(supervisor.jobs[self.index])
+        return {'FINISHED'}
+
+
+class XS360RestartJob(bpy.types.Operator):
+    """Restart background job (resumes from checkpoint if cancelled)"""
+    bl_idname = 'wm.xs360_restart_job'
+    bl_label = 'Restart Job'
+
+    index: bpy.props.IntProperty()
+
+    def execute(self, context):
+        supervisor.restart(supervisor.jobs[self.index])
+        return {'FINISHED'}
+
+
+class XS360ClearJobs(bpy.types.Operator):
+    """Remove ended jobs from list"""
+    bl_idname = 'wm.xs360_clear_jobs'
+    bl_label = 'Clear Ended Jobs'
+
+    def execute(self, context):
+        supervisor.clear()
+        return {'FINISHED'}
+
+
+class XS360CheckFrame(bpy.types.Operator):
+    """
+    Check Output geometry stays within camera frame for every profile direction
+    """
+    bl_idname = 'wm.xs360_check_frame'
+    bl_label = 'Check Frame'
+    bl_description = 'Check geometry stays within camera frame for every profile direction'
+
+    def execute(self, context):
+        from . import background
+
+        scene = context.scene
+        directions = background.profile_directions(XS360Properties.get_resolution(scene),
+                                                   XS360Properties.get_window(scene))
+
+        try:
+            background.check_frame(scene, scene.xs360.camera_360, directions, xstools.get_render_resolution(scene))
+        except background.FrameClipped as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+
+        self.report({'INFO'}, f'Geometry in frame in all {len(directions)} directions')
+        return {'FINISHED'}
+
+    @classmethod
+    def poll(cls, context):
+        return context.scene.xs360.camera_360 is not None
+
+
 class SetupXS360(bpy.types.Operator):
     """
     Setup scene for XSection360 rendering:
         -Copy mesh objects in target collection to new collection
+        -Optionally strip interior faces from the copies (from the rest pose: rotating parts are kept whole,
+         and do not hide other faces, as they uncover them at other phases)
         -Create new camera
         -Configure render settings
         -etc...
@@ -229,8 +586,25 @@ class SetupXS360(bpy.types.Operator):
     def execute(self, context):
         collection = context.scene.xs360.setup_collection
 
-        new_cam = apply_setup(collection)
-        context.scene.xs360.camera_360 = new_cam
+        xs360 = context.scene.xs360
+        try:
+            new_cam = apply_setup(collection, xs360.components, xs360.strip_interior, xs360.strip_tolerance / 100,
+                                  xs360.reduction_tiles, xs360.rotor_collection, xs360.rotor_axis,
+                                  xs360.rotor_method, xs360.rotor_phases)
+        except Exception as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+        xs360.camera_360 = new_cam
+
+        output = new_cam.users_collection[0]
+        if STRIP_PROPERTY in output:
+            report = json.loads(output[STRIP_PROPERTY])
+            if report['stripped']:
+                self.report({'INFO'}, f"Interior stripped: {report['triangles']} -> {report['kept_triangles']} "
+                                      f"triangles (max area change {report['area_change']:.4%})")
+            else:
+                self.report({'WARNING'}, f"Interior not stripped: area change {report['area_change']:.4%} "
+                                         f"exceeds tolerance")
 
         return {'FINISHED'}
 
@@ -245,6 +619,69 @@ class XS360Properties(bpy.types.PropertyGroup):
         name="Target",
         description="Collection from which mesh is extracted on setup"
     )
+    components: bpy.props.BoolProperty(
+        name="Per-Object Areas",
+        default=False,
+        description="Give each object an ID colour on setup, so the visible area of every object is measured "
+                    "in the same renders as the total (_components.npz output)"
+    )
+    strip_interior: bpy.props.BoolProperty(
+        name="Strip Interior",
+        default=False,
+        description="Remove faces hidden from every direction (internal structure) from the copied objects, "
+                    "so each render draws fewer triangles. Modifiers are applied to the copies. Rotating Parts "
+                    "are kept whole and do not hide other faces (visibility is found in the rest pose only)"
+    )
+    strip_tolerance: bpy.props.FloatProperty(
+        name="Tolerance (%)",
+        default=0.1,
+        min=0,
+        description="Maximum area change (percent) at check directions; if exceeded, nothing is stripped"
+    )
+    reduction_tiles: bpy.props.IntProperty(
+        name="Compositor Reduction",
+        default=0,
+        min=0,
+        description="If non-zero, renders are averaged down in the compositor to a tile grid of at least this "
+                    "size, so background renders read a few floats per view instead of the full image "
+                    "(total area only; needs render resolution divisible by 2; at least 3 for in-run frame edge "
+                    "checks; 0 = off)"
+    )
+    rotor_collection: bpy.props.PointerProperty(
+        type=bpy.types.Collection,
+        name="Rotating Parts",
+        description="Objects (also in the target collection) turning about their origin, e.g. rotors and "
+                    "propellers: on setup, their copies are driven through one revolution per frame so each "
+                    "view's area is averaged over rotation phase"
+    )
+    rotor_axis: bpy.props.EnumProperty(
+        name="Axis",
+        items=(
+            ('X', "X", "Rotate about local X axis"),
+            ('Y', "Y", "Rotate about local Y axis"),
+            ('Z', "Z", "Rotate about local Z axis"),
+        ),
+        default='Z',
+        description="Local rotation axis of rotating parts"
+    )
+    rotor_method: bpy.props.EnumProperty(
+        name="Averaging",
+        items=(
+            ('BLUR', "Motion Blur", "One render per view, motion blurred over a full revolution "
+                                    "(not with Per-Object Areas)"),
+            ('PHASES', "Phase Renders", "Render each view at evenly spaced phases and average (exact phases; "
+                                        "renders per view = phases)"),
+        ),
+        default='BLUR',
+        description="How views are averaged over rotation phase"
+    )
+    rotor_phases: bpy.props.IntProperty(
+        name="Phases",
+        default=16,
+        min=2,
+        max=256,
+        description="Motion blur steps, or renders per view, over one revolution"
+    )
 
     # camera
     camera_360: bpy.props.PointerProperty(
@@ -281,6 +718,109 @@ class XS360Properties(bpy.types.PropertyGroup):
         default=True,
         description="Run background XSection360 process in new console (or in Blender console)"
     )
+    use_worker_file: bpy.props.BoolProperty(
+        name="Slim Worker File",
+        default=True,
+        description="Background processes load a minimal .blend (Output collection, camera, world, render settings) "
+                    "instead of the full working file"
+    )
+    max_jobs: bpy.props.IntProperty(
+        name="Concurrent Jobs",
+        description="Maximum number of background jobs running at once (default: half the CPU cores)",
+        default=supervisor.max_jobs,
+        min=1,
+        update=lambda self, context: setattr(supervisor, 'max_jobs', self.max_jobs)
+    )
+    window_mode: bpy.props.EnumProperty(
+        name="Window",
+        items=(
+            ('NONE', "Full Sphere", "Sample all directions"),
+            ('LONLAT', "Longitude / Latitude", "Only sample longitude & latitude window, at profile resolution"),
+            ('ALPHABETA', "Alpha / Beta", "Only sample angle of attack (alpha) & sideslip (beta) window, "
+                                          "at profile resolution (image x axis: beta)"),
+        ),
+        default='NONE',
+        description="Angular region of interest: profile resolution is spread over the window only"
+    )
+    window_x: bpy.props.FloatVectorProperty(
+        name="Window X",
+        description="Min & max of image x axis (degrees): longitude, or sideslip beta",
+        size=2,
+        default=(-20, 20),
+        min=-180,
+        max=180
+    )
+    window_y: bpy.props.FloatVectorProperty(
+        name="Window Y",
+        description="Min & max of image y axis (degrees): latitude, or angle of attack alpha",
+        size=2,
+        default=(-30, 30),
+        min=-90,
+        max=90
+    )
+    auto_border: bpy.props.BoolProperty(
+        name="Auto Render Border",
+        default=False,
+        description="Only render the region of each view which can contain geometry (same pixel size, fewer pixels)"
+    )
+    auto_resolution: bpy.props.BoolProperty(
+        name="Auto Render Resolution",
+        default=False,
+        description="Calibrate render resolution before run: smallest resolution meeting the target area error"
+    )
+    target_error: bpy.props.FloatProperty(
+        name="Target Error %",
+        description="Maximum estimated relative area error (percent) for render resolution calibration",
+        default=1.0,
+        min=0.001,
+        max=50
+    )
+    supersample: bpy.props.IntProperty(
+        name="Edge Supersampling",
+        description="Re-render only the silhouette edge tiles of each view at this factor x render resolution "
+                    "(1: off; total area only)",
+        default=1,
+        min=1,
+        max=16
+    )
+    supersample_tile: bpy.props.IntProperty(
+        name="Tile",
+        description="Edge supersampling tile size (render pixels)",
+        default=16,
+        min=2,
+        max=256
+    )
+    moments: bpy.props.BoolProperty(
+        name="Centroid & Moments",
+        default=False,
+        description="Also output silhouette centroid and second moments for each direction (_moments.npz)"
+    )
+    sequence: bpy.props.EnumProperty(
+        name="Sequence",
+        items=(
+            ('NONE', "Single Profile", "Render one profile image"),
+            ('FRAMES', "Animation Frames", "Render one profile per frame of the scene frame range (.npz output)"),
+            ('SHAPE_KEYS', "Shape Keys", "Render one profile per named shape key state (.npz output)"),
+        ),
+        default='NONE',
+        description="Profile sequence for animated geometry; unchanged states reuse earlier results"
+    )
+    use_cache: bpy.props.BoolProperty(
+        name="Use Result Cache",
+        default=False,
+        description="Reuse directions already rendered with the same geometry, camera and render settings"
+    )
+    cache_file: bpy.props.StringProperty(
+        default="//xs360_cache.db",
+        description="Result cache file (shared between runs)"
+    )
+    incremental: bpy.props.BoolProperty(
+        name="Incremental (Per-Object Cache)",
+        default=False,
+        description="Cache visible area per object; on reruns only changed objects are rendered, and only in "
+                    "directions where their projected bounds overlap others' (needs Per-Object Areas setup "
+                    "and the result cache; Centroid & Moments unsupported)"
+    )
     output_x: bpy.props.IntProperty(
         name="X Resolution",
         description="X Resolution of Output Profile (not render)",
@@ -302,6 +842,18 @@ class XS360Properties(bpy.types.PropertyGroup):
         y = scene.xs360.output_y
         return x, y
 
+    @staticmethod
+    def get_window(scene):
+        """
+        :return: Angular window (equirectangular.Window); None for full sphere
+        """
+        xs360 = scene.xs360
+        if xs360.window_mode == 'NONE':
+            return None
+
+        mode = Window.LONLAT if xs360.window_mode == 'LONLAT' else Window.ALPHABETA
+        return Window(tuple(xs360.window_x), tuple(xs360.window_y), mode)
+
 
 classes = (
     XS360Panel,
@@ -309,8 +861,14 @@ classes = (
     XS360CameraSub,
     XS360Properties,
     XS360FileSelect,
+    XS360ExportSnapshot,
     RunXS360,
+    QueueAllXS360,
+    XS360CancelJob,
+    XS360RestartJob,
+    XS360ClearJobs,
     SetupXS360,
+    XS360CheckFrame,
 )
 
 
@@ -321,6 +879,11 @@ def register():
         register_class(cls)
 
     bpy.types.Scene.xs360 = bpy.props.PointerProperty(type=XS360Properties)
+
+    # receive background progress
+    global progress_receiver
+    progress_receiver = ProgressReceiver()
+    bpy.app.timers.register(poll_progress, persistent=True)
     return
 
 
@@ -329,6 +892,14 @@ def unregister():
 
     del bpy.types.Scene.xs360
 
+    supervisor.shutdown()
+
+    global progress_receiver
+    if bpy.app.timers.is_registered(poll_progress):
+        bpy.app.timers.unregister(poll_progress)
+    progress_receiver.close()
+    progress_receiver = None
+
     for cls in reversed(classes):
         unregister_class(cls)
     return
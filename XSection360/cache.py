@@ -0,0 +1,244 @@
+"""
+Persistent, content-addressed cache of raw profile samples.
+
+Samples are keyed by a hash of everything that affects a render (evaluated geometry,
+camera ortho scale, render resolution, engine settings) plus the exact profile direction.
+Reruns with a different output resolution or path therefore only render new directions.
+
+Profile pixels are sampled at their centres, so exact matches only occur between output
+resolutions that share pixel centres: odd multiples (e.g. 180x90 and 540x270), or equal
+windows. Doubling the resolution (180x90 -> 360x180) shares no directions. With a direction
+tolerance, a direction not cached exactly reuses the nearest cached direction within it
+(great circle angle), trading angular accuracy for reuse.
+"""
+
+import hashlib
+import json
+import math
+import sqlite3
+
+# directions are stored as integer micro-degrees, so equal directions match exactly
+DIRECTION_QUANTUM = 1e-6
+
+
+class ResultCache:
+    def __init__(self, file_path, max_entries=1000000, tolerance=0):
+        """
+        On-disk (sqlite) sample cache with least-recently-used eviction
+        :param file_path: Cache database file
+        :param max_entries: Maximum number of cached samples kept after eviction
+        :param tolerance: Direction tolerance (degrees): lookups without an exact match reuse the nearest
+            cached direction within it. If 0, exact matches only
+        """
+        self.file_path = file_path
+        self.max_entries = max_entries
+        self.tolerance = float(tolerance)
+
+        # statistics
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.closed_entries = 0
+
+        self.connection = sqlite3.connect(file_path)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS samples ('
+            'key TEXT, long INTEGER, lat INTEGER, value REAL, accessed INTEGER, '
+            'PRIMARY KEY (key, long, lat))'
+        )
+        self.connection.execute('CREATE INDEX IF NOT EXISTS samples_accessed ON samples (accessed)')
+        self.connection.commit()
+
+        # access counter: continues from most recent access
+        last = self.connection.execute('SELECT MAX(accessed) FROM samples').fetchone()[0]
+        self.clock = last or 0
+
+    @staticmethod
+    def make_key(geometry_hash, ortho_scale, render_res: tuple, engine_settings: dict = None):
+        """
+        Create cache key from render inputs
+        :param geometry_hash: Hash of evaluated geometry (snapshot.geometry_hash)
+        :param ortho_scale: Camera orthographic scale
+        :param render_res: Render resolution (x, y)
+        :param engine_settings: Other settings affecting the rendered result (JSON serialisable)
+        :return: Key string
+        """
+        params = {
+            'geometry': geometry_hash,
+            'ortho_scale': float(ortho_scale),
+            'render_res': [int(r) for r in render_res],
+            'engine': engine_settings or {},
+        }
+        return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+    @staticmethod
+    def quantize(long, lat):
+        """
+        Convert direction to exact integer cache coordinates
+        :param long: Longitude (degrees)
+        :param lat: Latitude (degrees)
+        :return: Quantized (long, lat)
+        """
+        return int(round(float(long) / DIRECTION_QUANTUM)), int(round(float(lat) / DIRECTION_QUANTUM))
+
+    @staticmethod
+    def angle(long_a, lat_a, long_b, lat_b):
+        """
+        Great circle angle between directions
+        :return: Angle (degrees)
+        """
+        lo_a, la_a, lo_b, la_b = (math.radians(v) for v in (long_a, lat_a, long_b, lat_b))
+        cos = math.sin(la_a) * math.sin(la_b) + math.cos(la_a) * math.cos(la_b) * math.cos(lo_a - lo_b)
+
+        return math.degrees(math.acos(max(-1.0, min(1.0, cos))))
+
+    def nearest(self, key, long, lat):
+        """
+        Find nearest cached direction within tolerance
+        :param key: Cache key (make_key)
+        :param long: Longitude (degrees)
+        :param lat: Latitude (degrees)
+        :return: (value, quantized long, quantized lat) of nearest direction, or None
+        """
+        tolerance = self.tolerance
+
+        # longitude span of tolerance circle widens towards the poles
+        reach = abs(lat) + tolerance
+        span = 180 if reach >= 90 else min(tolerance / math.cos(math.radians(reach)), 180)
+
+        lat_range = self.quantize(0, lat - tolerance)[1], self.quantize(0, lat + tolerance)[1]
+        (long_min, _), (long_max, _) = self.quantize(long - span, 0), self.quantize(long + span, 0)
+        turn = self.quantize(360, 0)[0]
+
+        # candidates, also across the +-180 longitude seam
+        rows = self.connection.execute(
+            'SELECT long, lat, value FROM samples WHERE key = ? AND lat BETWEEN ? AND ? AND '
+            '(long BETWEEN ? AND ? OR long BETWEEN ? AND ? OR long BETWEEN ? AND ?)',
+            (key, *lat_range, long_min, long_max, long_min - turn, long_max - turn, long_min + turn, long_max + turn)
+        ).fetchall()
+
+        best, best_angle = None, tolerance
+        for q_long, q_lat, value in rows:
+            angle = self.angle(long, lat, q_long * DIRECTION_QUANTUM, q_lat * DIRECTION_QUANTUM)
+            if angle <= best_angle:
+                best, best_angle = (value, q_long, q_lat), angle
+
+        return best
+
+    def tick(self):
+        self.clock += 1
+        return self.clock
+
+    def get(self, key, long, lat):
+        """
+        Retrieve cached sample
+        :param key: Cache key (make_key)
+        :param long: Longitude (degrees)
+        :param lat: Latitude (degrees)
+        :return: Cached value, or None if not cached
+        """
+        return self.get_many(key, [(long, lat)])[0]
+
+    def get_many(self, key, directions):
+        """
+        Retrieve cached samples for list of directions
+        :param key: Cache key (make_key)
+        :param directions: List of (long, lat) tuples
+        :return: List of cached values (None where not cached), in input order
+        """
+        results = []
+        touched = []
+
+        for long, lat in directions:
+            q_long, q_lat = self.quantize(long, lat)
+            row = self.connection.execute(
+                'SELECT value FROM samples WHERE key = ? AND long = ? AND lat = ?', (key, q_long, q_lat)
+            ).fetchone()
+
+            if row is None and self.tolerance > 0:
+                near = self.nearest(key, long, lat)
+                if near is not None:
+                    value, q_long, q_lat = near
+                    self.near_hits += 1
+                    results.append(value)
+                    touched.append((self.tick(), key, q_long, q_lat))
+                    continue
+
+            if row is None:
+                self.misses += 1
+                results.append(None)
+            else:
+                self.hits += 1
+                results.append(row[0])
+                touched.append((self.tick(), key, q_long, q_lat))
+
+        # update access order (LRU)
+        self.connection.executemany('UPDATE samples SET accessed = ? WHERE key = ? AND long = ? AND lat = ?', touched)
+        self.connection.commit()
+
+        return results
+
+    def put(self, key, long, lat, value, commit=True):
+        """
+        Store sample
+        :param key: Cache key (make_key)
+        :param long: Longitude (degrees)
+        :param lat: Latitude (degrees)
+        :param value: Raw sample value
+        :param commit: Commit immediately (otherwise call flush)
+        """
+        q_long, q_lat = self.quantize(long, lat)
+        self.connection.execute(
+            'INSERT OR REPLACE INTO samples (key, long, lat, value, accessed) VALUES (?, ?, ?, ?, ?)',
+            (key, q_long, q_lat, float(value), self.tick())
+        )
+
+        if commit:
+            self.connection.commit()
+
+    def flush(self):
+        """
+        Commit pending samples and apply size bound
+        """
+        self.evict()
+        self.connection.commit()
+
+    def evict(self):
+        """
+        Remove least recently used samples beyond max_entries
+        """
+        count = len(self)
+        excess = count - self.max_entries
+
+        if excess <= 0:
+            return
+
+        self.connection.execute(
+            'DELETE FROM samples WHERE rowid IN (SELECT rowid FROM samples ORDER BY accessed LIMIT ?)', (excess,)
+        )
+        self.evicted += excess
+
+    def close(self):
+        self.flush()
+        self.closed_entries = len(self)  # kept for summary
+        self.connection.close()
+        self.connection = None
+
+    def __len__(self):
+        if self.connection is None:
+            return self.closed_entries
+        return self.connection.execute('SELECT COUNT(*) FROM samples').fetchone()[0]
+
+    def summary(self):
+        """
+        Generate cache statistics message
+        :return: Summary string
+        """
+        hits = self.hits + self.near_hits
+        lookups = hits + self.misses
+        rate = round(100 * hits / lookups, 1) if lookups else 0
+        near = f' ({self.near_hits} within {self.tolerance:g} deg)' if self.tolerance > 0 else ''
+
+        return (f'Cache: {hits} hits{near}, {self.misses} misses ({rate}% hit rate), '
+                f'{self.evicted} evicted, {len(self)}/{self.max_entries} entries')
@@ -0,0 +1,102 @@
+"""
+Local progress channel from background XSection360 processes to the Blender UI.
+
+Background processes send throttled progress events (see progress.ProgressBar) as small
+JSON datagrams over UDP on localhost. Events are fire-and-forget: a missing receiver
+or a lost datagram never slows or stops the render loop.
+"""
+
+import json
+import socket
+from time import time
+
+HOST = '127.0.0.1'
+
+
+class ProgressSender:
+    def __init__(self, port, job_id):
+        """
+        Send progress events to receiver on local port
+        :param port: Receiver UDP port (ProgressReceiver.port)
+        :param job_id: Identifies sending job (several jobs may report to one receiver)
+        """
+        self.address = (HOST, port)
+        self.job_id = str(job_id)
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def send(self, stage, done, total, rate, eta, **extra):
+        """
+        Send progress event
+        :param stage: Current stage (e.g. "Rendering", "Processing")
+        :param done: Completed iterations
+        :param total: Total iterations
+        :param rate: Iterations per second
+        :param eta: Estimated seconds remaining
+        :param extra: Other event fields (e.g. state)
+        """
+        event = dict(job=self.job_id, stage=stage, done=done, total=total, rate=rate, eta=eta, time=time(), **extra)
+
+        try:
+            self.socket.sendto(json.dumps(event).encode(), self.address)
+        except OSError:
+            pass  # no receiver: progress is optional
+
+    def close(self):
+        self.socket.close()
+
+
+class ProgressReceiver:
+    def __init__(self, port=0):
+        """
+        Non-blocking receiver of progress events; keeps latest event per job
+        :param port: Local UDP port; 0 for any free port
+        """
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind((HOST, port))
+        self.socket.setblocking(False)
+
+        self.events = {}  # job id -> latest event
+
+    @property
+    def port(self):
+        return self.socket.getsockname()[1]
+
+    def poll(self):
+        """
+        Read all pending events
+        :return: True if any event was received
+        """
+        received = False
+
+        while True:
+            try:
+                data = self.socket.recv(65536)
+            except OSError:  # nothing pending
+                break
+
+            try:
+                event = json.loads(data)
+            except ValueError:
+                continue
+
+            self.events[event['job']] = event
+            received = True
+
+        return received
+
+    def close(self):
+        self.socket.close()
+
+
+def describe(event):
+    """
+    Format progress event for display
+    :param event: Progress event dict
+    :return: Short status string
+    """
+    from .progress import ProgressBar
+
+    percent = int(100 * event['done'] / event['total']) if event['total'] else 100
+    eta = ProgressBar.seconds_to_string(event['eta'])
+
+    return f"{event['stage']} {percent}% ({event['done']}/{event['total']}), {round(event['rate'], 1)}/s, {eta} left"
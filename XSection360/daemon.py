@@ -0,0 +1,384 @@
+"""
+Persistent background Blender worker (daemon), accepting jobs over a local Unix socket.
+
+Starting Blender, registering add-ons, loading the .blend and compiling Eevee shaders
+takes tens of seconds; a daemon pays this once and keeps the scene loaded and warm.
+Requests and responses are JSON lines. Each connection may send several requests and is
+served by its own thread, so health checks are answered while a job is running; jobs are
+queued and run one at a time on the main thread (bpy is not thread safe).
+
+Requests:
+    {"type": "health"}                        -> {"event": "health", pid, uptime, jobs, memory_mb, idle, busy,
+                                                  queued}
+    {"type": "job", ...job settings...}       -> {"event": "progress", ...} ... {"event": "result", ...}
+    {"type": "shutdown"}                      -> {"event": "shutdown"}
+Errors (including malformed requests) are reported as {"event": "error", "message": ...}.
+
+Job settings (background.run_daemon): scene, distance, resolution & window (profile) or
+directions (list of [long, lat]), output (profile image), cache, auto_border.
+
+The daemon exits after idle_timeout seconds without requests, and after any job leaving its
+peak memory above max_memory (the result is still returned, flagged "recycle"); clients
+start a fresh daemon when none responds (DaemonClient.connect). A daemon never takes over
+the socket of another live daemon.
+
+Start (Unix only):
+
+blender example.blend --background --python background.py -- -s="Scene" -d=15 --daemon=/tmp/xs360.sock
+"""
+
+import json
+import os
+import queue
+import socket
+import subprocess
+import sys
+import threading
+from time import time, sleep
+
+
+def memory_usage():
+    """
+    Peak resident memory of this process (MB); None where not available (Windows)
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 ** 2) if sys.platform == 'darwin' else peak / 1024
+
+
+class StreamChannel:
+    def __init__(self, send):
+        """
+        Progress channel (see progress.ProgressBar.channel) streaming events to daemon client
+        :param send: Function (dict) -> None, writing response line
+        """
+        self.write = send
+
+    def send(self, stage, done, total, rate, eta, **extra):
+        self.write(dict(event='progress', stage=stage, done=done, total=total, rate=rate, eta=eta, **extra))
+
+
+class DaemonServer:
+    def __init__(self, socket_path, handle_job, idle_timeout=600, max_memory=None):
+        """
+        Unix socket server running jobs in this process
+        :param socket_path: Socket file
+        :param handle_job: Function (job dict, send) -> result dict; send(dict) streams a response line
+        :param idle_timeout: Seconds without requests after which the daemon exits
+        :param max_memory: Peak memory (MB) above which the daemon exits after the current job; if None, no limit
+        """
+        self.socket_path = socket_path
+        self.handle_job = handle_job
+        self.idle_timeout = idle_timeout
+        self.max_memory = max_memory
+
+        self.started = time()
+        self.last_request = time()
+        self.jobs = 0
+        self.running = False
+        self.busy = False
+
+        # (request, send, done event) of jobs waiting for the main thread
+        self.pending = queue.Queue()
+
+    def health(self):
+        return {
+            'event': 'health',
+            'pid': os.getpid(),
+            'uptime': time() - self.started,
+            'jobs': self.jobs,
+            'memory_mb': memory_usage(),
+            'idle': time() - self.last_request,
+            'busy': self.busy,
+            'queued': self.pending.qsize(),
+        }
+
+    def over_memory(self):
+        memory = memory_usage()
+        return self.max_memory is not None and memory is not None and memory > self.max_memory
+
+    def claim_socket(self):
+        """
+        Remove stale socket file of a previous daemon; raises Exception if another daemon still listens on it
+        """
+        if not os.path.exists(self.socket_path):
+            return
+
+        if DaemonClient.listening(self.socket_path):
+            raise Exception(f'Another XSection360 daemon is listening on {self.socket_path}')
+
+        os.remove(self.socket_path)
+
+    def serve(self):
+        """
+        Run queued jobs until shutdown, idle timeout or memory recycle; connections are accepted on a thread
+        """
+        self.claim_socket()
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.socket_path)
+        server.listen()
+        server.settimeout(1)
+
+        print(f'XSection360 daemon {os.getpid()} listening on {self.socket_path}')
+        self.running = True
+        threading.Thread(target=self.accept, args=(server,), daemon=True).start()
+
+        try:
+            while self.running:
+                try:
+                    request, send, done = self.pending.get(timeout=1)
+                except queue.Empty:
+                    if time() - self.last_request > self.idle_timeout:
+                        print(f'Idle for {self.idle_timeout}s, exiting')
+                        break
+                    continue
+
+                self.busy = True
+                try:
+                    self.run_job(request, send)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # client gone; keep serving others
+                finally:
+                    self.busy = False
+                    self.last_request = time()
+                    done.set()
+        finally:
+            self.running = False
+            server.close()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+
+            # jobs queued behind shutdown
+            while not self.pending.empty():
+                request, send, done = self.pending.get()
+                try:
+                    send({'event': 'error', 'message': 'Daemon shut down before job started'})
+                except OSError:
+                    pass
+                done.set()
+
+    def accept(self, server):
+        """
+        Accept connections (thread), serving each on its own thread
+        """
+        while self.running:
+            try:
+                connection, _ = server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                return  # server closed
+
+            threading.Thread(target=self.handle, args=(connection,), daemon=True).start()
+
+    def handle(self, connection):
+        """
+        Serve requests of one connection (JSON lines) until it closes
+        Jobs are queued for the main thread; this thread waits until each job has been answered
+        """
+        connection.settimeout(None)
+        reader = connection.makefile('r', encoding='utf-8')
+
+        def send(message):
+            connection.sendall((json.dumps(message) + '\n').encode())
+
+        try:
+            for line in reader:
+                if not line.strip():
+                    continue
+
+                self.last_request = time()
+                try:
+                    request = json.loads(line)
+                    kind = request.get('type')
+                except (ValueError, AttributeError):
+                    send({'event': 'error', 'message': f'Invalid request (expected JSON object): {line.strip()[:100]}'})
+                    continue
+
+                if kind == 'health':
+                    send(self.health())
+                elif kind == 'shutdown':
+                    send({'event': 'shutdown'})
+                    self.running = False
+                    return
+                elif kind == 'job':
+                    done = threading.Event()
+                    self.pending.put((request, send, done))
+                    done.wait()
+                    if not self.running:
+                        return
+                else:
+                    send({'event': 'error', 'message': f'Unknown request type "{kind}"'})
+
+                self.last_request = time()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client gone; keep serving others
+        finally:
+            reader.close()
+            connection.close()
+
+    def run_job(self, request, send):
+        start = time()
+
+        try:
+            result = self.handle_job(request, send)
+        except Exception as e:
+            send({'event': 'error', 'message': repr(e)})
+            return
+
+        self.jobs += 1
+
+        # recycle: return result, then exit (client starts a fresh daemon)
+        recycle = self.over_memory()
+        if recycle:
+            self.running = False
+
+        send(dict(result, event='result', seconds=time() - start, recycle=recycle))
+
+
+class DaemonClient:
+    def __init__(self, socket_path, timeout=None):
+        """
+        Connection to running daemon
+        :param socket_path: Daemon socket file
+        :param timeout: Socket timeout (seconds); if None, wait indefinitely (jobs may be long)
+        """
+        self.socket_path = socket_path
+
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.settimeout(timeout)
+        self.socket.connect(socket_path)
+        self.reader = self.socket.makefile('r', encoding='utf-8')
+
+    @staticmethod
+    def connect(socket_path, blend_file=None, scene_name=None, cam_distance=None, startup_timeout=120, **options):
+        """
+        Connect to daemon, starting a new one if none responds (and blend_file is given)
+        :param socket_path: Daemon socket file
+        :param blend_file: .blend file loaded by new daemon
+        :param scene_name: Default scene of new daemon
+        :param cam_distance: Default camera distance of new daemon
+        :param startup_timeout: Seconds to wait for new daemon
+        :param options: Other start_daemon options (idle_timeout, max_memory, blender)
+        :return: DaemonClient
+        """
+        if DaemonClient.health_check(socket_path) is None:
+            if DaemonClient.listening(socket_path):
+                # never start a second daemon on a live socket
+                raise Exception(f'XSection360 daemon on {socket_path} accepts connections but does not respond')
+            if blend_file is None:
+                raise Exception(f'No XSection360 daemon responding on {socket_path}')
+            start_daemon(blend_file, socket_path, scene_name, cam_distance, **options)
+
+            deadline = time() + startup_timeout
+            while DaemonClient.health_check(socket_path) is None:
+                if time() > deadline:
+                    raise Exception(f'XSection360 daemon did not start within {startup_timeout}s')
+                sleep(0.25)
+
+        return DaemonClient(socket_path)
+
+    @staticmethod
+    def listening(socket_path):
+        """
+        :return: True if a process accepts connections on socket (live daemon, even if unresponsive)
+        """
+        try:
+            DaemonClient(socket_path, 2).close()
+            return True
+        except OSError:
+            return False
+
+    @staticmethod
+    def health_check(socket_path, timeout=2):
+        """
+        :return: Health dict of daemon, or None if not responding
+        """
+        try:
+            client = DaemonClient(socket_path, timeout)
+        except OSError:
+            return None
+
+        try:
+            return next(client.request({'type': 'health'}))
+        except (OSError, StopIteration, ValueError):
+            return None
+        finally:
+            client.close()
+
+    def request(self, message):
+        """
+        Send request and stream response lines
+        :return: Generator of response dicts; ends after final response (health, result, error, shutdown)
+        """
+        self.socket.sendall((json.dumps(message) + '\n').encode())
+
+        for line in self.reader:
+            response = json.loads(line)
+            yield response
+
+            if response['event'] != 'progress':
+                return
+
+    def run_job(self, progress=None, **job):
+        """
+        Run job on daemon
+        :param progress: Function (progress event dict) -> None; if None, progress is ignored
+        :param job: Job settings (see module docstring)
+        :return: Result dict (values, components, output, seconds, recycle)
+        """
+        for response in self.request(dict(job, type='job')):
+            if response['event'] == 'progress':
+                if progress is not None:
+                    progress(response)
+            elif response['event'] == 'error':
+                raise Exception(f'XSection360 daemon job failed: {response["message"]}')
+            else:
+                return response
+
+        raise Exception('XSection360 daemon closed connection')
+
+    def shutdown(self):
+        for _ in self.request({'type': 'shutdown'}):
+            pass
+
+    def close(self):
+        self.reader.close()
+        self.socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def start_daemon(blend_file, socket_path, scene_name, cam_distance, idle_timeout=600, max_memory=None,
+                 blender='blender'):
+    """
+    Start background Blender daemon (returns immediately; see DaemonClient.connect)
+    :param blend_file: .blend file to keep loaded
+    :param socket_path: Socket file to listen on
+    :param scene_name: Default scene for jobs
+    :param cam_distance: Default camera distance for jobs
+    :param idle_timeout: Seconds without requests after which the daemon exits
+    :param max_memory: Peak memory (MB) after which the daemon recycles; if None, no limit
+    :param blender: Blender executable
+    :return: Popen
+    """
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'background.py')
+
+    command = [blender, blend_file, '--background', '--python-exit-code', '1', '--python', script,
+               '--', f'--scene={scene_name}', f'--distance={cam_distance}', f'--daemon={socket_path}',
+               f'--idle-timeout={idle_timeout}']
+
+    if max_memory is not None:
+        command.append(f'--max-memory={max_memory}')
+
+    return subprocess.Popen(command, stdout=subprocess.DEVNULL)
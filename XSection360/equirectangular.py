@@ -178,6 +178,155 @@ class Equirectangular:
 
             return Equirectangular.project_sphere((x, y), radius=radius)
 
+        @staticmethod
+        def grid_to_spherical(resolution: tuple):
+            """
+            Convert every pixel of an image to projected spherical coordinates (vectorized)
+            Pixel order: start bottom left, go right (as xstools.OutImage.pixel_to_coord)
+            :param resolution: Image resolution (x, y)
+            :return: Arrays of longitude and latitude, one element per pixel
+            """
+            rX, rY = resolution
+
+            pixels = np.arange(rX * rY)
+            x, y = pixels % rX, pixels // rX
+
+            long = Equirectangular.Longitude.linear_to_spherical(Equirectangular.Pixel.to_linear(x, rX))
+            lat = Equirectangular.Latitude.linear_to_spherical(Equirectangular.Pixel.to_linear(y, rY))
+
+            return long, lat
+
+
+class Window:
+    """
+    Angular region of interest: only directions within the window are sampled, at the
+    window's own (output image) resolution.
+    Window axes are either longitude & latitude, or aerodynamic angle of attack (alpha)
+    & sideslip (beta). Image x axis: longitude / beta; image y axis: latitude / alpha.
+    """
+    LONLAT = 'lonlat'
+    ALPHABETA = 'alphabeta'
+
+    def __init__(self, x_range: tuple, y_range: tuple, mode=LONLAT):
+        """
+        :param x_range: (min, max) of image x axis in degrees: longitude (lonlat) or beta (alphabeta)
+        :param y_range: (min, max) of image y axis in degrees: latitude (lonlat) or alpha (alphabeta)
+        :param mode: Window.LONLAT or Window.ALPHABETA
+        """
+        if mode not in (Window.LONLAT, Window.ALPHABETA):
+            raise Exception(f'Unknown window mode "{mode}"; expected "{Window.LONLAT}" or "{Window.ALPHABETA}"')
+
+        self.x_range = tuple(float(v) for v in x_range)
+        self.y_range = tuple(float(v) for v in y_range)
+        self.mode = mode
+
+    @staticmethod
+    def parse(text: str):
+        """
+        Create window from command line string
+        "lonlat:LONG_MIN:LONG_MAX:LAT_MIN:LAT_MAX" or "alphabeta:ALPHA_MIN:ALPHA_MAX:BETA_MIN:BETA_MAX"
+        :param text: Window string
+        :return: Window
+        """
+        mode, *values = text.split(':')
+        if len(values) != 4:
+            raise Exception(f'Invalid window "{text}"; expected MODE:MIN:MAX:MIN:MAX')
+
+        a_min, a_max, b_min, b_max = (float(v) for v in values)
+
+        if mode == Window.ALPHABETA:
+            return Window((b_min, b_max), (a_min, a_max), mode)
+        return Window((a_min, a_max), (b_min, b_max), mode)
+
+    def __str__(self):
+        if self.mode == Window.ALPHABETA:
+            values = self.y_range + self.x_range
+        else:
+            values = self.x_range + self.y_range
+        return ':'.join([self.mode] + [f'{v:g}' for v in values])
+
+    def to_dict(self):
+        """
+        Window description for run metadata
+        """
+        if self.mode == Window.ALPHABETA:
+            return {'mode': self.mode, 'alpha': list(self.y_range), 'beta': list(self.x_range)}
+        return {'mode': self.mode, 'long': list(self.x_range), 'lat': list(self.y_range)}
+
+    @staticmethod
+    def from_dict(data: dict):
+        if data['mode'] == Window.ALPHABETA:
+            return Window(data['beta'], data['alpha'], data['mode'])
+        return Window(data['long'], data['lat'], data['mode'])
+
+    @staticmethod
+    def alpha_beta_to_spherical(alpha, beta):
+        """
+        Convert angle of attack & sideslip to projected longitude & latitude
+        Direction towards camera: (sin beta, cos alpha cos beta, sin alpha cos beta); alpha = beta = 0 is (0, 1, 0),
+        the camera position of long = lat = 0 (see projection.camera_basis)
+        :param alpha: Angle of attack (degrees); scalar or array
+        :param beta: Sideslip angle (degrees); scalar or array
+        :return: Projected spherical coordinate (long, lat)
+        """
+        a, b = np.radians(alpha), np.radians(beta)
+
+        lat = np.degrees(np.arcsin(np.clip(np.sin(a) * np.cos(b), -1, 1)))
+        long = np.degrees(np.arctan2(-np.sin(b), np.cos(a) * np.cos(b)))
+
+        return long, lat
+
+    def linear_to_spherical(self, x, y):
+        """
+        Convert linear (image) coordinates within window to projected spherical coordinates
+        :param x: Linear x coordinate(s), 0 to 1
+        :param y: Linear y coordinate(s), 0 to 1
+        :return: Projected spherical coordinate (long, lat)
+        """
+        (x_min, x_max), (y_min, y_max) = self.x_range, self.y_range
+
+        u = x_min + x * (x_max - x_min)
+        v = y_min + y * (y_max - y_min)
+
+        if self.mode == Window.ALPHABETA:
+            return Window.alpha_beta_to_spherical(v, u)
+        return u, v
+
+    def coord_to_spherical(self, pixel_coord: tuple, resolution: tuple):
+        """
+        Convert pixel coordinate to projected spherical coordinate (as Equirectangular.Pixel.coord_to_spherical)
+        """
+        x, y = Equirectangular.Pixel.coord_to_linear(pixel_coord, resolution)
+        long, lat = self.linear_to_spherical(x, y)
+
+        return float(long), float(lat)
+
+    def grid_to_spherical(self, resolution: tuple):
+        """
+        Convert every pixel of window image to projected spherical coordinates (vectorized)
+        Pixel order: start bottom left, go right (as Equirectangular.Pixel.grid_to_spherical)
+        :param resolution: Image resolution (x, y)
+        :return: Arrays of longitude and latitude, one element per pixel
+        """
+        rX, rY = resolution
+
+        pixels = np.arange(rX * rY)
+        x, y = pixels % rX, pixels // rX
+
+        return self.linear_to_spherical(Equirectangular.Pixel.to_linear(x, rX), Equirectangular.Pixel.to_linear(y, rY))
+
+    @staticmethod
+    def directions(resolution: tuple, window=None):
+        """
+        Projected longitude & latitude of each profile pixel, within window (full sphere if None)
+        :param resolution: Image resolution (x, y)
+        :param window: Window; if None, full sphere
+        :return: Arrays of longitude and latitude, one element per pixel
+        """
+        if window is None:
+            return Equirectangular.Pixel.grid_to_spherical(resolution)
+        return window.grid_to_spherical(resolution)
+
 
 class Vector:
 
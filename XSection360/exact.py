@@ -0,0 +1,304 @@
+"""
+Exact projected area engine (bpy-free).
+
+For each direction, triangles are projected orthographically onto the camera plane and
+the area of their union is computed exactly (to floating point precision), so profiles
+carry no pixel quantization error at all.
+
+Union area is found by vertical slab decomposition: slab boundaries are placed at every
+vertex x and every edge-edge crossing x. Inside a slab no edges cross, so the union's
+cross-section length is linear in x and the midpoint rule is exact. Crossing candidates
+are pruned with a sort-and-sweep index on edge bounding boxes, and all slabs are evaluated
+together as (triangle, slab) pairs.
+
+Cost grows with triangles x slabs they span: about 0.2 s per direction for a 9216-triangle
+sphere, comparable to a 64x64 raster render. This engine accepts any triangle soup (open or
+self-intersecting meshes); for closed meshes, silhouette.py gives the same areas in a few
+milliseconds per direction.
+"""
+
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from .projection import camera_basis, project_points
+
+
+def signed_areas(tris2d):
+    """
+    Calculate signed area of 2D triangles (positive if counter-clockwise)
+    :param tris2d: Triangle array (N, 3, 2)
+    :return: Signed areas (N,)
+    """
+    a, b, c = tris2d[:, 0], tris2d[:, 1], tris2d[:, 2]
+    return 0.5 * ((b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (c[:, 0] - a[:, 0]) * (b[:, 1] - a[:, 1]))
+
+
+def candidate_pairs(lo, hi):
+    """
+    Sort-and-sweep index: find pairs of boxes which overlap
+    :param lo: Box minimum corners (M, 2)
+    :param hi: Box maximum corners (M, 2)
+    :return: Index arrays (i, j) of overlapping box pairs, i != j, each pair once
+    """
+    order = np.argsort(lo[:, 0], kind='stable')
+    sorted_lo = lo[order, 0]
+
+    # boxes starting within each box's x interval (after it in sweep order)
+    start = np.arange(len(order)) + 1
+    end = np.searchsorted(sorted_lo, hi[order, 0], side='right')
+    counts = np.maximum(end - start, 0)
+
+    first = np.repeat(np.arange(len(order)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    second = np.repeat(start, counts) + offsets
+
+    i, j = order[first], order[second]
+
+    # overlap in y
+    keep = (lo[i, 1] <= hi[j, 1]) & (lo[j, 1] <= hi[i, 1])
+
+    return i[keep], j[keep]
+
+
+def crossing_xs(tris2d):
+    """
+    Find x coordinates of proper crossings between triangle edges
+    Edges shared by adjacent triangles are tested once; edges meeting at a vertex do not cross properly
+    (rounding may still report such a vertex x, which only adds a harmless slab boundary)
+    :param tris2d: Triangle array (N, 3, 2)
+    :return: Array of crossing x coordinates
+    """
+    starts = tris2d.reshape(-1, 2)
+    ends = np.roll(tris2d, -1, axis=1).reshape(-1, 2)
+
+    # undirected edges, each once
+    segments = np.concatenate([starts, ends], axis=1)
+    flip = (ends[:, 0] < starts[:, 0]) | ((ends[:, 0] == starts[:, 0]) & (ends[:, 1] < starts[:, 1]))
+    segments[flip] = segments[flip][:, [2, 3, 0, 1]]
+    segments = np.unique(segments, axis=0)
+
+    return segment_crossing_xs(segments[:, :2], segments[:, 2:])
+
+
+def segment_crossing_xs(starts, ends, owner=None):
+    """
+    Find x coordinates of proper crossings between 2D segments (touching at end points is not a crossing)
+    :param starts: Segment start points (M, 2)
+    :param ends: Segment end points (M, 2)
+    :param owner: Owner of each segment (M,); segments of the same owner are not tested. If None, all pairs
+    :return: Array of crossing x coordinates
+    """
+    i, j = candidate_pairs(np.minimum(starts, ends), np.maximum(starts, ends))
+
+    if owner is not None:
+        keep = owner[i] != owner[j]
+        i, j = i[keep], j[keep]
+
+    p, r = starts[i], ends[i] - starts[i]
+    q, s = starts[j], ends[j] - starts[j]
+
+    def cross(a, b):
+        return a[:, 0] * b[:, 1] - a[:, 1] * b[:, 0]
+
+    denom = cross(r, s)
+    parallel = denom == 0
+    denom[parallel] = 1  # avoid division by zero; discarded below
+
+    t = cross(q - p, s) / denom
+    u = cross(q - p, r) / denom
+
+    proper = ~parallel & (t > 0) & (t < 1) & (u > 0) & (u < 1)
+
+    return p[proper, 0] + t[proper] * r[proper, 0]
+
+
+def union_length(lo, hi):
+    """
+    Calculate total length of union of intervals
+    :param lo: Interval starts
+    :param hi: Interval ends
+    :return: Union length
+    """
+    if len(lo) == 0:
+        return 0.0
+
+    return float(union_lengths(np.zeros(len(lo), dtype=np.int64), lo, hi, 1)[0])
+
+
+def union_lengths(groups, lo, hi, count):
+    """
+    Calculate total length of union of intervals, for many groups of intervals at once
+    :param groups: Group index of each interval, 0 to count - 1
+    :param lo: Interval starts
+    :param hi: Interval ends
+    :param count: Number of groups
+    :return: Union length of each group (count,)
+    """
+    order = np.lexsort((lo, groups))
+    groups, lo, hi = groups[order], lo[order], hi[order]
+
+    # furthest end reached by earlier intervals of same group: running maximum of
+    # integer keys (group, rank of end), so groups never reach into each other
+    size = len(hi)
+    by_rank = np.argsort(hi, kind='stable')
+    rank = np.empty(size, dtype=np.int64)
+    rank[by_rank] = np.arange(size)
+
+    keys = groups * size + rank
+    reach = np.concatenate([[-1], np.maximum.accumulate(keys)[:-1]])
+
+    same_group = reach >= groups * size
+    previous = np.where(same_group, hi[by_rank[np.where(same_group, reach - groups * size, 0)]], -np.inf)
+
+    return np.bincount(groups, np.maximum(hi - np.maximum(lo, previous), 0), minlength=count)
+
+
+# (triangle, slab) pairs evaluated at once by union_area, bounding memory use
+SLAB_BLOCK_PAIRS = 1 << 20
+
+
+def union_area(tris2d):
+    """
+    Calculate exact area of union of 2D triangles
+    All slabs are evaluated together (vectorized), in blocks of at most SLAB_BLOCK_PAIRS (triangle, slab) pairs
+    :param tris2d: Triangle array (N, 3, 2)
+    :return: Union area
+    """
+    tris2d = np.asarray(tris2d, dtype=np.float64)
+    tris2d = tris2d[signed_areas(tris2d) != 0]  # edge-on triangles add no area
+
+    if len(tris2d) == 0:
+        return 0.0
+
+    # slab boundaries
+    xs = np.unique(np.concatenate([tris2d[..., 0].ravel(), crossing_xs(tris2d)]))
+    mids = 0.5 * (xs[:-1] + xs[1:])
+    widths = np.diff(xs)
+
+    # slabs spanned by each triangle: midpoints strictly within its x extent (vertices are boundaries)
+    first = np.searchsorted(mids, tris2d[..., 0].min(axis=1), side='right')
+    last = np.searchsorted(mids, tris2d[..., 0].max(axis=1), side='left')
+
+    # triangles per slab -> blocks of slabs with bounded pair counts
+    per_slab = np.cumsum(np.bincount(first, minlength=len(xs)) - np.bincount(last, minlength=len(xs)))[:-1]
+    total = np.cumsum(per_slab)
+    splits = np.searchsorted(total, np.arange(1, total[-1] // SLAB_BLOCK_PAIRS + 1) * SLAB_BLOCK_PAIRS, side='right')
+    blocks = np.unique(np.concatenate([[0], splits, [len(mids)]]))
+
+    edge_a = tris2d
+    edge_b = np.roll(tris2d, -1, axis=1)
+
+    area = 0.0
+    for b0, b1 in zip(blocks[:-1], blocks[1:]):
+        start, stop = np.maximum(first, b0), np.minimum(last, b1)
+        counts = np.maximum(stop - start, 0)
+        active = np.nonzero(counts)[0]
+        if len(active) == 0:
+            continue
+
+        # one row per (triangle, slab) pair
+        counts = counts[active]
+        tri = np.repeat(active, counts)
+        slab = np.repeat(start[active], counts) + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        mid = mids[slab][:, None]
+
+        # y of each triangle edge at slab midpoint (nan for edges not spanning it)
+        a, b = edge_a[tri], edge_b[tri]
+        dx = b[..., 0] - a[..., 0]
+        spans = (np.minimum(a[..., 0], b[..., 0]) < mid) & (np.maximum(a[..., 0], b[..., 0]) > mid)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            y = a[..., 1] + (mid - a[..., 0]) / dx * (b[..., 1] - a[..., 1])
+        y = np.where(spans, y, np.nan)
+
+        # each triangle's cross-section is the interval between its spanning edges
+        lengths = union_lengths(slab - b0, np.nanmin(y, axis=1), np.nanmax(y, axis=1), b1 - b0)
+        area += float(widths[b0:b1] @ lengths)
+
+    return area
+
+
+def direction_area(triangles, long, lat, cull_backfaces=True):
+    """
+    Calculate exact orthographic projected area for a single direction
+    :param triangles: World-space triangle array (N, 3, 3)
+    :param long: Longitudinal position (degrees)
+    :param lat: Latitudinal position (degrees)
+    :param cull_backfaces: Only project front-facing triangles (valid for closed meshes; halves work)
+    :return: Projected area (world units)
+    """
+    right, up, _ = camera_basis(long, lat)
+    tris2d = project_points(triangles, right, up)
+
+    # counter-clockwise in image plane: facing camera
+    if cull_backfaces:
+        tris2d = tris2d[signed_areas(tris2d) > 0]
+
+    return union_area(tris2d)
+
+
+def direction_areas(triangles, directions, cull_backfaces=True):
+    """
+    Calculate exact projected area for list of directions (single process)
+    :param triangles: World-space triangle array (N, 3, 3)
+    :param directions: List of (long, lat)
+    :param cull_backfaces: Only project front-facing triangles
+    :return: List of areas
+    """
+    return [direction_area(triangles, long, lat, cull_backfaces) for long, lat in directions]
+
+
+# triangles held by each pool worker process (load_triangles): sent once per worker, not per task
+worker_triangles = None
+
+
+def load_triangles(triangles):
+    """
+    Pool initializer: keep triangles in worker process
+    :param triangles: World-space triangle array (N, 3, 3)
+    """
+    global worker_triangles
+    worker_triangles = triangles
+
+
+def worker_direction_areas(directions, cull_backfaces=True):
+    """
+    Calculate exact projected area for list of directions, from triangles loaded into worker (pool task)
+    """
+    return direction_areas(worker_triangles, directions, cull_backfaces)
+
+
+def triangle_pool(triangles, processes=None):
+    """
+    Process pool whose workers hold triangles, for profile_areas (e.g. kept open across query batches)
+    :param triangles: World-space triangle array (N, 3, 3)
+    :param processes: Number of worker processes; if None, CPU count
+    :return: ProcessPoolExecutor
+    """
+    triangles = np.asarray(triangles, dtype=np.float64)
+    return ProcessPoolExecutor(processes, initializer=load_triangles, initargs=(triangles,))
+
+
+def profile_areas(triangles, directions, processes=None, chunk_size=8, cull_backfaces=True, pool=None):
+    """
+    Calculate exact projected areas across directions in a process pool
+    Triangles are loaded into each worker once (triangle_pool); tasks only carry directions
+    :param triangles: World-space triangle array (N, 3, 3)
+    :param directions: List of (long, lat)
+    :param processes: Number of worker processes; if None, CPU count
+    :param chunk_size: Directions per pool task
+    :param cull_backfaces: Only project front-facing triangles
+    :param pool: Existing triangle_pool of the same triangles (kept open by caller); if None, a new pool
+    :return: Generator of areas, in direction order (allows progress bar)
+    """
+    if pool is None:
+        with triangle_pool(triangles, processes) as pool:
+            yield from profile_areas(triangles, directions, chunk_size=chunk_size, cull_backfaces=cull_backfaces,
+                                     pool=pool)
+        return
+
+    chunks = [directions[i: i + chunk_size] for i in range(0, len(directions), chunk_size)]
+
+    tasks = [pool.submit(worker_direction_areas, chunk, cull_backfaces) for chunk in chunks]
+
+    for task in tasks:
+        yield from task.result()
@@ -0,0 +1,503 @@
+"""
+Lease-based job queue for distributing a profile over multiple render nodes.
+
+The coordinator splits the profile pixels into chunks and hands them out over HTTP.
+Each chunk is leased to one worker for a limited time; workers send heartbeats to extend
+the lease while rendering. Expired leases (crashed workers) are re-dispatched, failed
+chunks retried, and slow chunks speculatively re-dispatched to idle workers once nothing
+else is pending. The first result received for a chunk is kept.
+
+Workers send the cache key of their geometry & render settings (background.scene_cache_key,
+or the snapshot key) with each lease request; workers whose key differs from the job's are
+rejected, so one profile never mixes values from different scenes or render resolutions.
+
+Coordinator (plain Python, writes profile with ProcessRaw once all chunks are complete):
+
+python -m XSection360 coordinator -f=profile.png -x=90 -y=45 --port=8360
+
+Workers (one per node; Blender or snapshot based):
+
+blender worker.blend --background --python background.py -- -s="Scene" -d=20 --worker=http://host:8360
+python -m XSection360 worker http://host:8360 snapshot.npz
+"""
+
+import json
+import os
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import time, sleep
+from urllib import request
+
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+
+
+class Chunk:
+    def __init__(self, chunk_id, start, end):
+        """
+        Range of profile pixels, rendered by one worker
+        :param chunk_id: Chunk number
+        :param start: First pixel number
+        :param end: Last pixel number (exclusive)
+        """
+        self.chunk_id = chunk_id
+        self.start = start
+        self.end = end
+
+        self.state = PENDING
+        self.leases = {}  # worker id -> lease expiry time
+        self.leased_at = None
+        self.attempts = 0
+
+    def __len__(self):
+        return self.end - self.start
+
+
+class JobQueue:
+    def __init__(self, resolution: tuple, chunk_size=16, lease_time=60, max_attempts=3, straggler_factor=2,
+                 window=None, key=None):
+        """
+        Thread-safe queue of profile chunks with time-limited leases
+        :param resolution: Output profile resolution
+        :param chunk_size: Number of profile pixels per chunk
+        :param lease_time: Seconds a lease lasts without heartbeat
+        :param max_attempts: Number of failed attempts (failures or expired leases) after which the job fails
+        :param straggler_factor: Re-dispatch leased chunk when running longer than this many times the mean chunk time
+        :param window: Angular region of interest (equirectangular.Window) sampled by profile; if None, full sphere
+        :param key: Cache key of geometry & render settings workers must match; if None, set by the first worker
+        """
+        self.resolution = tuple(resolution)
+        self.window = window
+        self.key = key
+        self.lease_time = lease_time
+        self.max_attempts = max_attempts
+        self.straggler_factor = straggler_factor
+
+        total = resolution[0] * resolution[1]
+        self.chunks = [Chunk(i, start, min(start + chunk_size, total))
+                       for i, start in enumerate(range(0, total, chunk_size))]
+        self.result_raw = [None] * total
+
+        self.error = None
+        self.chunk_times = []
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+
+    def accept(self, key):
+        """
+        Check worker geometry & render settings match job (first worker sets them if not given)
+        :param key: Worker cache key
+        :return: True if worker may render chunks
+        """
+        with self.lock:
+            if self.key is None:
+                self.key = key
+            return key == self.key
+
+    def lease(self, worker_id):
+        """
+        Lease next chunk to worker
+        Order: pending chunks, then chunks with expired leases, then stragglers
+        :param worker_id: Requesting worker
+        :return: Chunk, or None if nothing to do now
+        """
+        with self.lock:
+            now = time()
+            self.expire(now)
+
+            chunk = next((c for c in self.chunks if c.state == PENDING), None)
+
+            if chunk is None:
+                chunk = self.straggler(worker_id, now)
+
+            if chunk is None:
+                return None
+
+            if chunk.state == PENDING:
+                chunk.leased_at = now
+            chunk.state = LEASED
+            chunk.leases[worker_id] = now + self.lease_time
+
+            return chunk
+
+    def expire(self, now):
+        """
+        Return chunks whose leases have all expired to pending (worker crashed or lost)
+        An expiry counts as a failed attempt: a chunk crashing every worker never reports failure itself
+        """
+        for chunk in self.chunks:
+            if chunk.state != LEASED:
+                continue
+
+            expired = [w for w, expiry in chunk.leases.items() if expiry <= now]
+            chunk.leases = {w: expiry for w, expiry in chunk.leases.items() if expiry > now}
+
+            if not chunk.leases:
+                self.attempt_failed(chunk, f'lease expired on {", ".join(expired)}')
+
+    def attempt_failed(self, chunk, message):
+        """
+        Count failed chunk attempt; return chunk to pending, or fail job after max_attempts
+        """
+        chunk.attempts += 1
+        print(f"\nChunk {chunk.chunk_id} failed (attempt {chunk.attempts}): {message}")
+
+        if chunk.attempts >= self.max_attempts:
+            self.error = f"chunk {chunk.chunk_id} failed {chunk.attempts} times: {message}"
+            self.finished.set()
+
+        if not chunk.leases:
+            chunk.state = PENDING
+
+    def straggler(self, worker_id, now):
+        """
+        Find leased chunk running much longer than the mean chunk time
+        """
+        if not self.chunk_times:
+            return None
+
+        limit = self.straggler_factor * sum(self.chunk_times) / len(self.chunk_times)
+
+        for chunk in self.chunks:
+            if chunk.state == LEASED and worker_id not in chunk.leases and now - chunk.leased_at > limit:
+                return chunk
+
+        return None
+
+    def heartbeat(self, worker_id, chunk_id):
+        """
+        Extend worker lease
+        :return: True if worker should continue (chunk still leased to it)
+        """
+        with self.lock:
+            chunk = self.chunks[chunk_id]
+
+            if chunk.state != LEASED or worker_id not in chunk.leases:
+                return False
+
+            chunk.leases[worker_id] = time() + self.lease_time
+            return True
+
+    def complete(self, worker_id, chunk_id, values):
+        """
+        Merge chunk results; first result for each chunk is kept
+        :param values: Raw profile values for chunk pixels
+        """
+        with self.lock:
+            chunk = self.chunks[chunk_id]
+
+            if chunk.state == DONE:
+                return
+
+            if len(values) != len(chunk):
+                raise ValueError(f"chunk {chunk_id}: expected {len(chunk)} values, got {len(values)}")
+
+            self.result_raw[chunk.start:chunk.end] = values
+            chunk.state = DONE
+            chunk.leases = {}
+            self.chunk_times.append(time() - chunk.leased_at)
+
+            if all(c.state == DONE for c in self.chunks):
+                self.finished.set()
+
+    def fail(self, worker_id, chunk_id, message=''):
+        """
+        Record failed chunk attempt; chunk is retried until max_attempts reached
+        """
+        with self.lock:
+            chunk = self.chunks[chunk_id]
+            chunk.leases.pop(worker_id, None)
+
+            if chunk.state == DONE:
+                return
+
+            self.attempt_failed(chunk, f'{worker_id}: {message}')
+
+    def progress(self):
+        """
+        :return: Number of completed profile pixels
+        """
+        with self.lock:
+            return sum(len(c) for c in self.chunks if c.state == DONE)
+
+    def status(self):
+        with self.lock:
+            return {
+                'resolution': list(self.resolution),
+                'chunks': len(self.chunks),
+                'pending': sum(c.state == PENDING for c in self.chunks),
+                'leased': sum(c.state == LEASED for c in self.chunks),
+                'done': sum(c.state == DONE for c in self.chunks),
+                'error': self.error,
+                'key': self.key,
+            }
+
+
+class CoordinatorHandler(BaseHTTPRequestHandler):
+    """
+    JSON over HTTP: POST /lease, /heartbeat, /complete, /fail; GET /status
+    """
+
+    queue: JobQueue = None
+
+    def do_GET(self):
+        if self.path == '/status':
+            self.respond(self.queue.status())
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            body = json.loads(self.rfile.read(length) or b'{}')
+            worker_id = body.get('worker')
+
+            if self.path == '/lease':
+                self.respond(self.lease_response(worker_id, body.get('key')))
+            elif self.path == '/heartbeat':
+                self.respond({'continue': self.queue.heartbeat(worker_id, self.chunk_id(body))})
+            elif self.path == '/complete':
+                self.queue.complete(worker_id, self.chunk_id(body), body['values'])
+                self.respond({})
+            elif self.path == '/fail':
+                self.queue.fail(worker_id, self.chunk_id(body), body.get('message', ''))
+                self.respond({})
+            else:
+                self.send_error(404)
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            # malformed request: reply with error, keep serving
+            self.respond({'error': f'{type(e).__name__}: {e}'}, 400)
+
+    def chunk_id(self, body):
+        chunk_id = int(body['chunk'])
+        if not 0 <= chunk_id < len(self.queue.chunks):
+            raise ValueError(f'unknown chunk {chunk_id}')
+        return chunk_id
+
+    def lease_response(self, worker_id, key):
+        if self.queue.finished.is_set():
+            return {'action': 'exit'}
+
+        if not self.queue.accept(key):
+            return {'action': 'reject',
+                    'message': 'worker geometry or render settings differ from job (cache key mismatch)'}
+
+        chunk = self.queue.lease(worker_id)
+
+        if chunk is None:
+            return {'action': 'wait', 'seconds': 1}
+
+        return {
+            'action': 'render',
+            'chunk': chunk.chunk_id,
+            'start': chunk.start,
+            'end': chunk.end,
+            'resolution': list(self.queue.resolution),
+            'window': str(self.queue.window) if self.queue.window is not None else None,
+            'heartbeat': self.queue.lease_time / 3,
+            'key': self.queue.key,
+        }
+
+    def respond(self, data, status=200):
+        payload = json.dumps(data).encode()
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass  # keep console for progress bar
+
+
+class Coordinator:
+    def __init__(self, queue: JobQueue, host='0.0.0.0', port=8360):
+        """
+        HTTP server handing out queue chunks to workers
+        :param queue: Profile job queue
+        :param host: Interface to listen on
+        :param port: Port to listen on (0 for any free port)
+        """
+        self.queue = queue
+
+        handler = type('Handler', (CoordinatorHandler,), {'queue': queue})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        if host == '0.0.0.0':
+            host = socket.gethostname()
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self.thread.start()
+
+    def wait(self, linger=None):
+        """
+        Block until all chunks complete (or job fails)
+        :param linger: Seconds to keep serving afterwards, so polling workers are told to exit
+        :return: Raw profile values
+        """
+        from .progress import GeneratorLength, ProgressBar
+
+        total = len(self.queue.result_raw)
+
+        # yield once for each completed pixel (for progress bar)
+        def completed():
+            done = 0
+            while done < total and self.queue.error is None:
+                self.queue.finished.wait(0.5)
+                new = self.queue.progress()
+                yield from range(done, new)
+                done = new
+
+        for i in ProgressBar(GeneratorLength(completed(), total), desc="Rendering"):
+            pass
+
+        if self.queue.error is not None:
+            self.stop()
+            raise Exception(self.queue.error)
+
+        if linger is None:
+            linger = 2 * self.queue.lease_time / 3
+        sleep(linger)
+
+        self.stop()
+        return self.queue.result_raw
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class Worker:
+    def __init__(self, url, evaluate, worker_id=None, retry_time=30, key=None):
+        """
+        Worker process: leases chunks from coordinator and renders them
+        :param url: Coordinator URL
+        :param evaluate: Function (long, lat) -> raw profile value
+        :param worker_id: Unique worker name; defaults to host-pid
+        :param retry_time: Seconds to keep retrying an unreachable coordinator before exiting
+        :param key: Cache key of worker geometry & render settings (checked against job by coordinator)
+        """
+        self.url = url.rstrip('/')
+        self.evaluate = evaluate
+        self.worker_id = worker_id or f'{socket.gethostname()}-{os.getpid()}'
+        self.retry_time = retry_time
+        self.key = key
+
+    def post(self, path, data):
+        data = dict(data, worker=self.worker_id)
+        req = request.Request(self.url + path, json.dumps(data).encode(), {'Content-Type': 'application/json'})
+
+        with request.urlopen(req, timeout=30) as response:
+            return json.loads(response.read())
+
+    def run(self):
+        """
+        Process chunks until coordinator reports job finished (or stops responding)
+        Raises Exception if coordinator rejects worker (geometry or render settings differ from job)
+        :return: Number of chunks completed
+        """
+        from .equirectangular import Equirectangular, Window
+        from .xstools import OutImage
+
+        completed = 0
+        unreachable_since = None
+
+        while True:
+            try:
+                lease = self.post('/lease', {'key': self.key})
+                unreachable_since = None
+            except OSError:
+                # coordinator not started yet, or gone (job finished)
+                if unreachable_since is None:
+                    unreachable_since = time()
+                if time() - unreachable_since > self.retry_time:
+                    break
+                sleep(1)
+                continue
+
+            if lease['action'] == 'exit':
+                break
+            if lease['action'] == 'reject':
+                raise Exception(f'Worker rejected by coordinator: {lease["message"]}')
+            if lease['action'] == 'wait':
+                sleep(lease['seconds'])
+                continue
+
+            chunk_id = lease['chunk']
+            resolution = tuple(lease['resolution'])
+            window = Window.parse(lease['window']) if lease.get('window') else None
+
+            heartbeat = Heartbeat(self, chunk_id, lease['heartbeat'])
+            heartbeat.start()
+
+            try:
+                values = []
+                for pixel in range(lease['start'], lease['end']):
+                    if heartbeat.cancelled:
+                        break  # chunk completed elsewhere / lease lost
+
+                    coord = OutImage.pixel_to_coord(pixel, resolution[0])
+                    if window is None:
+                        long, lat = Equirectangular.Pixel.coord_to_spherical(coord, resolution)
+                    else:
+                        long, lat = window.coord_to_spherical(coord, resolution)
+                    values.append(self.evaluate(long, lat))
+            except Exception as e:
+                heartbeat.stop()
+                self.report('/fail', {'chunk': chunk_id, 'message': repr(e)})
+                continue
+
+            heartbeat.stop()
+
+            if not heartbeat.cancelled and self.report('/complete', {'chunk': chunk_id, 'values': values}):
+                completed += 1
+
+        return completed
+
+    def report(self, path, data):
+        """
+        Post chunk result or failure; coordinator errors are printed, not raised (lease then expires)
+        :return: True if accepted
+        """
+        try:
+            self.post(path, data)
+            return True
+        except OSError as e:
+            print(f'Could not report chunk {data["chunk"]} to coordinator: {e}')
+            return False
+
+
+class Heartbeat(threading.Thread):
+    def __init__(self, worker: Worker, chunk_id, interval):
+        """
+        Background thread extending chunk lease while worker renders
+        """
+        super().__init__(daemon=True)
+        self.worker = worker
+        self.chunk_id = chunk_id
+        self.interval = interval
+
+        self.cancelled = False
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                response = self.worker.post('/heartbeat', {'chunk': self.chunk_id})
+            except OSError:
+                continue  # transient; lease expires if coordinator unreachable
+
+            if not response['continue']:
+                self.cancelled = True
+                return
+
+    def stop(self):
+        self.stopped.set()
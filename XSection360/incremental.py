@@ -0,0 +1,154 @@
+"""
+Incremental profiles from per-object area caches (bpy-free planning).
+
+For one direction, objects whose projected bounds do not overlap form separate groups,
+and the silhouette area is the sum over groups. Every object's visible pixel count within
+its group is cached, keyed by the geometry of the whole group (object names and geometry
+hashes), camera/render settings and direction. After a change, only groups containing a
+changed object are missing, so only those objects are rendered (others hidden) and only
+in directions where such a group exists - e.g. a new store that overlaps nothing else
+costs one small render per direction, and nothing elsewhere is re-rendered.
+
+Visible counts come from component ID renders (setup.assign_component_materials).
+"""
+
+import hashlib
+import json
+import numpy as np
+
+from .projection import camera_basis
+
+
+def projected_bounds(object_points, long, lat):
+    """
+    Projected bounding rectangle of each object, for each direction
+    :param object_points: Array (M, P, 3) of hull points per object, e.g. bounding box corners
+    :param long: Longitudes (N,)
+    :param lat: Latitudes (N,)
+    :return: Array (N, M, 4) of min_u, max_u, min_v, max_v (camera-plane, world units)
+    """
+    points = np.asarray(object_points, dtype=np.float64)
+    right, up, _ = camera_basis(np.atleast_1d(long), np.atleast_1d(lat))
+
+    u = np.einsum('nk,mpk->nmp', right, points)
+    v = np.einsum('nk,mpk->nmp', up, points)
+
+    return np.stack([u.min(axis=2), u.max(axis=2), v.min(axis=2), v.max(axis=2)], axis=-1)
+
+
+def overlap_groups(bounds, margin=0.0):
+    """
+    Group objects whose projected bounds overlap (directly or through other objects)
+    :param bounds: Array (M, 4) of projected rectangles for one direction (projected_bounds)
+    :param margin: Extra separation (world units) required for objects to count as disjoint, e.g. one pixel
+    :return: List of groups (sorted tuples of object indices), in order of first member
+    """
+    min_u, max_u, min_v, max_v = np.asarray(bounds, dtype=np.float64).T
+
+    overlaps = ((min_u[:, None] <= max_u[None, :] + margin) & (min_u[None, :] <= max_u[:, None] + margin) &
+                (min_v[:, None] <= max_v[None, :] + margin) & (min_v[None, :] <= max_v[:, None] + margin))
+
+    # connected components of overlap graph
+    groups = []
+    assigned = np.zeros(len(min_u), dtype=bool)
+
+    for start in range(len(min_u)):
+        if assigned[start]:
+            continue
+
+        members = {start}
+        frontier = [start]
+        assigned[start] = True
+
+        while frontier:
+            neighbours = np.nonzero(overlaps[frontier].any(axis=0) & ~assigned)[0]
+            assigned[neighbours] = True
+            members.update(int(n) for n in neighbours)
+            frontier = list(neighbours)
+
+        groups.append(tuple(sorted(members)))
+
+    return groups
+
+
+def member_key(base_key, group_objects, member):
+    """
+    Cache key of an object's visible count within a group
+    :param base_key: Camera & render settings key (ResultCache.make_key)
+    :param group_objects: Object keys (name:geometry hash) of all group members
+    :param member: Object key of member
+    :return: Key string
+    """
+    params = {'base': base_key, 'group': sorted(group_objects), 'member': member}
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+
+class IncrementalPlan:
+    def __init__(self, object_keys, object_points, directions, base_key, margin=0.0):
+        """
+        Per-direction overlap groups and cache keys of objects
+        :param object_keys: Key per object: name and geometry hash (changes whenever the object changes)
+        :param object_points: Array (M, P, 3) of hull points per object
+        :param directions: List of (long, lat)
+        :param base_key: Camera & render settings key
+        :param margin: Separation (world units) below which projected bounds count as overlapping
+        """
+        self.object_keys = list(object_keys)
+        self.directions = directions
+
+        long, lat = np.array(directions, dtype=np.float64).reshape(-1, 2).T
+        bounds = projected_bounds(object_points, long, lat)
+
+        self.groups = [overlap_groups(b, margin) for b in bounds]
+
+        # cache key of every object in every direction
+        self.keys = []
+        for groups in self.groups:
+            keys = {}
+            for group in groups:
+                group_objects = [self.object_keys[i] for i in group]
+                for i in group:
+                    keys[i] = member_key(base_key, group_objects, self.object_keys[i])
+            self.keys.append(keys)
+
+    def lookup(self, cache):
+        """
+        Retrieve cached visible counts
+        :param cache: ResultCache
+        :return: Array (N directions, M objects) of counts, NaN where not cached
+        """
+        counts = np.full((len(self.directions), len(self.object_keys)), np.nan)
+
+        # one query per distinct key (isolated objects share a key across directions)
+        requests = {}
+        for d, keys in enumerate(self.keys):
+            for i, key in keys.items():
+                requests.setdefault(key, []).append((d, i))
+
+        for key, entries in requests.items():
+            values = cache.get_many(key, [self.directions[d] for d, _ in entries])
+            for (d, i), value in zip(entries, values):
+                if value is not None:
+                    counts[d, i] = value
+
+        return counts
+
+    def render_objects(self, counts, d):
+        """
+        Objects to render for direction: all members of groups with any uncached member
+        :param counts: Counts array (lookup)
+        :param d: Direction index
+        :return: Sorted list of object indices (empty if fully cached)
+        """
+        missing = np.isnan(counts[d])
+        return sorted(i for group in self.groups[d] if missing[list(group)].any() for i in group)
+
+    def store(self, cache, d, objects, values):
+        """
+        Cache visible counts of rendered objects for direction (pending; call cache.flush)
+        :param objects: Rendered object indices (render_objects)
+        :param values: Visible count of each rendered object
+        """
+        long, lat = self.directions[d]
+        for i, value in zip(objects, values):
+            cache.put(self.keys[d][i], long, lat, float(value), commit=False)
@@ -0,0 +1,99 @@
+"""
+Interior geometry detection (bpy-free maths; ray casting supplied by caller).
+
+Internal structure of CAD exports (ribs, spars, cockpit interiors) never reaches the
+silhouette, but is still drawn for every profile pixel. Faces never hit first by any ray
+of an orthographic ray grid, cast from a set of sample directions over the whole sphere,
+are hidden from every direction and can be removed (see setup.strip_interior, which casts
+rays against a mathutils BVH).
+
+Faces smaller than the ray spacing may be missed, so stripping is verified: projected
+areas before and after are compared with the exact engine at check directions distinct
+from the sample directions.
+"""
+
+import numpy as np
+
+from .exact import direction_areas
+from .projection import camera_basis, lattice_vectors
+from .query import vectors_to_spherical
+
+
+def sphere_directions(count, offset=0.5):
+    """
+    Evenly spread directions over the whole sphere (Fibonacci lattice)
+    :param count: Number of directions
+    :param offset: Lattice offset (0 to 1); different offsets give distinct direction sets
+    :return: List of (long, lat)
+    """
+    long, lat = vectors_to_spherical(lattice_vectors(count, offset))
+
+    return [(float(lo), float(la)) for lo, la in zip(long, lat)]
+
+
+def ray_grid(centre, radius, long, lat, resolution):
+    """
+    Orthographic ray grid covering bounding sphere, as seen by camera at direction
+    :param centre: Bounding sphere centre (3,)
+    :param radius: Bounding sphere radius
+    :param long: Longitudinal position (degrees)
+    :param lat: Latitudinal position (degrees)
+    :param resolution: Rays across bounding sphere diameter
+    :return: (ray origins (K, 3), ray direction (3,), ray length)
+    """
+    right, up, view = camera_basis(long, lat)
+
+    # ray centres of resolution x resolution cells, within bounding circle
+    axis = ((np.arange(resolution) + 0.5) / resolution * 2 - 1) * radius
+    u, v = (a.ravel() for a in np.meshgrid(axis, axis))
+    inside = u ** 2 + v ** 2 <= radius ** 2
+
+    # start outside bounding sphere, on camera side
+    start = np.asarray(centre, dtype=np.float64) - view * radius * 1.01
+    origins = start + u[inside, None] * right + v[inside, None] * up
+
+    return origins, view, radius * 2.02
+
+
+def visible_faces(ray_cast, centre, radius, directions, resolution=128):
+    """
+    Find faces hit first by any ray of any sample direction
+    :param ray_cast: Function (origin, direction, length) -> face index, or None if nothing hit
+    :param centre: Bounding sphere centre (3,)
+    :param radius: Bounding sphere radius
+    :param directions: List of (long, lat) sample directions
+    :param resolution: Rays across bounding sphere diameter (per direction)
+    :return: Set of visible face indices
+    """
+    from .progress import ProgressBar
+
+    visible = set()
+
+    for long, lat in ProgressBar(directions, desc="Casting rays"):
+        origins, direction, length = ray_grid(centre, radius, long, lat, resolution)
+
+        for origin in origins:
+            index = ray_cast(origin, direction, length)
+            if index is not None:
+                visible.add(index)
+
+    return visible
+
+
+def area_change(triangles, kept, directions):
+    """
+    Largest relative change of projected area when only kept triangles are drawn
+    Back faces are included, as stripped meshes are no longer closed
+    :param triangles: World-space triangle array (N, 3, 3)
+    :param kept: Boolean array (N,), True for kept triangles
+    :param directions: List of (long, lat) check directions
+    :return: Maximum relative area change (0 if no geometry)
+    """
+    before = np.array(direction_areas(triangles, directions, cull_backfaces=False))
+    after = np.array(direction_areas(triangles[kept], directions, cull_backfaces=False))
+
+    valid = before > 0
+    if not np.any(valid):
+        return 0.0
+
+    return float(np.max(np.abs(after[valid] - before[valid]) / before[valid]))
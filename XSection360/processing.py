@@ -1,114 +1,367 @@
-import bpy
+"""
+Profile processing core: render reductions (lightness, moments, component counts),
+normalization and output encoding (PNG, metadata, .npz channels).
+
+Pure Python + numpy: usable in plain CPython worker processes and CLI tools. The only
+Blender calls (loading rendered images) import bpy lazily, inside ProcessRender.load_pixels.
+"""
+
+import json
+import os
+import struct
+import zlib
+import numpy as np
+
+
+# silhouette channels computed by ProcessRender.moments (see docstring)
+MOMENT_CHANNELS = ('area', 'centroid_u', 'centroid_v', 'i_uu', 'i_vv', 'i_uv')
+
+
+class PixelGrid:
+    def __init__(self, ortho_scale, render_res: tuple):
+        """
+        Precomputed camera-plane coordinates of render pixel centres
+        u along camera right axis, v along camera up axis; zero on camera axis (world units)
+        :param ortho_scale: Camera orthographic scale
+        :param render_res: Render resolution (x, y)
+        """
+        res_x, res_y = render_res
+        size = ortho_scale / max(render_res)  # ortho scale spans larger dimension
+
+        self.render_res = tuple(render_res)
+        self.pixel_area = size ** 2
+        self.u = (np.arange(res_x) + 0.5 - res_x / 2) * size
+        self.v = (np.arange(res_y) + 0.5 - res_y / 2) * size
+
+    def crop(self, border=None):
+        """
+        Pixel coordinates of render cropped to border (see projection.render_borders)
+        :param border: (min_x, max_x, min_y, max_y) fractions; if None, full frame
+        :return: (u, v) coordinate arrays
+        """
+        if border is None:
+            return self.u, self.v
+
+        res_x, res_y = self.render_res
+
+        # Blender truncates border to whole pixels
+        x0, x1 = int(border[0] * res_x), int(border[1] * res_x)
+        y0, y1 = int(border[2] * res_y), int(border[3] * res_y)
+
+        return self.u[x0:x1], self.v[y0:y1]
 
 
 class ProcessRender:
     @staticmethod
-    def get_rgba_lightness(rgba: tuple):
+    def lightness(pixels):
         """
-        Calculate pixel lightness from RGB(A)
-        :param rgba: Pixel data tuple: either RGB or RGBA
-        :return: Lightness value (average of r,g,b)
+        Calculate the sum lightness of pixel array (pixel lightness: mean of r, g, b)
+        :param pixels: Array of RGB(A) pixels (y, x, 3 or 4)
+        :return: Float value: total (sum) lightness
         """
-        return sum(rgba[:3]) / 3
+        return float(pixels[..., :3].mean(axis=-1).sum())
 
     @staticmethod
-    def get_pixels(image: bpy.types.Image):
+    def process(file_path):
         """
-        Convert bpy.types.Image.pixels to list of pixel tuples
-        Note: can also use xstools.iterate_flat
-        :param image: Target image
-        :return: Linear list of pixel tuples (RGBA)
+        Sum lightness of rendered image file (requires Blender)
+        :param file_path: Target image filepath
+        :return: Sum lightness of target image pixels
         """
-        return list(zip(*[iter(image.pixels)] * 4))
+        return ProcessRender.lightness(ProcessRender.load_pixels(file_path))
 
     @staticmethod
-    def sum_lightness(pixels):
+    def moments(pixels, grid: PixelGrid, border=None):
         """
-        Calculate the sum lightness of given pixels
-        :param pixels: List of RGB(A) pixel tuples
-        :return: Float value: total (sum) lightness
+        Calculate silhouette area, centroid and central second moments in one vectorized pass
+        Pixel lightness is used as coverage weight (as lightness)
+        :param pixels: Array of RGB(A) pixels (y, x, 3 or 4), as rendered (cropped to border if used)
+        :param grid: Pixel coordinates for render resolution
+        :param border: Render border used for render; if None, full frame
+        :return: dict of MOMENT_CHANNELS (world units, camera-plane u/v axes):
+            area, centroid_u, centroid_v, i_uu (= sum of (u - cu)^2 dA), i_vv, i_uv
         """
-        result = 0
+        u, v = grid.crop(border)
+        weights = pixels[..., :3].mean(axis=-1)
+
+        # marginal sums: one pass over pixel buffer
+        col = weights.sum(axis=0)  # per u
+        row = weights.sum(axis=1)  # per v
+
+        m0 = col.sum()
+        if m0 == 0:
+            return {'area': 0.0, 'centroid_u': 0.0, 'centroid_v': 0.0, 'i_uu': 0.0, 'i_vv': 0.0, 'i_uv': 0.0}
 
-        for pixel in pixels:
-            result += ProcessRender.get_rgba_lightness(pixel)
+        cu = col @ u / m0
+        cv = row @ v / m0
 
-        return result
+        # central second moments
+        i_uu = col @ (u - cu) ** 2
+        i_vv = row @ (v - cv) ** 2
+        i_uv = (v - cv) @ weights @ (u - cu)
+
+        area = grid.pixel_area
+        return {
+            'area': float(m0 * area),
+            'centroid_u': float(cu),
+            'centroid_v': float(cv),
+            'i_uu': float(i_uu * area),
+            'i_vv': float(i_vv * area),
+            'i_uv': float(i_uv * area),
+        }
 
     @staticmethod
-    def process(file_path):
+    def load_pixels(file_path):
         """
-        Apply above processing to file at given filepath
+        Load image at given filepath as pixel array (Blender adapter: bpy imported on first use)
         :param file_path: Target image filepath
-        :return: Sum lightness of target image pixels
+        :return: Array of RGBA pixels (y, x, 4); row 0 is the bottom of the image
+        """
+        import bpy
+
+        img = bpy.data.images.load(file_path)
+        width, height = img.size
+
+        pixels = np.empty(width * height * 4, dtype=np.float32)
+        img.pixels.foreach_get(pixels)
+        bpy.data.images.remove(img)
+
+        return pixels.reshape(height, width, 4)
+
+    @staticmethod
+    def get_mask(pixels):
+        """
+        Calculate coverage mask (white object pixels) from pixel array
+        :param pixels: Array of RGB(A) pixels (y, x, 3 or 4)
+        :return: Boolean mask (y, x)
+        """
+        return pixels[..., :3].mean(axis=-1) > 0.5
+
+    @staticmethod
+    def component_ids(pixels):
+        """
+        Decode component ID of each pixel (setup.id_colour: red = low byte, green = high byte)
+        :param pixels: Array of RGB(A) pixels (y, x, 3 or 4), rendered with 'Raw' view transform
+        :return: Integer ID array (y, x); 0 is background
+        """
+        rgb = np.rint(pixels[..., :2] * 255).astype(np.int64)
+        return rgb[..., 0] + 256 * rgb[..., 1]
+
+    @staticmethod
+    def component_counts(ids, n_components):
+        """
+        Histogram visible pixels per component, in one vectorized pass
+        :param ids: Component ID array (component_ids)
+        :param n_components: Number of components
+        :return: Pixel count per component (n_components,); component ID 1 first
+        """
+        counts = np.bincount(ids.ravel(), minlength=n_components + 1)
+        return counts[1:n_components + 1]
+
+    @staticmethod
+    def frame_edge_pixels(pixels, border=None, render_res=None):
+        """
+        Find non-black pixels on the camera frame edge (geometry clipped by frame)
+        With a render border, only image edges lying on the frame edge are checked
+        :param pixels: Array of RGB(A) pixels (y, x, 3 or 4), as rendered (cropped to border if used)
+        :param border: Render border used for render (see projection.render_borders); if None, full frame
+        :param render_res: Render resolution (x, y); required with border
+        :return: Array (K, 2) of (x, y) pixel coordinates within image
         """
-        img = bpy.data.images.load(file_path)  # load target image into blender
-        pixels = ProcessRender.get_pixels(img)  # get list of pixel tuples (rgba)
+        covered = pixels[..., :3].max(axis=-1) > 0
+        height, width = covered.shape
 
-        return ProcessRender.sum_lightness(pixels)  # return sum of each pixel lightness
+        # image edges on frame edge: left, right, bottom, top
+        edges = [True] * 4
+        if border is not None:
+            res_x, res_y = render_res
+            edges = [int(border[0] * res_x) == 0, int(border[1] * res_x) >= res_x,
+                     int(border[2] * res_y) == 0, int(border[3] * res_y) >= res_y]
+
+        on_edge = np.zeros_like(covered)
+        on_edge[:, 0] |= edges[0]
+        on_edge[:, -1] |= edges[1]
+        on_edge[0, :] |= edges[2]
+        on_edge[-1, :] |= edges[3]
+
+        y, x = np.nonzero(covered & on_edge)
+        return np.stack([x, y], axis=-1)
+
+    @staticmethod
+    def boundary_pixels(mask):
+        """
+        Count covered pixels on the silhouette boundary (any 4-neighbour uncovered)
+        Frame edges count as uncovered
+        :param mask: Boolean coverage mask (y, x)
+        :return: Number of boundary pixels
+        """
+        padded = np.pad(mask, 1, constant_values=False)
+
+        interior = (padded[:-2, 1:-1] & padded[2:, 1:-1] & padded[1:-1, :-2] & padded[1:-1, 2:])
+
+        return int(np.count_nonzero(mask & ~interior))
+
+    @staticmethod
+    def quantization_error(mask):
+        """
+        Estimate relative area error caused by pixel quantization
+        Each boundary pixel is sampled at its centre, so may be up to half a pixel wrong
+        :param mask: Boolean coverage mask (y, x)
+        :return: Estimated relative error: 0.5 * boundary pixels / covered pixels
+        """
+        area = np.count_nonzero(mask)
+
+        if area == 0:
+            return float('inf')
+
+        return 0.5 * ProcessRender.boundary_pixels(mask) / area
 
 
 class ProcessRaw:
-    def __init__(self, raw_data: list, save_file: str, resolution: tuple):
+    def __init__(self, raw_data: list, save_file: str, resolution: tuple, metadata: dict = None,
+                 moments: dict = None, window=None, components: dict = None):
         """
         Class for processing raw data into output image
         Use this class as a generator
         :param raw_data: Average lightness of each rendered profile pixel
         :param save_file: Output file directory
         :param resolution: Resolution of output file
+        :param metadata: Run information written next to output file (.json); if None, not written
+        :param moments: Silhouette moment channels (MOMENT_CHANNELS -> value per profile pixel),
+            written next to output file (_moments.npz); if None, not written
+        :param window: Angular region of interest (equirectangular.Window) sampled by profile; if None, full sphere
+        :param components: Visible pixel count of each component (name -> value per profile pixel),
+            written next to output file (_components.npz); if None, not written
         """
         self.raw_data = raw_data
         self.save_file = save_file
         self.resolution = resolution
+        self.metadata = metadata
+        self.moments = moments
+        self.window = window
+        self.components = components
 
     def __iter__(self):
         return self.process()
 
     def __len__(self):
-        return len(self.raw_data) + 1
+        return 2
 
     def process(self):
         """
         Performing processing
-        Generator object: allows for progress bar
+        Generator object: allows for progress bar (one step per stage: normalize, write)
         """
-        processed_pixels = []
-
-        # create image
-        image = bpy.data.images.new("XSection360 Result", *self.resolution)
+        # grey RGBA pixels, start bottom left, go right
+        scaled = self.normalize(self.raw_data)
+        processed_pixels = np.stack([scaled, scaled, scaled, np.ones_like(scaled)], axis=-1).ravel()
+        yield None
 
-        # calculate range
-        min_raw = min(self.raw_data)
-        max_raw = max(self.raw_data)
+        # same 8-bit PNG inside and outside Blender
+        self.write_png(self.save_file, processed_pixels, self.resolution)
 
-        # process pixels
-        for raw in self.raw_data:
-            scaled = self.range_to_bw(raw, min_raw, max_raw)
-            new = [scaled, scaled, scaled, 1]
-            print(new)
-            processed_pixels += new
-            yield None
+        if self.metadata is not None:
+            self.write_metadata()
 
-        # write pixels
-        image.pixels.foreach_set(processed_pixels)
+        if self.moments is not None:
+            self.write_moments()
 
-        # save result
-        image.filepath_raw = self.save_file
-        image.file_format = 'PNG'
-        image.save()
+        if self.components is not None:
+            self.write_components()
 
         yield None
 
+    @property
+    def metadata_file(self):
+        return os.path.splitext(self.save_file)[0] + '.json'
+
+    @property
+    def moments_file(self):
+        return os.path.splitext(self.save_file)[0] + '_moments.npz'
+
+    @property
+    def components_file(self):
+        return os.path.splitext(self.save_file)[0] + '_components.npz'
+
+    def write_components(self):
+        """
+        Write per-component visible pixel counts (components, y, x), component names and total (y, x)
+        Counts are raw values, as the profile: multiply by pixel area for world units
+        """
+        res_x, res_y = self.resolution
+
+        names = list(self.components)
+        counts = np.array([self.components[name] for name in names], dtype=np.float64).reshape(-1, res_y, res_x)
+        total = np.array(self.raw_data, dtype=np.float64).reshape(res_y, res_x)
+
+        np.savez(self.components_file, names=np.array(names), counts=counts, total=total)
+
+    def write_moments(self):
+        """
+        Write silhouette moment channels as arrays (y, x), plus world-space centroid (y, x, 3)
+        """
+        from .projection import pose_table
+
+        res_x, res_y = self.resolution
+        channels = {name: np.array(values, dtype=np.float64).reshape(res_y, res_x)
+                    for name, values in self.moments.items()}
+
+        # centroid in world space: camera-plane offset from origin
+        poses = pose_table(self.resolution, self.window)
+        centroid = (channels['centroid_u'].reshape(-1, 1) * poses['right'] +
+                    channels['centroid_v'].reshape(-1, 1) * poses['up'])
+        channels['centroid'] = centroid.reshape(res_y, res_x, 3)
+
+        np.savez(self.moments_file, **channels)
+
+    def write_metadata(self):
+        """
+        Write run metadata (and raw value range, for converting pixels back to raw values)
+        """
+        metadata = dict(self.metadata, raw_min=min(self.raw_data), raw_max=max(self.raw_data))
+
+        with open(self.metadata_file, 'w') as file:
+            json.dump(metadata, file, indent=2)
+
+    @staticmethod
+    def write_png(file_path, pixels, resolution: tuple):
+        """
+        Write flat RGBA pixel list to 8-bit RGBA PNG, without Blender
+        :param file_path: Output file path
+        :param pixels: Flat list of RGBA values (0 to 1); start bottom left, go right
+        :param resolution: Image resolution (x, y)
+        """
+        width, height = resolution
+
+        values = np.clip(np.asarray(pixels, dtype=np.float64).reshape(height, width * 4), 0, 1)
+        rows = np.rint(values * 255).astype(np.uint8)
+
+        # PNG rows run top to bottom; each row is prefixed with filter type 0
+        rows = np.hstack([np.zeros((height, 1), dtype=np.uint8), rows[::-1]])
+        raw = rows.tobytes()
+
+        def chunk(tag, data):
+            body = tag + data
+            return struct.pack('>I', len(data)) + body + struct.pack('>I', zlib.crc32(body) & 0xffffffff)
+
+        header = struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)  # 8-bit RGBA
+
+        with open(file_path, 'wb') as png:
+            png.write(b'\x89PNG\r\n\x1a\n')
+            png.write(chunk(b'IHDR', header))
+            png.write(chunk(b'IDAT', zlib.compress(raw)))
+            png.write(chunk(b'IEND', b''))
+
     @staticmethod
-    def range_to_bw(value, range_min, range_max) -> int:
+    def normalize(raw_data):
         """
-        Convert a value within the given range to BW (0 to 1)
-        :param value: Target value, within range
-        :param range_min: Range minimum
-        :param range_max: Range maximum
-        :return: Scaled BW int (between 0 and 1)
+        Scale raw values to BW (0 to 1) over their range
+        :param raw_data: Raw profile values
+        :return: Array of scaled values; all zero if values are constant
         """
-        # scale value to 01 range
-        scale01 = (value - range_min) / (range_max - range_min)
+        raw = np.asarray(raw_data, dtype=np.float64)
+        span = raw.max() - raw.min()
 
-        return scale01
+        if span == 0:
+            return np.zeros_like(raw)
+        return (raw - raw.min()) / span
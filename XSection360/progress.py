@@ -3,33 +3,41 @@ from time import time, sleep
 
 
 class ProgressBar:
+    # progress event channel shared by all bars (e.g. channel.ProgressSender); if None, console only
+    channel = None
 
-    def __init__(self, iterable, length=10, desc=''):
+    def __init__(self, iterable, length=10, desc='', interval=0.25):
         """
         General progress bar for iterator
         Displays progress, eta, and iter rate
         :param iterable: Iterable to show progress for
         :param length: Length of bar (characters)
         :param desc: Description, displayed in prefix
+        :param interval: Minimum seconds between updates (last iteration always shown)
         """
         self.iterable = iterable
         self.max = len(iterable)
         self.bar_length = length
         self.desc = desc
+        self.interval = interval
 
     def __iter__(self):
 
         # setup time
         start_time = time()
-        last_time = start_time
+        last_update = None
 
         for e, iter in enumerate(self.iterable):
             yield iter
 
-            # config time
+            # throttle updates: printing every iteration slows fast loops
             current_time = time()
-            wait_time = current_time - last_time
-            rate = self.protected_div(1, wait_time)  # 1 / wait_time
+            if last_update is not None and current_time - last_update < self.interval and e + 1 < self.max:
+                continue
+
+            # average rate since start
+            elapsed = current_time - start_time
+            rate = self.protected_div(e + 1, elapsed)
 
             # generate bar and prefix
             progress = self.progress(e)
@@ -37,12 +45,16 @@ class ProgressBar:
             bar = self.bar(self.bar_length, progress)
 
             # generate suffix (incl. eta)
-            remaining_seconds = self.time_remaining(progress, current_time - start_time)
+            remaining_seconds = self.time_remaining(progress, elapsed)
             suffix = self.suffix(e, self.seconds_to_string(remaining_seconds), rate)
 
             # output to console
             print(prefix + bar + suffix, end='\r')
-            last_time = current_time
+            last_update = current_time
+
+            # output to progress channel
+            if self.channel is not None:
+                self.channel.send(self.desc, e + 1, self.max, rate, remaining_seconds)
 
     def progress(self, e):
         """
@@ -149,6 +161,21 @@ class ProgressBar:
         return result
 
 
+class GeneratorLength:
+    def __init__(self, generator, length):
+        """
+        Wrap generator with known length (for ProgressBar)
+        """
+        self.generator = generator
+        self.length = length
+
+    def __iter__(self):
+        return self.generator
+
+    def __len__(self):
+        return self.length
+
+
 if __name__ == '__main__':
     for i in ProgressBar(range(100)):
         sleep(0.2)
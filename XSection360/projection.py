@@ -0,0 +1,193 @@
+"""
+Pure (bpy-free) camera projection maths for XSection360.
+
+Mirrors the camera placement of xstools.transform_camera, so that geometry can be
+projected onto the camera image plane for any profile direction without Blender.
+All functions accept scalars or numpy arrays of longitude/latitude (degrees).
+"""
+
+import numpy as np
+
+from .equirectangular import Window
+
+
+def camera_basis(long, lat):
+    """
+    Calculate camera axes for given projected longitude & latitude
+    Matches the rotation applied by xstools.transform_camera: euler (90 - lat, 0, 180 + long)
+    :param long: Longitudinal position (degrees); scalar or array
+    :param lat: Latitudinal position (degrees); scalar or array
+    :return: (right, up, view) unit vectors, each of shape (..., 3)
+        right - camera local X (image x axis)
+        up - camera local Y (image y axis)
+        view - camera viewing direction (local -Z), pointing towards the origin
+    """
+    lo = np.radians(long)
+    la = np.radians(lat)
+
+    cos_lo, sin_lo = np.cos(lo), np.sin(lo)
+    cos_la, sin_la = np.cos(la), np.sin(la)
+
+    right = np.stack([-cos_lo, -sin_lo, np.zeros_like(cos_lo)], axis=-1)
+    up = np.stack([sin_lo * sin_la, -cos_lo * sin_la, cos_la], axis=-1)
+    view = np.stack([sin_lo * cos_la, -cos_lo * cos_la, -sin_la], axis=-1)
+
+    return right, up, view
+
+
+def pose_table(resolution: tuple, window: Window = None):
+    """
+    Calculate longitude, latitude and camera axes for every profile pixel
+    Pixel order matches background.run_background (start bottom left, go right)
+    :param resolution: Output profile resolution (x, y)
+    :param window: Angular region of interest; if None, full sphere
+    :return: dict of arrays: long, lat (N,), right, up, view (N, 3)
+    """
+    long, lat = Window.directions(resolution, window)
+    right, up, view = camera_basis(long, lat)
+
+    return {'long': long, 'lat': lat, 'right': right, 'up': up, 'view': view}
+
+
+def pixel_size(ortho_scale, render_res: tuple):
+    """
+    Calculate world size of one rendered pixel
+    Orthographic scale spans the larger render dimension (Blender sensor fit AUTO)
+    :param ortho_scale: Camera orthographic scale
+    :param render_res: Render resolution (x, y)
+    :return: Pixel edge length (world units)
+    """
+    return ortho_scale / max(render_res)
+
+
+def project_points(points, right, up):
+    """
+    Orthographically project points onto camera image plane
+    :param points: Array of points (..., 3)
+    :param right: Camera right axis (3,)
+    :param up: Camera up axis (3,)
+    :return: Array of image plane coordinates (..., 2), centred on camera axis
+    """
+    points = np.asarray(points, dtype=np.float64)
+
+    return np.stack([points @ right, points @ up], axis=-1)
+
+
+def render_borders(points, long, lat, ortho_scale, render_res: tuple, margin=1):
+    """
+    Calculate render border containing all projected points, for each direction
+    Borders are snapped outwards to whole pixels, so rendered pixel size is unchanged
+    :param points: Hull points enclosing geometry, e.g. bounding box corners (P, 3)
+    :param long: Longitudes (N,)
+    :param lat: Latitudes (N,)
+    :param ortho_scale: Camera orthographic scale
+    :param render_res: Render resolution (x, y)
+    :param margin: Extra pixels around projected hull (covers rasterization rounding)
+    :return: Array (N, 4) of border min_x, max_x, min_y, max_y, as fractions of frame (0 to 1)
+        Fractions are offset by a quarter pixel, so truncating to pixels (as Blender does) is exact
+    """
+    res_x, res_y = render_res
+    size = pixel_size(ortho_scale, render_res)
+    points = np.asarray(points, dtype=np.float64)
+
+    right, up, _ = camera_basis(np.atleast_1d(long), np.atleast_1d(lat))
+
+    # pixel coordinates of projected points (N, P)
+    x = (right @ points.T) / size + res_x / 2
+    y = (up @ points.T) / size + res_y / 2
+
+    def snap(values, res):
+        low = np.clip(np.floor(values.min(axis=1) - margin), 0, res - 1)
+        high = np.clip(np.ceil(values.max(axis=1) + margin), low + 1, res)  # at least one pixel
+        return (low + 0.25) / res, np.minimum((high + 0.25) / res, 1)
+
+    min_x, max_x = snap(x, res_x)
+    min_y, max_y = snap(y, res_y)
+
+    return np.stack([min_x, max_x, min_y, max_y], axis=-1)
+
+
+def border_fraction(borders):
+    """
+    Calculate fraction of frame pixels rendered within borders
+    :param borders: Array (N, 4) from render_borders
+    :return: Mean rendered fraction (0 to 1)
+    """
+    borders = np.asarray(borders)
+    return float(np.mean((borders[:, 1] - borders[:, 0]) * (borders[:, 3] - borders[:, 2])))
+
+
+def lattice_vectors(count, offset=0.5):
+    """
+    Evenly spread unit vectors over the whole sphere (Fibonacci lattice)
+    :param count: Number of vectors
+    :param offset: Lattice offset (0 to 1); different offsets give distinct vector sets
+    :return: Array (count, 3)
+    """
+    i = np.arange(count) + offset
+    z = 1 - 2 * i / count
+    r = np.sqrt(np.clip(1 - z ** 2, 0, 1))
+    phi = i * np.pi * (3 - np.sqrt(5))  # golden angle
+
+    return np.stack([r * np.cos(phi), r * np.sin(phi), z], axis=-1)
+
+
+def hull_candidates(points, samples=1024, chunk_size=65536):
+    """
+    Reduce point cloud to points extreme along any of [samples] lattice directions (approximate convex hull
+    vertices). Extents measured on the candidates fall short by at most about 0.3% of the radius (1024 samples)
+    :param points: Array (P, 3)
+    :param samples: Number of lattice directions
+    :param chunk_size: Points projected at once (bounds memory)
+    :return: Array (C, 3) of candidate points
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    if len(points) <= samples:
+        return points
+
+    vectors = lattice_vectors(samples)
+    best = np.full(samples, -np.inf)
+    best_index = np.zeros(samples, dtype=np.int64)
+
+    for start in range(0, len(points), chunk_size):
+        values = points[start: start + chunk_size] @ vectors.T  # (chunk, samples)
+        index = values.argmax(axis=0)
+        value = values[index, np.arange(samples)]
+
+        better = value > best
+        best[better] = value[better]
+        best_index[better] = index[better] + start
+
+    return points[np.unique(best_index)]
+
+
+def required_ortho_scale(points, long, lat, render_res: tuple, chunk_size=4096):
+    """
+    Smallest orthographic scale keeping all points in frame, for each direction
+    Camera rotates about world origin, so the frame is centred on the camera axis through the origin
+    :param points: Array (P, 3), e.g. hull_candidates of mesh vertices
+    :param long: Longitudes (N,)
+    :param lat: Latitudes (N,)
+    :param render_res: Render resolution (x, y); ortho scale spans the larger dimension
+    :param chunk_size: Directions projected at once (bounds memory)
+    :return: Array (N,) of required ortho scales
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    long, lat = np.atleast_1d(long), np.atleast_1d(lat)
+    res_x, res_y = render_res
+    longest = max(render_res)
+
+    required = np.zeros(len(long))
+    if len(points) == 0:
+        return required
+
+    for start in range(0, len(long), chunk_size):
+        right, up, _ = camera_basis(long[start: start + chunk_size], lat[start: start + chunk_size])
+
+        # furthest extent from camera axis, relative to frame half size
+        u = np.abs(right @ points.T).max(axis=1) * longest / res_x
+        v = np.abs(up @ points.T).max(axis=1) * longest / res_y
+
+        required[start: start + chunk_size] = 2 * np.maximum(u, v)
+
+    return required
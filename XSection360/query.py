@@ -0,0 +1,156 @@
+"""
+Sparse direction queries (bpy-free): raw profile values at an arbitrary list of attitudes,
+e.g. from a flight log or trim sweep, instead of a full profile image.
+
+Directions are given as (long, lat) pairs, or as vectors pointing from the model towards
+the camera (long = lat = 0 is +Y, see projection.camera_basis). Results are memoized by
+quantized direction in a ResultCache, so repeated or nearby attitudes are only evaluated
+once, and returned in input order.
+
+Example usage:
+
+python -m XSection360 query snapshot.npz attitudes.csv -o=areas.csv --cache=xs360_cache.db
+blender example.blend --background --python background.py -- -s="Scene" -d=15 --query=attitudes.csv -f=areas.csv
+"""
+
+import numpy as np
+
+
+def vectors_to_spherical(vectors):
+    """
+    Convert direction vectors (model towards camera) to projected longitude & latitude
+    Inverse of camera position direction (-view) of projection.camera_basis
+    :param vectors: Array (N, 3); need not be normalized
+    :return: Arrays of longitude and latitude (degrees)
+    """
+    vectors = np.asarray(vectors, dtype=np.float64).reshape(-1, 3)
+    norms = np.linalg.norm(vectors, axis=1)
+
+    if np.any(norms == 0):
+        raise Exception('Direction vectors must not be zero')
+
+    x, y, z = (vectors / norms[:, None]).T
+
+    lat = np.degrees(np.arcsin(np.clip(z, -1, 1)))
+    long = np.degrees(np.arctan2(-x, y))
+
+    return long, lat
+
+
+def load_directions(file_path):
+    """
+    Load query directions from file (.npy, or text/CSV with optional header line)
+    Two columns: long, lat (degrees); three columns: direction vectors
+    :param file_path: Directions file
+    :return: List of (long, lat) tuples
+    """
+    if file_path.endswith('.npy'):
+        data = np.load(file_path)
+    else:
+        with open(file_path) as file:
+            lines = [line for line in file.read().splitlines() if line.strip() and not line.startswith('#')]
+
+        # skip header line
+        try:
+            [float(v) for v in lines[0].replace(',', ' ').split()]
+        except ValueError:
+            lines = lines[1:]
+
+        data = np.array([[float(v) for v in line.replace(',', ' ').split()] for line in lines])
+
+    data = np.atleast_2d(np.asarray(data, dtype=np.float64))
+
+    if data.shape[1] == 3:
+        long, lat = vectors_to_spherical(data)
+    elif data.shape[1] == 2:
+        long, lat = data.T
+    else:
+        raise Exception(f'Directions must have 2 (long, lat) or 3 (vector) columns, got {data.shape[1]}')
+
+    return [(float(lo), float(la)) for lo, la in zip(long, lat)]
+
+
+def snap(directions, quantum=None):
+    """
+    Snap directions to multiples of quantum (memoization resolution)
+    Longitude is wrapped to [-180, 180), and is irrelevant at the poles
+    :param directions: List of (long, lat) tuples
+    :param quantum: Angle step (degrees); if None, directions are only wrapped
+    :return: List of snapped (long, lat) tuples
+    """
+    snapped = []
+
+    for long, lat in directions:
+        if quantum is not None:
+            long, lat = round(long / quantum) * quantum, round(lat / quantum) * quantum
+
+        long = (long + 180) % 360 - 180
+        if abs(lat) >= 90:
+            long = 0.0
+
+        snapped.append((float(long), float(lat)))
+
+    return snapped
+
+
+def query_directions(evaluate_batch, directions, cache=None, cache_key=None, batch_size=64, quantum=None):
+    """
+    Evaluate raw profile values for arbitrary directions, memoized in result cache
+    :param evaluate_batch: Function (list of (long, lat)) -> list of values
+    :param directions: List of (long, lat) tuples
+    :param cache: ResultCache; if None, only duplicates within query are reused
+    :param cache_key: Cache key for geometry & settings (ResultCache.make_key)
+    :param batch_size: Directions evaluated per evaluate_batch call
+    :param quantum: Memoization angle step (degrees); directions are snapped to it. If None, exact
+    :return: Array of values, in input order
+    """
+    from .cache import ResultCache
+    from .progress import ProgressBar
+
+    snapped = snap(directions, quantum)
+
+    # unique directions, by exact cache coordinates
+    unique = {}
+    for long, lat in snapped:
+        unique.setdefault(ResultCache.quantize(long, lat), (long, lat))
+
+    keys = list(unique)
+    values = dict.fromkeys(keys)
+
+    if cache is not None:
+        values.update(zip(keys, cache.get_many(cache_key, [unique[k] for k in keys])))
+
+    pending = [k for k in keys if values[k] is None]
+    batches = [pending[i: i + batch_size] for i in range(0, len(pending), batch_size)]
+
+    print(f'Query: {len(directions)} directions, {len(keys)} unique, {len(pending)} to evaluate')
+
+    for batch in ProgressBar(batches, desc="Evaluating"):
+        results = evaluate_batch([unique[k] for k in batch])
+
+        for k, value in zip(batch, results):
+            values[k] = value
+            if cache is not None:
+                cache.put(cache_key, *unique[k], value, commit=False)
+
+        if cache is not None:
+            cache.flush()
+
+    return np.array([values[ResultCache.quantize(long, lat)] for long, lat in snapped], dtype=np.float64)
+
+
+def save_results(file_path, directions, values):
+    """
+    Save query results: .npy (values only), otherwise CSV of long, lat, value
+    :param file_path: Output file
+    :param directions: List of (long, lat) tuples (input order)
+    :param values: Array of values (input order)
+    """
+    if file_path.endswith('.npy'):
+        np.save(file_path, values)
+        return
+
+    with open(file_path, 'w') as file:
+        file.write('long,lat,value\n')
+        for (long, lat), value in zip(directions, values):
+            file.write(f'{long!r},{lat!r},{float(value)!r}\n')
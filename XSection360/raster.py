@@ -0,0 +1,84 @@
+"""
+Pure (bpy-free) software rasterizer for XSection360.
+
+Reproduces what the Blender render loop measures - the number of white (covered) pixels
+in an orthographic render of the flat-white geometry - directly from triangle arrays.
+Pixels are sampled at their centres, equivalent to Eevee with 1 sample and filter size 0.
+"""
+
+import numpy as np
+
+from .projection import camera_basis, pixel_size, project_points
+
+
+def coverage_mask(triangles, long, lat, ortho_scale, render_res: tuple):
+    """
+    Rasterize triangles for a single profile direction
+    :param triangles: World-space triangle array (N, 3, 3)
+    :param long: Longitudinal position (degrees)
+    :param lat: Latitudinal position (degrees)
+    :param ortho_scale: Camera orthographic scale
+    :param render_res: Render resolution (x, y)
+    :return: Boolean coverage mask (y, x); row 0 is the bottom of the image
+    """
+    right, up, _ = camera_basis(long, lat)
+    tris2d = project_points(triangles, right, up)  # (N, 3, 2)
+
+    return rasterize(tris2d, ortho_scale, render_res)
+
+
+def rasterize(tris2d, ortho_scale, render_res: tuple):
+    """
+    Rasterize image-plane triangles into a coverage mask
+    :param tris2d: Image-plane triangle array (N, 3, 2), centred on camera axis
+    :param ortho_scale: Camera orthographic scale
+    :param render_res: Render resolution (x, y)
+    :return: Boolean coverage mask (y, x)
+    """
+    res_x, res_y = render_res
+    size = pixel_size(ortho_scale, render_res)
+    mask = np.zeros((res_y, res_x), dtype=bool)
+
+    if len(tris2d) == 0:
+        return mask
+
+    # convert to continuous pixel units: pixel i has its centre at i + 0.5
+    px = tris2d[..., 0] / size + res_x / 2
+    py = tris2d[..., 1] / size + res_y / 2
+
+    # pixel-centre bounding box of each triangle, clipped to frame
+    x0 = np.clip(np.ceil(px.min(axis=1) - 0.5), 0, res_x).astype(int)
+    x1 = np.clip(np.floor(px.max(axis=1) - 0.5) + 1, 0, res_x).astype(int)
+    y0 = np.clip(np.ceil(py.min(axis=1) - 0.5), 0, res_y).astype(int)
+    y1 = np.clip(np.floor(py.max(axis=1) - 0.5) + 1, 0, res_y).astype(int)
+
+    # skip triangles containing no pixel centre (or outside frame, or edge-on)
+    signed = (px[:, 1] - px[:, 0]) * (py[:, 2] - py[:, 0]) - (px[:, 2] - px[:, 0]) * (py[:, 1] - py[:, 0])
+    candidates = np.nonzero((x1 > x0) & (y1 > y0) & (signed != 0))[0]
+
+    for t in candidates:
+        xs = np.arange(x0[t], x1[t]) + 0.5
+        ys = np.arange(y0[t], y1[t]) + 0.5
+        gx, gy = np.meshgrid(xs, ys)
+
+        inside = np.ones(gx.shape, dtype=bool)
+        sign = np.sign(signed[t])
+
+        # edge functions; orientation-independent, inclusive of edges
+        for a, b in ((0, 1), (1, 2), (2, 0)):
+            ax, ay, bx, by = px[t, a], py[t, a], px[t, b], py[t, b]
+            edge = (bx - ax) * (gy - ay) - (by - ay) * (gx - ax)
+            inside &= edge * sign >= 0
+
+        mask[y0[t]:y1[t], x0[t]:x1[t]] |= inside
+
+    return mask
+
+
+def coverage_count(triangles, long, lat, ortho_scale, render_res: tuple):
+    """
+    Calculate raw profile value (number of covered pixels) for a single direction
+    Equivalent to processing.ProcessRender.process for a flat white render
+    :return: Number of covered pixels (float)
+    """
+    return float(np.count_nonzero(coverage_mask(triangles, long, lat, ortho_scale, render_res)))
@@ -6,10 +6,67 @@ Setup scene for XSection360 processing:
     - Create camera in new collection
     - Disable/exclude all other objects/collections
     - Configure render settings
+    - Optionally give each copied object an ID colour (per-component areas)
+    - Optionally strip interior faces (hidden from every direction) from the copies
+    - Optionally build compositor reduction tree (render averaged down in Blender before readback)
+    - Optionally drive rotating parts through a full revolution per frame (phase-averaged areas)
+
+Also writes slim worker .blend files for background processes (write_worker_file)
 """
 
+import json
 import bpy
 
+from .interior import area_change, sphere_directions, visible_faces
+
+# name of scene in worker .blend files
+WORKER_SCENE = 'XS360 Worker'
+
+# render settings copied to worker scene (attribute paths relative to scene)
+WORKER_RENDER_SETTINGS = (
+    'render.engine',
+    'render.resolution_x',
+    'render.resolution_y',
+    'render.resolution_percentage',
+    'render.pixel_aspect_x',
+    'render.pixel_aspect_y',
+    'render.filter_size',
+    'render.dither_intensity',
+    'render.film_transparent',
+    'render.image_settings.file_format',
+    'render.image_settings.color_mode',
+    'render.image_settings.color_depth',
+    'view_settings.view_transform',
+    'view_settings.look',
+    'view_settings.exposure',
+    'view_settings.gamma',
+    'eevee.taa_render_samples',
+    'eevee.use_motion_blur',
+    'eevee.motion_blur_shutter',
+    'frame_start',
+    'frame_end',
+    'frame_step',
+    'frame_current',
+)
+
+# Output collection property listing component names (index + 1 = component ID)
+COMPONENTS_PROPERTY = 'xs360_components'
+
+# copied object property: name of source object
+SOURCE_PROPERTY = 'xs360_source'
+
+# Output collection property: interior stripping report (JSON)
+STRIP_PROPERTY = 'xs360_strip'
+
+# scene property: reduction tile grid size (build_reduction_tree); absent if reduction off
+REDUCTION_PROPERTY = 'xs360_reduction'
+
+# Output collection property: rotating part settings (JSON, see setup_rotors); absent if none
+ROTOR_PROPERTY = 'xs360_rotors'
+
+# collection receiving stripped faces (strip_interior with exclude=True); excluded from view layer
+INTERIOR_COLLECTION = 'XS360 Interior'
+
 
 def create_flat_mat(name, colour):
     """
@@ -62,12 +119,17 @@ def exclude_all_collections(view_layer: bpy.types.ViewLayer):
         layer_collection.exclude = True
 
 
-def copy_mesh_to_new_collection(name, from_collection: bpy.types.Collection = None, set_mat=None):
+def copy_mesh_to_new_collection(name, from_collection: bpy.types.Collection = None, set_mat=None, strip=False,
+                                strip_tolerance=0.001, strip_keep=()):
     """
     Copy (all or some) mesh objects to new collection.
     :param name: Name of new collection
     :param from_collection: Collection from which to copy mesh objects; if None copies from entire scene
     :param set_mat: Material to set duplicate objects; if None not set
+    :param strip: Remove faces hidden from every direction from the copies (see strip_interior);
+        copies get their own mesh data, so source objects are unchanged
+    :param strip_tolerance: Maximum relative area change accepted from stripping
+    :param strip_keep: Names of source objects kept whole when stripping (rotating parts, see strip_interior)
     :return: Created colletion: bpy.types.Collection
     """
 
@@ -89,18 +151,150 @@ def copy_mesh_to_new_collection(name, from_collection: bpy.types.Collection = No
 
         # duplicate object
         copy = obj.copy()
+        copy[SOURCE_PROPERTY] = obj.name
+
+        # single-user mesh: stripped faces must not be removed from source
+        if strip:
+            copy.data = obj.data.copy()
 
         # add duplicate to new collection
         col.objects.link(copy)
 
         if set_mat is not None:
             # set copy material
-            obj.data.materials.clear()
-            obj.data.materials.append(set_mat)
+            copy.data.materials.clear()
+            copy.data.materials.append(set_mat)
+
+    if strip:
+        report = strip_interior(col, tolerance=strip_tolerance, keep=strip_keep)
+        col[STRIP_PROPERTY] = json.dumps(report)
 
     return col
 
 
+def strip_interior(collection: bpy.types.Collection, directions=64, resolution=128, tolerance=0.001,
+                   check_directions=16, exclude=False, keep=()):
+    """
+    Remove faces hidden from every direction (interior structure) from mesh objects in collection.
+    Rays of an orthographic grid are cast from sample directions against a BVH of all objects; faces never
+    hit first are removed, unless the projected area at check directions changes by more than tolerance.
+    Modifiers are applied (evaluated geometry frozen into each object's own mesh), and shape keys dropped.
+    Visibility is found in the current pose only: kept objects (e.g. rotating parts, see setup_rotors, which
+    uncover other faces at other phases) are neither stripped nor used as occluders.
+    :param collection: Collection of (single-user) mesh objects, e.g. setup 'Output'
+    :param directions: Number of sample directions (evenly spread over sphere)
+    :param resolution: Rays across bounding sphere diameter, per direction
+    :param tolerance: Maximum relative area change at check directions; if exceeded, nothing is removed
+    :param check_directions: Number of verification directions (distinct from sample directions)
+    :param exclude: Move hidden faces to objects in excluded INTERIOR_COLLECTION instead of deleting them
+    :param keep: Names of source objects (SOURCE_PROPERTY) kept whole, and not occluding others
+    :return: Report dict: faces, kept_faces, triangles, kept_triangles, area_change, stripped
+    """
+    import bmesh
+    import numpy as np
+    from mathutils import Vector
+    from mathutils.bvhtree import BVHTree
+
+    objects = [obj for obj in collection.objects if obj.type == 'MESH']
+
+    # kept objects last: BVH of the faces before them
+    moving = [obj for obj in objects if obj.get(SOURCE_PROPERTY) in keep]
+    objects = [obj for obj in objects if obj.get(SOURCE_PROPERTY) not in keep] + moving
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+
+    # face indices must match rendered geometry: apply modifiers
+    for obj in objects:
+        mesh = bpy.data.meshes.new_from_object(obj.evaluated_get(depsgraph))
+        obj.modifiers.clear()
+        obj.data = mesh
+
+    # world-space polygons of all objects (shared BVH: objects occlude each other)
+    verts, polys, triangles, triangle_faces, face_offsets = [], [], [], [], []
+
+    for obj in objects:
+        mesh = obj.data
+        matrix = obj.matrix_world
+        base = len(verts)
+
+        face_offsets.append(len(polys))
+        verts.extend(tuple(matrix @ v.co) for v in mesh.vertices)
+        polys.extend(tuple(base + i for i in p.vertices) for p in mesh.polygons)
+
+        mesh.calc_loop_triangles()
+        for tri in mesh.loop_triangles:
+            triangles.append([verts[base + i] for i in tri.vertices])
+            triangle_faces.append(face_offsets[-1] + tri.polygon_index)
+
+    report = {'faces': len(polys), 'kept_faces': len(polys), 'triangles': len(triangles),
+              'kept_triangles': len(triangles), 'area_change': 0.0, 'stripped': False}
+
+    static_faces = face_offsets[len(objects) - len(moving)] if moving else len(polys)
+    if not static_faces:
+        return report
+
+    points = np.array(verts, dtype=np.float64)
+    centre = (points.min(axis=0) + points.max(axis=0)) / 2
+    radius = float(np.sqrt(((points - centre) ** 2).sum(axis=1).max())) * 1.001 + 1e-6
+
+    bvh = BVHTree.FromPolygons(verts, polys[:static_faces])
+
+    def ray_cast(origin, direction, length):
+        return bvh.ray_cast(Vector(origin), Vector(direction), length)[2]
+
+    visible = visible_faces(ray_cast, centre, radius, sphere_directions(directions), resolution)
+    visible |= set(range(static_faces, len(polys)))
+
+    # verify at directions not sampled
+    triangles = np.array(triangles, dtype=np.float64)
+    kept = np.isin(np.array(triangle_faces), list(visible))
+    report.update(kept_faces=len(visible), kept_triangles=int(np.count_nonzero(kept)),
+                  area_change=area_change(triangles, kept, sphere_directions(check_directions, offset=0.25)))
+
+    if report['area_change'] > tolerance:
+        print(f"Interior stripping skipped: area change {report['area_change']:.4%} exceeds tolerance "
+              f"{tolerance:.4%} (increase resolution or directions)")
+        return report
+
+    interior = None
+    if exclude:
+        interior = bpy.data.collections.get(INTERIOR_COLLECTION) or bpy.data.collections.new(INTERIOR_COLLECTION)
+        if interior.name not in bpy.context.scene.collection.children:
+            bpy.context.scene.collection.children.link(interior)
+        bpy.context.view_layer.layer_collection.children[interior.name].exclude = True
+
+    def delete_faces(mesh, indices):
+        bm = bmesh.new()
+        bm.from_mesh(mesh)
+        bm.faces.ensure_lookup_table()
+        bmesh.ops.delete(bm, geom=[bm.faces[i] for i in indices], context='FACES')
+        bm.to_mesh(mesh)
+        bm.free()
+
+    for obj, offset in zip(objects, face_offsets):
+        count = len(obj.data.polygons)
+        hidden = [i for i in range(count) if offset + i not in visible]
+
+        if not hidden:
+            continue
+
+        if interior is not None:
+            # hidden faces kept in separate object
+            part = obj.copy()
+            part.data = obj.data.copy()
+            part.name = f'{obj.name} Interior'
+            interior.objects.link(part)
+            delete_faces(part.data, sorted(set(range(count)) - set(hidden)))
+
+        delete_faces(obj.data, hidden)
+
+    report['stripped'] = True
+    print(f"Interior stripping: {report['faces']} -> {report['kept_faces']} faces, "
+          f"{report['triangles']} -> {report['kept_triangles']} triangles, "
+          f"max area change {report['area_change']:.4%}")
+
+    return report
+
+
 def hide_all_without_collection():
     """
     Hide all objects missed by exclude_all_collections.
@@ -132,6 +326,60 @@ def config_render_settings(scene: bpy.types.Scene):
     scene.render.engine = 'BLENDER_EEVEE'
 
 
+def id_colour(component_id):
+    """
+    Encode component ID as emission colour: red = low byte, green = high byte
+    Decoded by processing.ProcessRender.component_ids (requires 'Raw' view transform)
+    :param component_id: Component ID (1 to 65535; 0 is background)
+    :return: Colour (r, g, b, a)
+    """
+    return (component_id % 256) / 255, (component_id // 256) / 255, 0, 1
+
+
+def assign_component_materials(collection: bpy.types.Collection):
+    """
+    Give each mesh object in collection a distinct ID colour material (object-level material slots,
+    so mesh data shared with source objects is unchanged). Component names are stored on the collection.
+    :param collection: Setup Output collection
+    :return: List of component names (index + 1 = component ID)
+    """
+    names = []
+
+    for obj in collection.objects:
+        if obj.type != 'MESH':
+            continue
+
+        names.append(obj.get(SOURCE_PROPERTY, obj.name))
+        mat = create_flat_mat(f'XS360 ID {len(names)}', id_colour(len(names)))
+
+        if not obj.material_slots:
+            obj.data.materials.append(None)
+
+        for slot in obj.material_slots:
+            slot.link = 'OBJECT'
+            slot.material = mat
+
+    if len(names) > 65535:
+        raise Exception(f'Too many components ({len(names)}); at most 65535 can be encoded')
+
+    collection[COMPONENTS_PROPERTY] = json.dumps(names)
+
+    # ID colours must be written unchanged
+    bpy.context.scene.view_settings.view_transform = 'Raw'
+
+    return names
+
+
+def get_components(collection: bpy.types.Collection):
+    """
+    :param collection: Setup Output collection
+    :return: List of component names, or None if setup without components
+    """
+    if COMPONENTS_PROPERTY not in collection:
+        return None
+    return json.loads(collection[COMPONENTS_PROPERTY])
+
+
 def create_camera(name: str, collection: bpy.types.Collection, ortho_scale=2):
     """
     Create camera for processing
@@ -155,6 +403,141 @@ def create_camera(name: str, collection: bpy.types.Collection, ortho_scale=2):
     return cam_obj
 
 
+def build_reduction_tree(scene: bpy.types.Scene, tiles=1):
+    """
+    Build compositor tree averaging the render down to a small tile grid inside Blender:
+    Render Layers -> Scale (0.5) -> Scale (0.5) ... -> Composite
+    Each halving samples bilinearly between 2x2 pixel centres, i.e. exactly averages them, so halving stops
+    once an axis is odd or reaches tiles. Compositing stays disabled (scene.render.use_compositing) except
+    for reduced renders (see background.Reduction).
+    :param scene: Setup scene
+    :param tiles: Minimum tile grid size per axis
+    :return: Reduced image size (x, y), or None if render resolution cannot be halved
+    """
+    res_x, res_y = scene.render.resolution_x, scene.render.resolution_y
+
+    scene.use_nodes = True
+    tree = scene.node_tree
+
+    for node in list(tree.nodes):
+        tree.nodes.remove(node)
+
+    layers = tree.nodes.new('CompositorNodeRLayers')
+    output = layers.outputs['Image']
+
+    steps = 0
+    while res_x % 2 == 0 and res_y % 2 == 0 and res_x // 2 >= tiles and res_y // 2 >= tiles:
+        scale = tree.nodes.new('CompositorNodeScale')
+        scale.space = 'RELATIVE'
+        scale.inputs['X'].default_value = 0.5
+        scale.inputs['Y'].default_value = 0.5
+        scale.location = 200 * (steps + 1), 0
+
+        tree.links.new(output, scale.inputs['Image'])
+        output = scale.outputs['Image']
+
+        res_x, res_y = res_x // 2, res_y // 2
+        steps += 1
+
+    composite = tree.nodes.new('CompositorNodeComposite')
+    composite.location = 200 * (steps + 1), 0
+    if hasattr(composite, 'use_alpha'):
+        composite.use_alpha = False
+    tree.links.new(output, composite.inputs['Image'])
+
+    scene.render.use_compositing = False
+
+    if steps == 0:
+        return None
+    return res_x, res_y
+
+
+def rotor_expressions(base, axis):
+    """
+    Driver expressions of quaternion components rotating about local axis by one revolution per frame
+    base @ Quaternion(axis, 2 pi frame), written out: each component is A cos(pi frame) + B sin(pi frame)
+    :param base: Base rotation quaternion (w, x, y, z)
+    :param axis: Local rotation axis (x, y, z), unit length
+    :return: List of 4 expressions (driver simple expressions: no Python evaluation needed)
+    """
+    w, x, y, z = base
+    ax, ay, az = axis
+
+    terms = [
+        (w, -(x * ax + y * ay + z * az)),
+        (x, w * ax + y * az - z * ay),
+        (y, w * ay + z * ax - x * az),
+        (z, w * az + x * ay - y * ax),
+    ]
+
+    return [f'{a:.12f}*cos(frame*3.141592653589793)+{b:.12f}*sin(frame*3.141592653589793)' for a, b in terms]
+
+
+def setup_rotors(scene: bpy.types.Scene, collection: bpy.types.Collection, sources, axis='Z', method='BLUR',
+                 phases=16):
+    """
+    Drive rotating parts (rotors, propellers) through one full revolution per frame about their local axis
+    (through the object origin), so areas can be averaged over rotation phase:
+        BLUR: motion blur over one frame; each render integrates [phases] motion steps (one render per view)
+        PHASES: background renders each view at [phases] evenly spaced subframes and averages (background.Phases)
+    Settings are stored on the collection (ROTOR_PROPERTY)
+    :param scene: Setup scene
+    :param collection: Setup Output collection
+    :param sources: Names of source objects designated as rotating
+    :param axis: Local rotation axis: 'X', 'Y' or 'Z'
+    :param method: 'BLUR' or 'PHASES'
+    :param phases: Motion steps (BLUR) or renders per view (PHASES)
+    :return: Names of rotating copies
+    """
+    vector = {'X': (1, 0, 0), 'Y': (0, 1, 0), 'Z': (0, 0, 1)}[axis]
+    rotors = [obj for obj in collection.objects if obj.type == 'MESH' and obj.get(SOURCE_PROPERTY) in sources]
+
+    for obj in rotors:
+        _, base, _ = obj.matrix_basis.decompose()
+
+        obj.rotation_mode = 'QUATERNION'
+        obj.rotation_quaternion = base
+
+        for index, expression in enumerate(rotor_expressions(tuple(base), vector)):
+            fcurve = obj.driver_add('rotation_quaternion', index)
+            fcurve.driver.type = 'SCRIPTED'
+            fcurve.driver.expression = expression
+
+    eevee = scene.eevee
+    if method == 'BLUR':
+        # shutter spans one frame: one revolution, sampled once per motion step
+        eevee.use_motion_blur = True
+        eevee.motion_blur_shutter = 1.0
+        if hasattr(eevee, 'motion_blur_steps'):
+            eevee.motion_blur_steps = phases
+        eevee.taa_render_samples = phases
+    else:
+        eevee.use_motion_blur = False
+
+    names = [obj.name for obj in rotors]
+    collection[ROTOR_PROPERTY] = json.dumps({'objects': names, 'axis': axis, 'method': method, 'phases': phases})
+
+    return names
+
+
+def get_rotors(collection: bpy.types.Collection):
+    """
+    :param collection: Setup Output collection
+    :return: Rotating part settings dict (objects, axis, method, phases), or None if setup without rotating parts
+    """
+    if ROTOR_PROPERTY not in collection:
+        return None
+    return json.loads(collection[ROTOR_PROPERTY])
+
+
+def get_reduction(scene: bpy.types.Scene):
+    """
+    :param scene: Setup scene
+    :return: Reduction tile grid size, or None if setup without reduction
+    """
+    return scene.get(REDUCTION_PROPERTY)
+
+
 def configure_viewer_node():
     """
     DEPRECATED - script now run in background, Viewer Node not available
@@ -190,10 +573,72 @@ def configure_viewer_node():
     # arr = np.array(pixels[:])
 
 
-def apply_setup(target_collection):
+def copy_settings(source, target, paths):
+    """
+    Copy attribute values between datablocks
+    :param source: Datablock to copy from
+    :param target: Datablock to copy to
+    :param paths: Attribute paths, e.g. 'render.resolution_x'
+    """
+    for path in paths:
+        *parents, name = path.split('.')
+
+        src, dst = source, target
+        for parent in parents:
+            src, dst = getattr(src, parent), getattr(dst, parent)
+
+        setattr(dst, name, getattr(src, name))
+
+
+def write_worker_file(scene: bpy.types.Scene, camera: bpy.types.Object, file_path):
+    """
+    Write minimal .blend for background workers: only the Output collection (with camera),
+    world and render settings; other collections, images and history are left out
+    Scene in written file is named WORKER_SCENE
+    :param scene: Setup scene
+    :param camera: XSection360 camera (in Output collection)
+    :param file_path: Worker .blend file path
+    """
+    collection = camera.users_collection[0]  # setup places camera in Output collection
+
+    # temporary scene containing only what workers render
+    worker = bpy.data.scenes.new(WORKER_SCENE)
+    try:
+        worker.name = WORKER_SCENE  # name may be taken by previous (failed) write
+        worker.collection.children.link(collection)
+        worker.camera = camera
+        worker.world = scene.world
+        copy_settings(scene, worker, WORKER_RENDER_SETTINGS)
+        if REDUCTION_PROPERTY in scene:
+            worker[REDUCTION_PROPERTY] = scene[REDUCTION_PROPERTY]  # tree rebuilt by worker
+        if hasattr(scene.eevee, 'motion_blur_steps'):
+            worker.eevee.motion_blur_steps = scene.eevee.motion_blur_steps  # rotating parts (Blender 2.91+)
+
+        # writes scene and its dependencies (collection, objects, meshes, materials, world)
+        bpy.data.libraries.write(file_path, {worker}, compress=False)
+    finally:
+        bpy.data.scenes.remove(worker)
+
+
+def apply_setup(target_collection, components=False, strip=False, strip_tolerance=0.001, reduction=0,
+                rotor_collection=None, rotor_axis='Z', rotor_method='BLUR', rotor_phases=16):
     """
     Apply all above setup tasks.
+    :param target_collection: Collection from which mesh objects are copied
+    :param components: Give each copied object an ID colour, so its visible area is measured separately
+    :param strip: Remove interior faces (hidden from every direction) from copied objects
+    :param strip_tolerance: Maximum relative area change accepted from stripping
+    :param reduction: If non-zero, average renders down to a tile grid of at least this size in the compositor,
+        so background processes read only a few pixels per view (total area only)
+    :param rotor_collection: Collection of rotating parts (objects also in target collection); if None, none
+    :param rotor_axis: Local rotation axis of rotating parts ('X', 'Y' or 'Z')
+    :param rotor_method: Phase averaging: 'BLUR' (motion blur) or 'PHASES' (renders per view)
+    :param rotor_phases: Motion steps (BLUR) or renders per view (PHASES)
     """
+    # motion blur mixes ID colours
+    if rotor_collection is not None and components and rotor_method == 'BLUR':
+        raise Exception('Rotating parts with motion blur cannot be combined with Per-Object Areas; use Phases')
+
     set_world_bg((0, 0, 0, 1))
     config_render_settings(bpy.context.scene)
 
@@ -203,7 +648,24 @@ def apply_setup(target_collection):
     hide_all_without_collection()
 
     mat = create_flat_mat('WHITE', (1, 1, 1, 1))
-    workingCol = copy_mesh_to_new_collection('Output', target_collection, mat)
+    # rotating parts uncover faces hidden in the rest pose: kept whole by interior stripping
+    rotor_names = [obj.name for obj in rotor_collection.all_objects] if rotor_collection is not None else []
+    workingCol = copy_mesh_to_new_collection('Output', target_collection, mat, strip, strip_tolerance, rotor_names)
+
+    if components:
+        assign_component_materials(workingCol)
+
+    scene = bpy.context.scene
+    if reduction:
+        scene[REDUCTION_PROPERTY] = reduction
+        build_reduction_tree(scene, reduction)
+    elif REDUCTION_PROPERTY in scene:
+        del scene[REDUCTION_PROPERTY]
+
+    if rotor_collection is not None:
+        setup_rotors(scene, workingCol, rotor_names, rotor_axis, rotor_method, rotor_phases)
+    else:
+        scene.eevee.use_motion_blur = False
 
     cam = create_camera('Cam 360', workingCol)
 
@@ -0,0 +1,343 @@
+"""
+Silhouette-edge projected area engine (bpy-free), for closed manifold meshes.
+
+The projected outline of a closed mesh is made of its silhouette edges: edges shared by
+one front-facing and one back-facing face. Edge-face adjacency and face normals are
+indexed once (SilhouetteIndex); per direction, faces are classified with one dot product,
+and only the silhouette edges are projected. Per-direction cost beyond the dot product
+scales with silhouette size, not mesh size.
+
+Silhouette edges are oriented with their front face on the left, so they form closed
+contour loops whose winding number at a point counts the front-facing layers above it.
+The projected area is the area of nonzero winding:
+    - Simple loops meeting nowhere (disjoint or nested): shoelace area of each loop, counted
+      (positive for outer boundaries, negative for holes) only where the loop separates zero
+      and nonzero winding
+    - Crossing or touching contours (e.g. wing in front of fuselage): slab sweep, as exact.py, over the
+      contour edges only, accumulating winding numbers upwards through each slab
+
+Results equal the exact engine (exact.py) for closed meshes, to floating point precision.
+"""
+
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from .exact import candidate_pairs, segment_crossing_xs
+from .projection import camera_basis
+
+# largest number of simple contour loops resolved by pairwise nesting tests; beyond it, the slab sweep is used
+MAX_NESTED_LOOPS = 256
+
+
+class SilhouetteIndex:
+    def __init__(self, triangles, object_index=None, weld_tolerance=1e-9):
+        """
+        Precompute edge-face adjacency and face normals
+        Vertices are welded by position, per object (objects touching each other stay separate meshes)
+        :param triangles: World-space triangle array (N, 3, 3); counter-clockwise seen from outside
+        :param object_index: Object of each triangle (N,); if None, one object
+        :param weld_tolerance: Vertex weld distance, relative to geometry size (absorbs seam rounding)
+        """
+        triangles = np.asarray(triangles, dtype=np.float64).reshape(-1, 3, 3)
+        owner = np.zeros(len(triangles)) if object_index is None else np.asarray(object_index, dtype=np.float64)
+
+        # weld vertices on grid of tolerance size
+        points = triangles.reshape(-1, 3)
+        step = weld_tolerance * max(float(np.abs(points).max(initial=0)), 1e-12)
+        keyed = np.column_stack([np.repeat(owner, 3), np.rint(points / step)])
+        _, first_use, inverse = np.unique(keyed, axis=0, return_index=True, return_inverse=True)
+        faces = inverse.reshape(-1, 3)
+
+        # degenerate faces (repeated vertex) have no edges of their own
+        faces = faces[(faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) & (faces[:, 2] != faces[:, 0])]
+
+        self.vertices = points[first_use]
+        self.normals = np.cross(self.vertices[faces[:, 1]] - self.vertices[faces[:, 0]],
+                                self.vertices[faces[:, 2]] - self.vertices[faces[:, 0]])
+
+        # half edges, paired by undirected edge
+        tails = faces.ravel()
+        heads = faces[:, [1, 2, 0]].ravel()
+        face = np.repeat(np.arange(len(faces)), 3)
+
+        low, high = np.minimum(tails, heads), np.maximum(tails, heads)
+        order = np.lexsort((high, low))
+        low, high = low[order], high[order]
+
+        first, second = order[0::2], order[1::2]
+        paired = (len(order) % 2 == 0 and np.array_equal(low[0::2], low[1::2]) and
+                  np.array_equal(high[0::2], high[1::2]) and
+                  not np.any((low[2::2] == low[1:-1:2]) & (high[2::2] == high[1:-1:2])))
+        if not paired:
+            raise Exception('Silhouette engine needs closed manifold meshes (every edge shared by exactly two faces); '
+                            'use the exact engine with --open-mesh')
+
+        # consistently oriented neighbours traverse shared edge in opposite directions
+        if np.any(tails[first] != heads[second]):
+            raise Exception('Silhouette engine needs consistently oriented face normals (recalculate normals outside)')
+
+        self.edges = np.stack([tails[first], heads[first]], axis=-1)  # as traversed by first face
+        self.edge_faces = np.stack([face[first], face[second]], axis=-1)
+
+    def contour(self, long, lat):
+        """
+        Project silhouette edges for direction, oriented with front-facing face on the left
+        :param long: Longitudinal position (degrees)
+        :param lat: Latitudinal position (degrees)
+        :return: (points (P, 2), edges (S, 2) of point indices)
+        """
+        right, up, view = camera_basis(long, lat)
+
+        # facing camera: counter-clockwise in image plane (as exact.direction_area)
+        front = self.normals @ view < 0
+
+        first, second = self.edge_faces.T
+        silhouette = front[first] != front[second]
+
+        edges = self.edges[silhouette]
+        flip = ~front[first[silhouette]]
+        edges[flip] = edges[flip, ::-1]
+
+        used, local = np.unique(edges, return_inverse=True)
+        points = self.vertices[used] @ np.stack([right, up], axis=-1)
+
+        return points, local.reshape(-1, 2)
+
+    def area(self, long, lat):
+        """
+        Calculate projected area for a single direction
+        :return: Projected area (world units)
+        """
+        points, edges = self.contour(long, lat)
+        return contour_area(points, edges)
+
+
+def contour_loops(edges):
+    """
+    Assemble oriented edges into closed loops (vectorized pointer jumping)
+    :param edges: Edges (S, 2) of point indices; every point has as many incoming as outgoing edges
+    :return: Loop label of each edge (S,), 0 to number of loops - 1
+    """
+    tails, heads = edges.T
+
+    # pair i-th edge entering each point with i-th edge leaving it
+    into = np.argsort(heads, kind='stable')
+    out = np.argsort(tails, kind='stable')
+    if not np.array_equal(heads[into], tails[out]):
+        raise Exception('Contour edges do not form closed loops')
+
+    following = np.empty(len(edges), dtype=np.int64)
+    following[into] = out
+
+    # label each loop by its smallest edge index
+    label = np.arange(len(edges))
+    jump = following
+    for _ in range(int(np.ceil(np.log2(max(len(edges), 2)))) + 1):
+        label = np.minimum(label, label[jump])
+        jump = jump[jump]
+
+    return np.unique(label, return_inverse=True)[1].reshape(-1)
+
+
+def contours_touch(points, edges):
+    """
+    Check whether any two non-adjacent contour edges meet (crossing, touching or overlapping)
+    Loops of symmetric views often meet exactly at vertices, which proper crossing tests miss
+    :param points: Contour points (P, 2)
+    :param edges: Oriented edges (S, 2) of point indices
+    :return: True if edges meet anywhere other than shared end points
+    """
+    starts, ends = points[edges[:, 0]], points[edges[:, 1]]
+    i, j = candidate_pairs(np.minimum(starts, ends), np.maximum(starts, ends))
+
+    # consecutive edges meet at shared end point
+    adjacent = (edges[i][:, :, None] == edges[j][:, None, :]).any(axis=(1, 2))
+    i, j = i[~adjacent], j[~adjacent]
+
+    p, r = starts[i], ends[i] - starts[i]
+    q, s = starts[j], ends[j] - starts[j]
+
+    def cross(a, b):
+        return a[:, 0] * b[:, 1] - a[:, 1] * b[:, 0]
+
+    denom = cross(r, s)
+    parallel = denom == 0
+
+    # collinear segments with overlapping boxes overlap
+    if np.any(parallel & (cross(q - p, r) == 0)):
+        return True
+
+    denom[parallel] = 1
+    t = cross(q - p, s) / denom
+    u = cross(q - p, r) / denom
+
+    return bool(np.any(~parallel & (t >= 0) & (t <= 1) & (u >= 0) & (u <= 1)))
+
+
+def winding_numbers(queries, starts, ends):
+    """
+    Winding number of oriented edges around query points (crossing rule)
+    :param queries: Points (Q, 2)
+    :param starts: Edge start points (S, 2)
+    :param ends: Edge end points (S, 2)
+    :return: Winding number matrix (Q, S): contribution of each edge to each point
+    """
+    qx, qy = queries[:, 0, None], queries[:, 1, None]
+    ax, ay, bx, by = starts[:, 0], starts[:, 1], ends[:, 0], ends[:, 1]
+
+    # which side of edge the point lies (positive: left)
+    side = (bx - ax) * (qy - ay) - (qx - ax) * (by - ay)
+
+    upward = (ay <= qy) & (by > qy) & (side > 0)
+    downward = (by <= qy) & (ay > qy) & (side < 0)
+
+    return upward.astype(np.int64) - downward.astype(np.int64)
+
+
+def nested_area(points, edges, labels):
+    """
+    Area of nonzero winding of contour loops which do not cross (disjoint or nested)
+    Each loop's signed (shoelace) area counts where winding changes between zero and nonzero across it
+    :param points: Contour points (P, 2)
+    :param edges: Oriented edges (S, 2)
+    :param labels: Loop label of each edge (contour_loops)
+    :return: Projected area
+    """
+    starts, ends = points[edges[:, 0]], points[edges[:, 1]]
+
+    # shoelace
+    loop_areas = np.bincount(labels, 0.5 * (starts[:, 0] * ends[:, 1] - ends[:, 0] * starts[:, 1]))
+    orientation = np.sign(loop_areas).astype(np.int64)
+
+    # winding just outside each loop: edge midpoint, against all other loops
+    n_loops = len(loop_areas)
+    probe = np.zeros(n_loops, dtype=np.int64)
+    probe[labels[::-1]] = np.arange(len(labels))[::-1]  # first edge of each loop
+    midpoints = 0.5 * (starts[probe] + ends[probe])
+
+    contributions = winding_numbers(midpoints, starts, ends)
+    own = labels[None, :] == np.arange(n_loops)[:, None]
+    outside = np.where(own, 0, contributions).sum(axis=1)
+    inside = outside + orientation
+
+    boundary = (outside != 0) != (inside != 0)
+    sign = np.where(inside != 0, 1, -1)
+
+    return float(np.sum(np.abs(loop_areas[boundary]) * sign[boundary]))
+
+
+def swept_area(points, edges, crossings):
+    """
+    Area of nonzero winding of contour loops, by vectorized slab sweep
+    Slab boundaries at every point x and edge crossing x: inside a slab, edge order is fixed, so
+    the covered length is linear in x and the midpoint rule is exact
+    :param points: Contour points (P, 2)
+    :param edges: Oriented edges (S, 2)
+    :param crossings: Edge crossing x coordinates (exact.segment_crossing_xs)
+    :return: Projected area
+    """
+    xs = np.unique(np.concatenate([points[:, 0], crossings]))
+    if len(xs) < 2:
+        return 0.0
+
+    a, b = points[edges[:, 0]], points[edges[:, 1]]
+
+    # vertical edges span no slab
+    spanning = a[:, 0] != b[:, 0]
+    a, b = a[spanning], b[spanning]
+
+    # slabs spanned by each edge (end points are slab boundaries)
+    first = np.searchsorted(xs, np.minimum(a[:, 0], b[:, 0]))
+    last = np.searchsorted(xs, np.maximum(a[:, 0], b[:, 0]))
+    counts = last - first
+
+    edge = np.repeat(np.arange(len(a)), counts)
+    slab = np.repeat(first, counts) + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+
+    # y of each edge at slab midpoint
+    mid = 0.5 * (xs[slab] + xs[slab + 1])
+    a, b = a[edge], b[edge]
+    y = a[:, 1] + (mid - a[:, 0]) / (b[:, 0] - a[:, 0]) * (b[:, 1] - a[:, 1])
+
+    # upwards through each slab: edges heading +x have their front face above (winding +1)
+    order = np.lexsort((y, slab))
+    slab, y = slab[order], y[order]
+    winding = np.cumsum(np.where(b[order, 0] > a[order, 0], 1, -1))
+
+    # loops are closed: winding returns to zero at top of each slab, so gaps between slabs never count
+    covered = (winding[:-1] != 0) & (slab[:-1] == slab[1:])
+    widths = xs[slab[:-1] + 1] - xs[slab[:-1]]
+
+    return float(np.sum((y[1:] - y[:-1])[covered] * widths[covered]))
+
+
+def contour_area(points, edges):
+    """
+    Calculate area of nonzero winding of oriented contour edges (projected area)
+    :param points: Contour points (P, 2)
+    :param edges: Oriented edges (S, 2) of point indices, forming closed loops
+    :return: Projected area
+    """
+    if len(edges) == 0:
+        return 0.0
+
+    # simple loops, meeting nowhere: shoelace
+    if np.bincount(edges[:, 0]).max() == 1 and not contours_touch(points, edges):
+        labels = contour_loops(edges)
+        if labels.max() < MAX_NESTED_LOOPS:
+            return nested_area(points, edges, labels)
+
+    crossings = segment_crossing_xs(points[edges[:, 0]], points[edges[:, 1]])
+
+    return swept_area(points, edges, crossings)
+
+
+def direction_areas(index: SilhouetteIndex, directions):
+    """
+    Calculate projected area for list of directions (single process)
+    :param index: SilhouetteIndex of geometry
+    :param directions: List of (long, lat)
+    :return: List of areas
+    """
+    return [index.area(long, lat) for long, lat in directions]
+
+
+# index held by each pool worker process (load_index): sent once per worker, not per task
+worker_index = None
+
+
+def load_index(index: SilhouetteIndex):
+    """
+    Pool initializer: keep silhouette index in worker process
+    :param index: SilhouetteIndex of geometry
+    """
+    global worker_index
+    worker_index = index
+
+
+def worker_direction_areas(directions):
+    """
+    Calculate projected area for list of directions, from index loaded into worker (pool task)
+    """
+    return direction_areas(worker_index, directions)
+
+
+def profile_areas(triangles, directions, processes=None, chunk_size=64, object_index=None):
+    """
+    Calculate projected areas across directions in a process pool
+    The index is built once and loaded into each worker once (pool initializer); tasks only carry directions
+    :param triangles: World-space triangle array (N, 3, 3) of closed meshes
+    :param directions: List of (long, lat)
+    :param processes: Number of worker processes; if None, CPU count
+    :param chunk_size: Directions per pool task
+    :param object_index: Object of each triangle (N,); if None, one object
+    :return: Generator of areas, in direction order (allows progress bar)
+    """
+    index = SilhouetteIndex(triangles, object_index)
+    chunks = [directions[i: i + chunk_size] for i in range(0, len(directions), chunk_size)]
+
+    with ProcessPoolExecutor(processes, initializer=load_index, initargs=(index,)) as pool:
+        tasks = [pool.submit(worker_direction_areas, chunk) for chunk in chunks]
+
+        for task in tasks:
+            yield from task.result()
@@ -0,0 +1,186 @@
+"""
+Geometry snapshot: evaluated Output collection triangles and camera parameters,
+written once from Blender to a compact .npz file.
+
+A snapshot lets profiles be computed outside Blender (see __main__.py):
+
+python -m XSection360 profile snapshot.npz -f=profile.png -x=90 -y=45
+"""
+
+import hashlib
+import json
+import numpy as np
+
+SNAPSHOT_VERSION = 1
+
+
+def mesh_object_triangles(obj, depsgraph):
+    """
+    Retrieve world-space triangles of evaluated mesh object (modifiers applied)
+    :param obj: Mesh object (bpy.types.Object)
+    :param depsgraph: Evaluated dependency graph
+    :return: Triangle array (N, 3, 3) float64
+    """
+    eval_obj = obj.evaluated_get(depsgraph)
+    mesh = eval_obj.to_mesh()
+    mesh.calc_loop_triangles()
+
+    # vertex coordinates (local space)
+    verts = np.empty(len(mesh.vertices) * 3, dtype=np.float64)
+    mesh.vertices.foreach_get('co', verts)
+    verts = verts.reshape(-1, 3)
+
+    # triangle vertex indices
+    indices = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int64)
+    mesh.loop_triangles.foreach_get('vertices', indices)
+    indices = indices.reshape(-1, 3)
+
+    # apply world transform
+    matrix = np.array(eval_obj.matrix_world, dtype=np.float64)
+    verts = verts @ matrix[:3, :3].T + matrix[:3, 3]
+
+    eval_obj.to_mesh_clear()
+
+    return verts[indices]
+
+
+def collection_triangles(collection, depsgraph):
+    """
+    Retrieve world-space triangles of all rendered mesh objects in collection
+    :param collection: Target collection (bpy.types.Collection), e.g. setup 'Output'
+    :param depsgraph: Evaluated dependency graph
+    :return: (triangles (N, 3, 3), object_index (N,), object_names list)
+    """
+    triangles = []
+    object_index = []
+    object_names = []
+
+    for obj in collection.all_objects:
+        # only include what would be rendered
+        if obj.type != 'MESH' or obj.hide_render:
+            continue
+
+        tris = mesh_object_triangles(obj, depsgraph)
+
+        triangles.append(tris)
+        object_index.append(np.full(len(tris), len(object_names), dtype=np.int32))
+        object_names.append(obj.name)
+
+    if not triangles:
+        return np.zeros((0, 3, 3)), np.zeros(0, dtype=np.int32), object_names
+
+    return np.concatenate(triangles), np.concatenate(object_index), object_names
+
+
+def geometry_hash(triangles):
+    """
+    Content hash of triangle geometry
+    :param triangles: Triangle array (N, 3, 3)
+    :return: Hex digest string
+    """
+    data = np.ascontiguousarray(triangles, dtype=np.float32)
+    return hashlib.sha256(data.tobytes()).hexdigest()
+
+
+class Snapshot:
+    def __init__(self, triangles, ortho_scale, render_res: tuple, cam_distance,
+                 object_index=None, object_names=None):
+        """
+        Exported geometry and camera parameters for Blender-free profile processing
+        :param triangles: World-space triangle array (N, 3, 3)
+        :param ortho_scale: Camera orthographic scale
+        :param render_res: Render resolution for each profile pixel (x, y)
+        :param cam_distance: Camera distance from centre (sphere radius)
+        :param object_index: Source object index of each triangle; defaults to 0
+        :param object_names: Source object names, indexed by object_index
+        """
+        self.triangles = np.asarray(triangles, dtype=np.float32).reshape(-1, 3, 3)
+        self.ortho_scale = float(ortho_scale)
+        self.render_res = tuple(int(r) for r in render_res)
+        self.cam_distance = float(cam_distance)
+
+        if object_index is None:
+            object_index = np.zeros(len(self.triangles), dtype=np.int32)
+        self.object_index = np.asarray(object_index, dtype=np.int32)
+        self.object_names = list(object_names) if object_names is not None else ['Output']
+
+    @classmethod
+    def from_scene(cls, scene, collection, cam_distance, camera=None):
+        """
+        Create snapshot from Blender scene
+        :param scene: Target scene (bpy.types.Scene)
+        :param collection: Collection containing processed objects (setup 'Output')
+        :param cam_distance: Camera distance from centre
+        :param camera: Orthographic camera object; if None uses scene camera
+        :return: Snapshot
+        """
+        if camera is None:
+            camera = scene.camera
+
+        depsgraph = scene.view_layers[0].depsgraph
+        depsgraph.update()
+        triangles, object_index, object_names = collection_triangles(collection, depsgraph)
+
+        render_res = scene.render.resolution_x, scene.render.resolution_y
+
+        return cls(triangles, camera.data.ortho_scale, render_res, cam_distance, object_index, object_names)
+
+    @property
+    def geometry_hash(self):
+        return geometry_hash(self.triangles)
+
+    @property
+    def camera_params(self):
+        return {
+            'ortho_scale': self.ortho_scale,
+            'render_res': list(self.render_res),
+            'cam_distance': self.cam_distance,
+        }
+
+    @property
+    def content_hash(self):
+        """
+        Hash of geometry and camera parameters; identifies snapshot content
+        """
+        digest = hashlib.sha256(self.geometry_hash.encode())
+        digest.update(json.dumps(self.camera_params, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def save(self, file_path):
+        """
+        Write snapshot to compressed .npz file
+        :param file_path: Target file path
+        """
+        np.savez_compressed(
+            file_path,
+            version=SNAPSHOT_VERSION,
+            triangles=self.triangles,
+            object_index=self.object_index,
+            object_names=np.array(self.object_names, dtype=str),
+            ortho_scale=self.ortho_scale,
+            render_res=np.array(self.render_res),
+            cam_distance=self.cam_distance,
+            content_hash=self.content_hash,
+        )
+
+    @classmethod
+    def load(cls, file_path):
+        """
+        Read snapshot from .npz file; content hash is verified
+        :param file_path: Snapshot file path
+        :return: Snapshot
+        """
+        with np.load(file_path) as data:
+            if int(data['version']) != SNAPSHOT_VERSION:
+                raise Exception(f"unsupported snapshot version: {int(data['version'])}")
+
+            snapshot = cls(
+                data['triangles'], float(data['ortho_scale']), tuple(data['render_res']),
+                float(data['cam_distance']), data['object_index'], data['object_names'].tolist()
+            )
+            stored_hash = str(data['content_hash'])
+
+        if snapshot.content_hash != stored_hash:
+            raise Exception(f"snapshot content hash mismatch: {file_path}")
+
+        return snapshot
@@ -0,0 +1,119 @@
+"""
+Edge-adaptive supersampling of views (bpy-free planning & combination).
+
+Area error comes only from pixels on the silhouette boundary. A view is rendered at the
+scene render resolution first; frame-aligned tiles containing edge pixels are then
+re-rendered at factor x the resolution through render borders (same camera, so each
+high-resolution pixel is an exact 1/factor^2 subdivision of a base pixel), and their base
+counts are replaced by the high-resolution counts / factor^2. Interior and background
+pixels are only rendered once, at base resolution.
+
+Adjacent edge tiles of a tile row are merged into one border (one render each), as every
+render has a fixed overhead; past max_rects, a single border around all edge tiles is used.
+"""
+
+import numpy as np
+
+
+def edge_mask(weights):
+    """
+    Find pixels that may be partially covered: partial weights, or binary pixels with a
+    3x3 neighbourhood mixing covered and uncovered pixels (sub-pixel geometry either side)
+    :param weights: Pixel coverage / lightness (y, x), 0 to 1
+    :return: Boolean mask (y, x)
+    """
+    covered = weights > 0.5
+    partial = (weights > 0) & (weights < 1)
+
+    padded = np.pad(covered, 1, mode='edge')
+    height, width = covered.shape
+
+    # 3x3 any / all, over shifted views
+    shifts = [padded[dy:dy + height, dx:dx + width] for dy in range(3) for dx in range(3)]
+    any_covered = np.logical_or.reduce(shifts)
+    all_covered = np.logical_and.reduce(shifts)
+
+    return partial | (any_covered & ~all_covered)
+
+
+def edge_rects(weights, tile, offset=(0, 0), max_rects=16):
+    """
+    Frame pixel rectangles to supersample: edge tiles, merged along tile rows
+    :param weights: Pixel coverage (y, x) of base render (cropped to render border if used)
+    :param tile: Tile size (base pixels); tiles are aligned to the frame origin
+    :param offset: Frame pixel position (x, y) of weights[0, 0] (render border origin)
+    :param max_rects: Largest number of rectangles; beyond it, one rectangle around all edge tiles
+    :return: List of (x0, x1, y0, y1) frame pixel rectangles (end exclusive), within weights
+    """
+    height, width = weights.shape
+    ox, oy = offset
+
+    y, x = np.nonzero(edge_mask(weights))
+    if len(x) == 0:
+        return []
+
+    def span(t, o, size):
+        return max(t * tile, o), min((t + 1) * tile, o + size)
+
+    # edge tiles (frame tile indices), per tile row
+    tiles = np.unique(np.stack([(y + oy) // tile, (x + ox) // tile], axis=-1), axis=0)
+
+    rects = []
+    for row in np.unique(tiles[:, 0]):
+        columns = tiles[tiles[:, 0] == row, 1]
+
+        # runs of consecutive tile columns
+        breaks = np.nonzero(np.diff(columns) > 1)[0]
+        starts = np.concatenate([[columns[0]], columns[breaks + 1]])
+        ends = np.concatenate([columns[breaks], [columns[-1]]])
+
+        y0, y1 = span(row, oy, height)
+        for start, end in zip(starts, ends):
+            x0, x1 = span(start, ox, width)[0], span(end, ox, width)[1]
+            rects.append((int(x0), int(x1), int(y0), int(y1)))
+
+    if len(rects) > max_rects:
+        x0, y0 = ox + x.min(), oy + y.min()
+        rects = [(int(x0), int(ox + x.max() + 1), int(y0), int(oy + y.max() + 1))]
+
+    return rects
+
+
+def rect_border(rect, render_res: tuple, factor):
+    """
+    Render border selecting frame pixel rectangle at supersampled resolution
+    :param rect: (x0, x1, y0, y1) base frame pixels
+    :param render_res: Base render resolution (x, y)
+    :param factor: Supersampling factor
+    :return: (min_x, max_x, min_y, max_y) fractions, offset by a quarter pixel (see projection.render_borders)
+    """
+    res_x, res_y = render_res[0] * factor, render_res[1] * factor
+    x0, x1, y0, y1 = (v * factor for v in rect)
+
+    return (x0 + 0.25) / res_x, min((x1 + 0.25) / res_x, 1), (y0 + 0.25) / res_y, min((y1 + 0.25) / res_y, 1)
+
+
+def refined_area(weights, rects, values, factor, offset=(0, 0)):
+    """
+    Combine base render with supersampled rectangles
+    :param weights: Pixel coverage (y, x) of base render
+    :param rects: Supersampled rectangles (edge_rects)
+    :param values: Total lightness of each supersampled render
+    :param factor: Supersampling factor
+    :param offset: Frame pixel position (x, y) of weights[0, 0]
+    :return: Refined coverage, in base pixels
+    """
+    ox, oy = offset
+    total = float(weights.sum())
+
+    for (x0, x1, y0, y1), value in zip(rects, values):
+        total += value / factor ** 2 - float(weights[y0 - oy:y1 - oy, x0 - ox:x1 - ox].sum())
+
+    return total
+
+
+def rect_pixels(rects):
+    """
+    :return: Number of base pixels within rectangles
+    """
+    return sum((x1 - x0) * (y1 - y0) for x0, x1, y0, y1 in rects)
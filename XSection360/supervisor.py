@@ -0,0 +1,190 @@
+"""
+Supervisor for background XSection360 jobs (used by blender_gui).
+
+Jobs are queued and started up to a concurrency limit. Cancellation is cross-platform
+and graceful: the supervisor creates the job's cancel file, which background.py checks
+between renders; the job then writes a checkpoint (resumed on restart) and exits with
+CANCELLED_EXIT_CODE. Jobs not stopping within cancel_timeout are terminated.
+"""
+
+import os
+import tempfile
+import uuid
+from subprocess import Popen
+from time import time
+
+QUEUED = 'Queued'
+RUNNING = 'Running'
+CANCELLING = 'Cancelling'
+CANCELLED = 'Cancelled'
+FINISHED = 'Finished'
+FAILED = 'Failed'
+
+# background.py exit code after graceful cancel
+CANCELLED_EXIT_CODE = 3
+
+
+def default_concurrency():
+    """
+    Default number of concurrent jobs: half the CPU cores
+    (each background Blender renders with several threads)
+    """
+    return max(1, (os.cpu_count() or 1) // 2)
+
+
+class Job:
+    def __init__(self, name, command, creationflags=0):
+        """
+        Background process job
+        :param name: Job name (shown in panel; used as progress job id)
+        :param command: Command line (list); --cancel-file is appended on start
+        :param creationflags: Popen creation flags
+        """
+        self.name = name
+        self.command = command
+        self.creationflags = creationflags
+
+        self.cancel_file = os.path.join(tempfile.gettempdir(), f'xs360_cancel_{uuid.uuid4().hex}')
+        self.process = None
+        self.state = QUEUED
+        self.returncode = None
+        self.started = None
+        self.ended = None
+        self.cancel_requested = None
+
+    def start(self):
+        if os.path.isfile(self.cancel_file):
+            os.remove(self.cancel_file)
+
+        self.process = Popen(self.command + [f'--cancel-file={self.cancel_file}'], creationflags=self.creationflags)
+        self.state = RUNNING
+        self.returncode = None
+        self.started = time()
+        self.ended = None
+
+    def poll(self):
+        """
+        Update state from process
+        :return: True if job ended
+        """
+        if self.process is None or self.state not in (RUNNING, CANCELLING):
+            return False
+
+        self.returncode = self.process.poll()
+        if self.returncode is None:
+            return False
+
+        self.ended = time()
+
+        if self.state == CANCELLING or self.returncode == CANCELLED_EXIT_CODE:
+            self.state = CANCELLED
+        elif self.returncode == 0:
+            self.state = FINISHED
+        else:
+            self.state = FAILED
+
+        if os.path.isfile(self.cancel_file):
+            os.remove(self.cancel_file)
+
+        return True
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0
+        return (self.ended or time()) - self.started
+
+
+class JobSupervisor:
+    def __init__(self, max_jobs=None, cancel_timeout=30):
+        """
+        Queue of background jobs with concurrency limit
+        :param max_jobs: Maximum concurrently running jobs; if None, default_concurrency()
+        :param cancel_timeout: Seconds after cancel request before process is terminated
+        """
+        self.max_jobs = max_jobs or default_concurrency()
+        self.cancel_timeout = cancel_timeout
+        self.jobs = []
+
+        # jobs ever submitted: numbers stay unique after clear()
+        self.submitted = 0
+
+    def next_name(self, prefix):
+        """
+        Unique job name (also the progress job id): never reused, even after ended jobs are cleared
+        :param prefix: Name prefix, e.g. scene name
+        :return: Job name
+        """
+        self.submitted += 1
+        return f'{prefix} #{self.submitted}'
+
+    def submit(self, name, command, creationflags=0):
+        """
+        Queue job; started on next update if a slot is free
+        :return: Job
+        """
+        job = Job(name, command, creationflags)
+        self.jobs.append(job)
+        self.update()
+
+        return job
+
+    def running(self):
+        return [job for job in self.jobs if job.state in (RUNNING, CANCELLING)]
+
+    def update(self):
+        """
+        Poll running jobs, enforce cancel timeouts and start queued jobs
+        :return: True if any job changed state
+        """
+        changed = False
+
+        for job in self.running():
+            changed |= job.poll()
+
+            # not stopped gracefully in time
+            if job.state == CANCELLING and time() - job.cancel_requested > self.cancel_timeout:
+                job.process.terminate()
+
+        free = self.max_jobs - len(self.running())
+        for job in [job for job in self.jobs if job.state == QUEUED][:max(free, 0)]:
+            job.start()
+            changed = True
+
+        return changed
+
+    def cancel(self, job: Job):
+        """
+        Request graceful cancel (job writes checkpoint and exits); queued jobs are cancelled immediately
+        """
+        if job.state == QUEUED:
+            job.state = CANCELLED
+            return
+
+        if job.state != RUNNING:
+            return
+
+        open(job.cancel_file, 'w').close()
+        job.state = CANCELLING
+        job.cancel_requested = time()
+
+    def restart(self, job: Job):
+        """
+        Queue ended job again (resumes from checkpoint where available)
+        """
+        if job.state in (CANCELLED, FAILED, FINISHED):
+            job.state = QUEUED
+            self.update()
+
+    def clear(self):
+        """
+        Remove ended jobs from list
+        """
+        self.jobs = [job for job in self.jobs if job.state in (QUEUED, RUNNING, CANCELLING)]
+
+    def shutdown(self):
+        """
+        Cancel all jobs (called when addon is unregistered)
+        """
+        for job in list(self.jobs):
+            self.cancel(job)
@@ -1,10 +1,15 @@
+"""
+Scene helpers. Pure helpers (camera placement, OutImage, product, iterate_flat) load without
+Blender; the Blender adapters (pixel sphere, render resolution, hull points, render border)
+import bpy / mathutils lazily, so CLI tools and worker processes never load Blender.
+"""
+
 from .equirectangular import Equirectangular
-import bpy
 from math import radians
 from os.path import isfile
 
 
-def transform_camera(camera: bpy.types.Object, distance, long, lat):
+def transform_camera(camera: 'bpy.types.Object', distance, long, lat):
     """
     Set camera transformation
     Project position onto sphere of radius [distance] and align rotation
@@ -27,6 +32,8 @@ def create_pixel_sphere(radius, resolution):
     :param radius: Sphere radius
     :param resolution: Output image resolution
     """
+    import bpy
+
     xR, yR = resolution
 
     # generate one vertex for each pixel
@@ -50,11 +57,53 @@ def create_pixel_sphere(radius, resolution):
 
 def get_render_resolution(scene=None):
     if scene is None:
+        import bpy
         scene = bpy.context.scene
 
     return scene.render.resolution_x, scene.render.resolution_y
 
 
+def collection_hull_points(collection, depsgraph):
+    """
+    Retrieve world-space bounding box corners of all rendered mesh objects in collection
+    Encloses the geometry from every direction (used for render borders)
+    :param collection: Target collection, e.g. setup 'Output'
+    :param depsgraph: Evaluated dependency graph
+    :return: List of (x, y, z) points, 8 per object
+    """
+    from mathutils import Vector
+
+    points = []
+
+    for obj in collection.all_objects:
+        if obj.type != 'MESH' or obj.hide_render:
+            continue
+
+        eval_obj = obj.evaluated_get(depsgraph)
+        for corner in eval_obj.bound_box:
+            points.append(tuple(eval_obj.matrix_world @ Vector(corner)))
+
+    return points
+
+
+def set_render_border(scene, border=None):
+    """
+    Restrict rendering to border region, cropping render output to it
+    :param scene: Target scene
+    :param border: (min_x, max_x, min_y, max_y) as fractions of frame; if None, border disabled
+    """
+    render = scene.render
+
+    if border is None:
+        render.use_border = False
+        render.use_crop_to_border = False
+        return
+
+    render.border_min_x, render.border_max_x, render.border_min_y, render.border_max_y = border
+    render.use_border = True
+    render.use_crop_to_border = True
+
+
 def product(factors):
     result = 1
     for f in factors:
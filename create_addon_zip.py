@@ -1,4 +1,9 @@
-files = ['__init__.py', 'background.py', 'processing.py', 'equirectangular.py', 'progress.py', 'setup.py', 'blender_gui.py', 'xstools.py']
+files = ['__init__.py', 'background.py', 'processing.py', 'equirectangular.py', 'progress.py', 'setup.py', 'blender_gui.py', 'xstools.py',
+         '__main__.py', 'projection.py', 'raster.py', 'snapshot.py', 'cache.py', 'farm.py', 'channel.py', 'supervisor.py',
+         'exact.py', 'benchmark.py', 'voxels.py',
+         'query.py', 'daemon.py', 'interior.py',
+         'incremental.py', 'supersample.py',
+         'silhouette.py']
 
 from zipfile import ZipFile
 
@@ -0,0 +1,119 @@
+import pytest
+
+from XSection360.cache import ResultCache
+from XSection360.projection import pose_table
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache.db'))
+    yield cache
+    if cache.connection is not None:
+        cache.close()
+
+
+def directions(resolution):
+    table = pose_table(resolution)
+    return set(ResultCache.quantize(long, lat) for long, lat in zip(table['long'], table['lat']))
+
+
+def test_put_get(cache):
+    key = ResultCache.make_key('geometry', 10, (64, 64))
+
+    cache.put(key, 12.5, -30.0, 42.0)
+
+    assert cache.get(key, 12.5, -30.0) == 42.0
+    assert cache.get(key, 12.5, -29.0) is None
+    assert cache.get(ResultCache.make_key('other', 10, (64, 64)), 12.5, -30.0) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_get_many_order(cache):
+    for i in range(5):
+        cache.put('key', i, 0, i * 10, commit=False)
+    cache.flush()
+
+    assert cache.get_many('key', [(3, 0), (9, 0), (0, 0)]) == [30, None, 0]
+
+
+def test_key_depends_on_settings():
+    base = ResultCache.make_key('geometry', 10, (64, 64), {'samples': 1})
+
+    assert base == ResultCache.make_key('geometry', 10.0, [64, 64], {'samples': 1})
+    assert base != ResultCache.make_key('geometry', 10, (128, 128), {'samples': 1})
+    assert base != ResultCache.make_key('geometry', 11, (64, 64), {'samples': 1})
+    assert base != ResultCache.make_key('geometry', 10, (64, 64), {'samples': 4})
+
+
+def test_lru_eviction(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache.db'), max_entries=3)
+    for i in range(4):
+        cache.put('key', i, 0, i)
+
+    cache.get('key', 0, 0)  # most recently used
+    cache.flush()
+
+    assert len(cache) == 3
+    assert cache.evicted == 1
+    assert cache.get('key', 0, 0) == 0
+    assert cache.get('key', 1, 0) is None
+    cache.close()
+
+
+def test_len_after_close(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache.db'))
+    cache.put('key', 0, 0, 1)
+    cache.close()
+
+    assert len(cache) == 1
+    assert 'entries' in cache.summary()
+
+
+def test_persistent(tmp_path):
+    file_path = str(tmp_path / 'cache.db')
+    cache = ResultCache(file_path)
+    cache.put('key', 1, 2, 3)
+    cache.close()
+
+    cache = ResultCache(file_path)
+    assert cache.get('key', 1, 2) == 3
+    cache.close()
+
+
+def test_shared_directions():
+    # pixel centres: odd multiples share every coarse direction, doubling shares none
+    coarse = directions((18, 9))
+
+    assert len(coarse & directions((54, 27))) == len(coarse)
+    assert len(coarse & directions((36, 18))) == 0
+
+
+def test_tolerance(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache.db'), tolerance=3.75)
+    table = pose_table((36, 18))
+    for i, (long, lat) in enumerate(zip(table['long'], table['lat'])):
+        cache.put('key', long, lat, i, commit=False)
+    cache.flush()
+
+    # every direction of doubled resolution reuses the nearest coarse direction
+    fine = pose_table((72, 36))
+    values = cache.get_many('key', list(zip(fine['long'], fine['lat'])))
+
+    assert None not in values
+    assert cache.near_hits == len(values)
+    assert cache.get('key', -173, 3) == cache.get('key', -175, 5)
+
+    # outside tolerance
+    cache.tolerance = 2
+    assert cache.get('key', -172, 0) is None
+    cache.close()
+
+
+def test_tolerance_seam_and_poles(cache):
+    cache.tolerance = 1
+    cache.put('key', -179.5, 0, 1)
+    cache.put('key', 10, 89.5, 2)
+
+    assert cache.get('key', 179.8, 0.2) == 1
+    assert cache.get('key', -100, 89.8) == 2
+    assert cache.get('key', 178, 0) is None
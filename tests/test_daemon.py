@@ -0,0 +1,150 @@
+import json
+import os
+import socket
+import sys
+import threading
+from time import sleep, time
+
+import pytest
+
+from XSection360.daemon import DaemonClient, DaemonServer
+
+pytestmark = pytest.mark.skipif(sys.platform == 'win32', reason='Unix sockets')
+
+
+class Daemon:
+    def __init__(self, socket_path, handle_job=None, **options):
+        self.release = threading.Event()
+        self.started = threading.Event()
+
+        def default_job(job, send):
+            send({'event': 'progress', 'stage': 'Rendering', 'done': 0, 'total': 1, 'rate': 0, 'eta': 0})
+            self.started.set()
+            self.release.wait(10)
+            return {'values': [job['value']]}
+
+        self.server = DaemonServer(socket_path, handle_job or default_job, **options)
+        self.thread = threading.Thread(target=self.server.serve, daemon=True)
+        self.thread.start()
+
+        deadline = time() + 5
+        while DaemonClient.health_check(socket_path) is None:
+            assert time() < deadline, 'daemon did not start'
+            sleep(0.01)
+
+    def stop(self):
+        self.release.set()
+        self.server.running = False
+        self.thread.join(5)
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    # short path: Unix socket paths are limited to about 100 characters
+    path = f'/tmp/xs360_test_{os.getpid()}_{id(tmp_path)}.sock'
+    yield path
+    if os.path.exists(path):
+        os.remove(path)
+
+
+@pytest.fixture
+def daemon(socket_path):
+    daemon = Daemon(socket_path)
+    yield daemon
+    daemon.stop()
+
+
+def raw_request(socket_path, line):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.settimeout(5)
+        connection.connect(socket_path)
+        connection.sendall(line)
+        return json.loads(connection.makefile('r').readline())
+
+
+def test_job_and_progress(daemon, socket_path):
+    daemon.release.set()
+    events = []
+
+    with DaemonClient.connect(socket_path) as client:
+        result = client.run_job(progress=events.append, value=42)
+
+    assert result['values'] == [42]
+    assert result['event'] == 'result'
+    assert [event['event'] for event in events] == ['progress']
+    assert DaemonClient.health_check(socket_path)['jobs'] == 1
+
+
+def test_malformed_requests(daemon, socket_path):
+    for line in (b'not json\n', b'[1, 2]\n', b'{"type": "dance"}\n'):
+        assert raw_request(socket_path, line)['event'] == 'error'
+
+    # still serving
+    assert DaemonClient.health_check(socket_path)['pid'] == os.getpid()
+    assert os.path.exists(socket_path)
+
+
+def test_health_while_busy(daemon, socket_path):
+    client = DaemonClient(socket_path)
+    job = threading.Thread(target=client.run_job, kwargs={'value': 1}, daemon=True)
+    job.start()
+    assert daemon.started.wait(5)
+
+    health = DaemonClient.health_check(socket_path)
+    assert health is not None and health['busy']
+
+    # busy is not dead: connect returns a client instead of starting another daemon
+    with DaemonClient.connect(socket_path, 'never_started.blend', 'Scene', 10, blender='/nonexistent') as other:
+        daemon.release.set()
+        assert other.run_job(value=2)['values'] == [2]
+
+    job.join(5)
+    client.close()
+
+
+def test_second_daemon_refused(daemon, socket_path):
+    with pytest.raises(Exception, match='Another XSection360 daemon'):
+        DaemonServer(socket_path, None).serve()
+
+    assert DaemonClient.health_check(socket_path) is not None
+
+
+def test_stale_socket_replaced(socket_path):
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(socket_path)
+    stale.close()  # file left behind, nobody listening
+
+    daemon = Daemon(socket_path)
+    assert DaemonClient.health_check(socket_path)['jobs'] == 0
+    daemon.stop()
+
+
+def test_failed_job_reported(socket_path):
+    def handle_job(job, send):
+        raise ValueError('bad scene')
+
+    daemon = Daemon(socket_path, handle_job)
+    with DaemonClient(socket_path) as client:
+        with pytest.raises(Exception, match='bad scene'):
+            client.run_job(value=1)
+
+        # connection still usable
+        assert next(client.request({'type': 'health'}))['event'] == 'health'
+    daemon.stop()
+
+
+def test_shutdown(daemon, socket_path):
+    with DaemonClient(socket_path) as client:
+        client.shutdown()
+
+    daemon.thread.join(5)
+    assert not daemon.thread.is_alive()
+    assert not os.path.exists(socket_path)
+
+
+def test_idle_timeout(socket_path):
+    daemon = Daemon(socket_path, idle_timeout=0.5)
+    daemon.thread.join(5)
+
+    assert not daemon.thread.is_alive()
+    assert DaemonClient.health_check(socket_path) is None
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from XSection360.equirectangular import Equirectangular, Window
+from XSection360.projection import camera_basis, pose_table
+
+
+def test_pixel_centres():
+    long, lat = Equirectangular.Pixel.grid_to_spherical((4, 2))
+
+    assert long.tolist() == [-135, -45, 45, 135] * 2
+    assert lat.tolist() == [-45] * 4 + [45] * 4
+    assert Equirectangular.Pixel.coord_to_spherical((0, 1), (4, 2)) == (-135, 45)
+
+
+def test_parse_round_trip():
+    for text in ('lonlat:-30:30:-10:20', 'alphabeta:-5:15:-20:20'):
+        window = Window.parse(text)
+
+        assert Window.parse(str(window)).to_dict() == window.to_dict()
+        assert Window.from_dict(window.to_dict()).to_dict() == window.to_dict()
+
+
+def test_parse_errors():
+    with pytest.raises(Exception, match='Invalid window'):
+        Window.parse('lonlat:1:2:3')
+    with pytest.raises(Exception, match='Unknown window mode'):
+        Window.parse('polar:1:2:3:4')
+
+
+def test_alphabeta_axes():
+    window = Window.parse('alphabeta:-10:30:-20:20')
+
+    # image y is alpha, image x is beta
+    assert window.y_range == (-10, 30)
+    assert window.x_range == (-20, 20)
+    assert window.to_dict() == {'mode': 'alphabeta', 'alpha': [-10, 30], 'beta': [-20, 20]}
+
+
+def test_lonlat_window_matches_full_grid():
+    # window covering the whole sphere samples the same directions as a full profile
+    long, lat = Window.directions((8, 4), Window((-180, 180), (-90, 90)))
+    full_long, full_lat = Window.directions((8, 4))
+
+    assert np.allclose(long, full_long)
+    assert np.allclose(lat, full_lat)
+
+
+def test_alpha_beta_directions():
+    # direction towards camera: (sin beta, cos alpha cos beta, sin alpha cos beta)
+    rng = np.random.default_rng(0)
+    alpha, beta = rng.uniform(-80, 80, 50), rng.uniform(-80, 80, 50)
+    long, lat = Window.alpha_beta_to_spherical(alpha, beta)
+
+    a, b = np.radians(alpha), np.radians(beta)
+    towards = np.stack([np.sin(b), np.cos(a) * np.cos(b), np.sin(a) * np.cos(b)], axis=-1)
+
+    assert np.allclose(-camera_basis(long, lat)[2], towards)
+    assert Window.alpha_beta_to_spherical(0, 0) == (0, 0)
+
+
+def test_pose_table_window_order():
+    window = Window.parse('alphabeta:-10:10:-20:20')
+    table = pose_table((4, 3), window)
+
+    for pixel in range(12):
+        coord = (pixel % 4, pixel // 4)
+        assert (table['long'][pixel], table['lat'][pixel]) == pytest.approx(window.coord_to_spherical(coord, (4, 3)))
@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+
+from XSection360 import exact
+from XSection360.benchmark import TWO_BOXES, box_mesh, boxes_union_area, ellipsoid_mesh, primitives
+
+DIRECTIONS = [(0, 0), (30, 20), (-135, 45), (90, -60), (170, 89)]
+
+
+def test_union_length():
+    assert exact.union_length(np.array([]), np.array([])) == 0
+    assert exact.union_length(np.array([0.0, 1.0, 5.0]), np.array([2.0, 3.0, 6.0])) == 4
+    assert exact.union_length(np.array([0.0, 0.5]), np.array([4.0, 1.0])) == 4  # contained
+
+
+def test_union_lengths_groups():
+    groups = np.array([1, 0, 1, 0, 2])
+    lo = np.array([0.0, 0.0, 1.0, 10.0, -5.0])
+    hi = np.array([2.0, 1.0, 3.0, 11.0, 5.0])
+
+    assert exact.union_lengths(groups, lo, hi, 4).tolist() == [2, 3, 10, 0]
+
+
+def test_crossing_xs():
+    # two triangles overlapping as a star: edges cross
+    a = [[0, 0], [2, 0], [1, 2]]
+    b = [[0, 1.5], [1, -0.5], [2, 1.5]]
+    xs = exact.crossing_xs(np.array([a, b], dtype=np.float64))
+
+    assert len(xs) == 6
+    assert np.allclose(np.sort(xs), [0.375, 0.75, 0.75, 1.25, 1.25, 1.625])
+
+
+def test_union_area_triangles():
+    square = np.array([[[0, 0], [1, 0], [1, 1]], [[0, 0], [1, 1], [0, 1]]], dtype=np.float64)
+
+    assert exact.union_area(square) == pytest.approx(1, abs=1e-15)
+    assert exact.union_area(np.concatenate([square, square])) == pytest.approx(1, abs=1e-15)
+    assert exact.union_area(np.concatenate([square, square + 0.5])) == pytest.approx(1.75, abs=1e-15)
+    assert exact.union_area(np.zeros((0, 3, 2))) == 0
+
+
+def test_union_area_random_monte_carlo():
+    rng = np.random.default_rng(0)
+    tris = rng.uniform(0, 1, (40, 3, 2))
+
+    # coverage of a fine point grid
+    x, y = np.meshgrid(*[(np.arange(1000) + 0.5) / 1000] * 2)
+    points = np.stack([x.ravel(), y.ravel()], axis=-1)
+    covered = np.zeros(len(points), dtype=bool)
+    for a, b, c in tris:
+        def side(p, q):
+            return (q[0] - p[0]) * (points[:, 1] - p[1]) - (q[1] - p[1]) * (points[:, 0] - p[0])
+        s1, s2, s3 = side(a, b), side(b, c), side(c, a)
+        covered |= ((s1 >= 0) & (s2 >= 0) & (s3 >= 0)) | ((s1 <= 0) & (s2 <= 0) & (s3 <= 0))
+
+    assert exact.union_area(tris) == pytest.approx(covered.mean(), abs=2e-3)
+
+
+def test_blocks_match(monkeypatch):
+    sphere = ellipsoid_mesh(1, 1, 1, 32)
+    full = exact.direction_area(sphere, 30, 20)
+
+    monkeypatch.setattr(exact, 'SLAB_BLOCK_PAIRS', 100)
+    assert exact.direction_area(sphere, 30, 20) == pytest.approx(full, rel=1e-13)
+
+
+@pytest.mark.parametrize('long, lat', DIRECTIONS)
+def test_boxes_analytic(long, lat):
+    cube = box_mesh((1, 1, 1))
+    two_boxes = np.concatenate([box_mesh(*box) for box in TWO_BOXES])
+    reference = primitives(16)['cube'][1]
+
+    assert exact.direction_area(cube, long, lat) == pytest.approx(reference(long, lat), rel=1e-13)
+    assert exact.direction_area(two_boxes, long, lat) == pytest.approx(boxes_union_area(TWO_BOXES, long, lat),
+                                                                       rel=1e-11)
+
+
+@pytest.mark.parametrize('long, lat', DIRECTIONS)
+def test_open_mesh_matches_culled(long, lat):
+    # closed mesh: back faces are hidden behind front faces
+    two_boxes = np.concatenate([box_mesh(*box) for box in TWO_BOXES])
+
+    assert exact.direction_area(two_boxes, long, lat, cull_backfaces=False) == \
+        pytest.approx(exact.direction_area(two_boxes, long, lat), rel=1e-12)
+
+
+def test_sphere_tessellation_floor():
+    # inscribed tessellation: slightly below pi
+    sphere = ellipsoid_mesh(1, 1, 1, 48)
+    areas = exact.direction_areas(sphere, DIRECTIONS)
+
+    assert all(0.99 * np.pi < area < np.pi for area in areas)
+
+
+def test_profile_areas_pool():
+    cube = box_mesh((1, 1, 1))
+
+    areas = list(exact.profile_areas(cube, DIRECTIONS, processes=2, chunk_size=2))
+    assert areas == pytest.approx(exact.direction_areas(cube, DIRECTIONS), rel=1e-15)
+
+
+def test_triangle_pool_holds_triangles():
+    cube = box_mesh((1, 1, 1))
+
+    # tasks carry directions only: workers use the triangles loaded by the pool initializer
+    with exact.triangle_pool(cube, 2) as pool:
+        areas = list(exact.profile_areas(None, DIRECTIONS, chunk_size=2, pool=pool))
+
+    assert areas == pytest.approx(exact.direction_areas(cube, DIRECTIONS), rel=1e-15)
@@ -0,0 +1,178 @@
+import json
+from urllib import request
+from urllib.error import HTTPError
+
+import pytest
+
+from XSection360.equirectangular import Equirectangular
+from XSection360.farm import Coordinator, JobQueue, Worker, DONE, LEASED, PENDING
+
+
+def values(queue, chunk):
+    return [float(p) for p in range(chunk.start, chunk.end)]
+
+
+def test_lease_complete():
+    queue = JobQueue((4, 2), chunk_size=3)
+    assert [len(c) for c in queue.chunks] == [3, 3, 2]
+
+    chunks = [queue.lease('a'), queue.lease('b'), queue.lease('a')]
+    assert [c.chunk_id for c in chunks] == [0, 1, 2]
+    assert queue.lease('c') is None
+
+    for chunk in chunks:
+        queue.complete('a', chunk.chunk_id, values(queue, chunk))
+
+    assert queue.finished.is_set()
+    assert queue.error is None
+    assert queue.result_raw == [float(p) for p in range(8)]
+
+
+def test_first_result_kept():
+    queue = JobQueue((2, 1), chunk_size=2)
+    queue.lease('a')
+    queue.complete('a', 0, [1.0, 2.0])
+    queue.complete('b', 0, [3.0, 4.0])
+
+    assert queue.result_raw == [1.0, 2.0]
+
+
+def test_complete_value_count():
+    queue = JobQueue((2, 1), chunk_size=2)
+    queue.lease('a')
+
+    with pytest.raises(ValueError):
+        queue.complete('a', 0, [1.0])
+    assert queue.chunks[0].state == LEASED
+
+
+def test_fail_retry_then_abort():
+    queue = JobQueue((2, 1), chunk_size=2, max_attempts=2)
+
+    queue.lease('a')
+    queue.fail('a', 0, 'crash')
+    assert queue.chunks[0].state == PENDING
+    assert queue.error is None
+
+    queue.lease('b')
+    queue.fail('b', 0, 'crash')
+    assert queue.finished.is_set()
+    assert 'failed 2 times' in queue.error
+
+
+def test_expired_lease_counts_as_attempt():
+    queue = JobQueue((2, 1), chunk_size=2, lease_time=-1, max_attempts=3)
+
+    # worker never reports back (e.g. Blender crashed): each expiry is an attempt
+    for attempt in range(1, 3):
+        assert queue.lease(f'w{attempt}').chunk_id == 0
+        queue.expire(float('inf'))
+        assert queue.chunks[0].attempts == attempt
+        assert queue.error is None
+
+    queue.lease('w3')
+    queue.expire(float('inf'))
+    assert queue.finished.is_set()
+    assert 'lease expired' in queue.error
+
+
+def test_heartbeat():
+    queue = JobQueue((2, 1), chunk_size=1)
+    chunk = queue.lease('a')
+
+    assert queue.heartbeat('a', chunk.chunk_id)
+    assert not queue.heartbeat('b', chunk.chunk_id)
+
+    queue.complete('a', chunk.chunk_id, [1.0])
+    assert not queue.heartbeat('a', chunk.chunk_id)
+
+
+def test_straggler():
+    queue = JobQueue((3, 1), chunk_size=1, straggler_factor=2)
+    slow = queue.lease('slow')
+    fast = queue.lease('fast')
+    queue.complete('fast', fast.chunk_id, [1.0])
+    queue.chunk_times = [0.0]
+
+    other = queue.lease('fast')
+    queue.complete('fast', other.chunk_id, [1.0])
+
+    # nothing pending: slow chunk re-dispatched to idle worker
+    assert queue.lease('fast') is slow
+    assert set(slow.leases) == {'slow', 'fast'}
+
+    queue.complete('fast', slow.chunk_id, [2.0])
+    assert queue.finished.is_set()
+    assert slow.state == DONE
+
+
+def test_key_accept():
+    queue = JobQueue((2, 1))
+
+    assert queue.accept('k1')
+    assert queue.accept('k1')
+    assert not queue.accept('k2')
+    assert not JobQueue((2, 1), key='k0').accept('k1')
+
+
+@pytest.fixture
+def coordinator():
+    queue = JobQueue((6, 3), chunk_size=4, lease_time=5)
+    coordinator = Coordinator(queue, 'localhost', 0)
+    coordinator.start()
+    yield coordinator
+    if not queue.finished.is_set():
+        coordinator.stop()
+
+
+def post(coordinator, path, body):
+    req = request.Request(coordinator.url + path, body, {'Content-Type': 'application/json'})
+    with request.urlopen(req, timeout=5) as response:
+        return json.loads(response.read())
+
+
+def test_worker_round_trip(coordinator):
+    def evaluate(long, lat):
+        return long + 1000 * lat
+
+    worker = Worker(coordinator.url, evaluate, key='scene', retry_time=1)
+    worker.run()
+
+    assert coordinator.wait(linger=0) == [evaluate(*Equirectangular.Pixel.coord_to_spherical((i % 6, i // 6), (6, 3)))
+                                          for i in range(18)]
+
+
+def test_worker_key_mismatch(coordinator):
+    coordinator.queue.key = 'scene'
+
+    with pytest.raises(Exception, match='rejected'):
+        Worker(coordinator.url, lambda long, lat: 0, key='other', retry_time=1).run()
+    assert coordinator.queue.progress() == 0
+
+
+def test_malformed_requests(coordinator):
+    post(coordinator, '/lease', json.dumps({'worker': 'a'}).encode())
+
+    for path, body in [('/complete', b'not json'),
+                       ('/complete', json.dumps({'worker': 'a', 'chunk': 0, 'values': [1.0]}).encode()),
+                       ('/heartbeat', json.dumps({'worker': 'a', 'chunk': 99}).encode()),
+                       ('/fail', json.dumps({'worker': 'a'}).encode())]:
+        with pytest.raises(HTTPError) as error:
+            post(coordinator, path, body)
+        assert error.value.code == 400
+
+    # still serving
+    assert post(coordinator, '/heartbeat', json.dumps({'worker': 'a', 'chunk': 0}).encode()) == {'continue': True}
+
+
+def test_worker_coordinator_gone():
+    queue = JobQueue((2, 1), chunk_size=2)
+    coordinator = Coordinator(queue, 'localhost', 0)
+    coordinator.start()
+
+    def evaluate(long, lat):
+        coordinator.stop()  # coordinator disappears mid-chunk
+        raise RuntimeError('render failed')
+
+    # failure report cannot be sent: worker gives up after retry time, without raising
+    assert Worker(coordinator.url, evaluate, retry_time=0.5).run() == 0
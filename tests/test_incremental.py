@@ -0,0 +1,97 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from XSection360.cache import ResultCache
+from XSection360.incremental import IncrementalPlan, overlap_groups, projected_bounds
+
+
+def box(center, size=1.0):
+    corners = np.array(list(itertools.product([-0.5, 0.5], repeat=3))) * size
+    return corners + np.asarray(center, dtype=np.float64)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache.db'))
+    yield cache
+    if cache.connection is not None:
+        cache.close()
+
+
+def test_projected_bounds_front_view():
+    # long 0, lat 0 views along +y: image x is world -x, image y is world z
+    bounds = projected_bounds([box((2, 0, 1))], [0.0], [0.0])
+
+    assert bounds.shape == (1, 1, 4)
+    np.testing.assert_allclose(bounds[0, 0], [-2.5, -1.5, 0.5, 1.5], atol=1e-12)
+
+
+def test_overlap_groups_transitive():
+    bounds = [[0, 1, 0, 1],
+              [5, 6, 0, 1],
+              [0.9, 2, 0.5, 1.5],
+              [1.9, 3, 0, 1]]
+
+    assert overlap_groups(bounds) == [(0, 2, 3), (1,)]
+
+
+def test_overlap_groups_margin():
+    bounds = [[0, 1, 0, 1], [1.05, 2, 0, 1]]
+
+    assert overlap_groups(bounds) == [(0,), (1,)]
+    assert overlap_groups(bounds, margin=0.1) == [(0, 1)]
+
+
+def test_plan_groups_follow_direction():
+    # side by side along x: separate from the front, one behind the other from the side
+    points = [box((-1, 0, 0)), box((1, 0, 0))]
+    plan = IncrementalPlan(['a:1', 'b:1'], points, [(0, 0), (90, 0)], 'base')
+
+    assert plan.groups == [[(0,), (1,)], [(0, 1)]]
+    assert plan.keys[0][0] != plan.keys[1][0]
+
+
+def test_plan_isolated_key_ignores_other_objects():
+    points = [box((-2, 0, 0)), box((2, 0, 0))]
+    before = IncrementalPlan(['a:1', 'b:1'], points, [(0, 0)], 'base')
+    after = IncrementalPlan(['a:1', 'b:2'], points, [(0, 0)], 'base')
+
+    assert before.keys[0][0] == after.keys[0][0]
+    assert before.keys[0][1] != after.keys[0][1]
+
+
+def test_plan_renders_only_changed_groups(cache):
+    points = [box((-1, 0, 0)), box((1, 0, 0)), box((0, 0, 5))]
+    directions = [(0, 0), (90, 0)]
+
+    plan = IncrementalPlan(['a:1', 'b:1', 'c:1'], points, directions, 'base')
+    counts = plan.lookup(cache)
+    assert np.isnan(counts).all()
+
+    for d in range(len(directions)):
+        objects = plan.render_objects(counts, d)
+        assert objects == [0, 1, 2]
+        plan.store(cache, d, objects, [10 * (i + 1) + d for i in objects])
+    cache.flush()
+
+    np.testing.assert_array_equal(plan.lookup(cache), [[10, 20, 30], [11, 21, 31]])
+
+    # b changes: from the front it is isolated, from the side it shares a group with a
+    changed = IncrementalPlan(['a:1', 'b:2', 'c:1'], points, directions, 'base')
+    counts = changed.lookup(cache)
+
+    np.testing.assert_array_equal(np.isnan(counts), [[False, True, False], [True, True, False]])
+    assert changed.render_objects(counts, 0) == [1]
+    assert changed.render_objects(counts, 1) == [0, 1]
+
+
+def test_plan_base_key_separates_settings(cache):
+    points = [box((0, 0, 0))]
+    plan = IncrementalPlan(['a:1'], points, [(0, 0)], 'base')
+    plan.store(cache, 0, [0], [7])
+    cache.flush()
+
+    assert plan.lookup(cache)[0, 0] == 7
+    assert np.isnan(IncrementalPlan(['a:1'], points, [(0, 0)], 'other').lookup(cache)[0, 0])
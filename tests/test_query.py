@@ -0,0 +1,95 @@
+
+import numpy as np
+import pytest
+
+from XSection360 import exact, query
+from XSection360.benchmark import box_mesh
+from XSection360.cache import ResultCache
+from XSection360.projection import camera_basis
+
+
+def test_vectors_to_spherical():
+    rng = np.random.default_rng(0)
+    long, lat = rng.uniform(-179, 179, 20), rng.uniform(-89, 89, 20)
+
+    # vectors point from model towards camera: opposite to view
+    vectors = -camera_basis(long, lat)[2] * 3
+    result = query.vectors_to_spherical(vectors)
+
+    assert np.allclose(result[0], long)
+    assert np.allclose(result[1], lat)
+
+    with pytest.raises(Exception, match='zero'):
+        query.vectors_to_spherical([[0, 0, 0]])
+
+
+def test_load_directions(tmp_path):
+    (tmp_path / 'lonlat.csv').write_text('long,lat\n10,20\n# comment\n-30.5, 45\n')
+    (tmp_path / 'vectors.txt').write_text('0 1 0\n0 0 1\n')
+    np.save(tmp_path / 'dirs.npy', np.array([[1.0, 2.0]]))
+
+    assert query.load_directions(str(tmp_path / 'lonlat.csv')) == [(10, 20), (-30.5, 45)]
+    assert query.load_directions(str(tmp_path / 'vectors.txt')) == pytest.approx([(0, 0), (0, 90)])
+    assert query.load_directions(str(tmp_path / 'dirs.npy')) == [(1, 2)]
+
+    (tmp_path / 'bad.csv').write_text('1,2,3,4\n')
+    with pytest.raises(Exception, match='columns'):
+        query.load_directions(str(tmp_path / 'bad.csv'))
+
+
+def test_snap():
+    assert query.snap([(181, 10), (12.4, 90), (-180, 0)]) == [(-179, 10), (0, 90), (-180, 0)]
+    assert query.snap([(12.4, 7.6)], quantum=5) == [(10, 10)]
+
+
+def test_query_memoized(tmp_path):
+    evaluated = []
+
+    def evaluate_batch(batch):
+        evaluated.extend(batch)
+        return [long + 1000 * lat for long, lat in batch]
+
+    directions = [(10, 20), (30, 40), (10, 20), (370, 20)]
+    cache = ResultCache(str(tmp_path / 'cache.db'))
+
+    values = query.query_directions(evaluate_batch, directions, cache, 'key', batch_size=1)
+    assert values.tolist() == [20010, 40030, 20010, 20010]
+    assert evaluated == [(10, 20), (30, 40)]
+
+    # second query: all from cache
+    values = query.query_directions(evaluate_batch, directions[::-1], cache, 'key')
+    assert values.tolist() == [20010, 20010, 40030, 20010]
+    assert len(evaluated) == 2
+    cache.close()
+
+
+def test_query_quantum():
+    evaluated = []
+
+    def evaluate_batch(batch):
+        evaluated.extend(batch)
+        return [0.0] * len(batch)
+
+    query.query_directions(evaluate_batch, [(10.1, 20.2), (9.9, 19.8)], quantum=1)
+    assert evaluated == [(10, 20)]
+
+
+def test_exact_pool_reused():
+    cube = box_mesh((1, 1, 1))
+    batches = [[(0, 0), (30, 20)], [(-135, 45)], [(90, -60), (170, 89)]]
+
+    with exact.triangle_pool(cube, 2) as pool:
+        values = [list(exact.profile_areas(cube, batch, pool=pool)) for batch in batches]
+
+    for batch, areas in zip(batches, values):
+        assert areas == pytest.approx(exact.direction_areas(cube, batch), rel=1e-15)
+
+
+def test_save_results(tmp_path):
+    directions, values = [(1.5, 2.0), (3.0, -4.0)], np.array([5.0, 6.0])
+
+    query.save_results(str(tmp_path / 'out.csv'), directions, values)
+    query.save_results(str(tmp_path / 'out.npy'), directions, values)
+
+    assert (tmp_path / 'out.csv').read_text().splitlines() == ['long,lat,value', '1.5,2.0,5.0', '3.0,-4.0,6.0']
+    assert np.load(tmp_path / 'out.npy').tolist() == [5, 6]
@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+
+from XSection360 import exact, silhouette
+from XSection360.benchmark import TWO_BOXES, box_mesh, boxes_union_area, primitives, quad_grid
+from XSection360.silhouette import SilhouetteIndex, contour_area
+
+DIRECTIONS = [(0, 0), (30, 20), (-135, 45), (90, -60), (170, 89)]
+
+
+def torus_mesh(major, minor, segments=32):
+    def point(u, v):
+        around, tube = 2 * np.pi * u, 2 * np.pi * v
+        ring = major + minor * np.cos(tube)
+        return ring * np.cos(around), ring * np.sin(around), minor * np.sin(tube)
+
+    return quad_grid(point, segments, segments // 2)
+
+
+def two_objects(first, second):
+    triangles = np.concatenate([first, second])
+    return triangles, np.repeat([0, 1], [len(first), len(second)])
+
+
+@pytest.mark.parametrize('name', ['sphere', 'cube', 'cylinder', 'ellipsoid'])
+def test_primitives_match_exact(name):
+    triangles, reference, _ = primitives(24)[name]
+    index = SilhouetteIndex(triangles)
+
+    for long, lat in DIRECTIONS:
+        area = index.area(long, lat)
+        assert area == pytest.approx(exact.direction_area(triangles, long, lat), rel=1e-12)
+        assert area == pytest.approx(reference(long, lat), rel=2e-2)
+
+
+@pytest.mark.parametrize('long, lat', DIRECTIONS)
+def test_cube_analytic(long, lat):
+    reference = primitives(8)['cube'][1]
+
+    assert SilhouetteIndex(box_mesh((1, 1, 1))).area(long, lat) == pytest.approx(reference(long, lat), rel=1e-13)
+
+
+@pytest.mark.parametrize('long, lat', DIRECTIONS + [(0, 90)])
+def test_torus_matches_exact(long, lat):
+    # seen from above, the hole is a nested loop; from the side, contours cross
+    torus = torus_mesh(1, 0.3)
+
+    assert SilhouetteIndex(torus).area(long, lat) == pytest.approx(exact.direction_area(torus, long, lat), rel=1e-12)
+
+
+@pytest.mark.parametrize('long, lat', DIRECTIONS)
+def test_overlapping_boxes_analytic(long, lat):
+    triangles, owner = two_objects(*(box_mesh(*box) for box in TWO_BOXES))
+    index = SilhouetteIndex(triangles, owner)
+
+    assert index.area(long, lat) == pytest.approx(boxes_union_area(TWO_BOXES, long, lat), rel=1e-11)
+
+
+@pytest.mark.parametrize('long, lat', DIRECTIONS)
+def test_nested_and_disjoint_boxes(long, lat):
+    outer = box_mesh((2, 2, 2))
+    reference = primitives(8)['cube'][1](long, lat)
+
+    nested = SilhouetteIndex(*two_objects(outer, box_mesh((0.5, 0.5, 0.5))))
+    assert nested.area(long, lat) == pytest.approx(4 * reference, rel=1e-12)
+
+    disjoint = SilhouetteIndex(*two_objects(outer, box_mesh((1, 1, 1), (10, 10, 10))))
+    assert disjoint.area(long, lat) == pytest.approx(5 * reference, rel=1e-12)
+
+
+def test_sweep_matches_nested(monkeypatch):
+    torus = torus_mesh(1, 0.3)
+    index = SilhouetteIndex(torus)
+    nested = index.area(0, 90)
+
+    monkeypatch.setattr(silhouette, 'MAX_NESTED_LOOPS', 0)
+    assert index.area(0, 90) == pytest.approx(nested, rel=1e-12)
+
+
+def test_open_mesh_rejected():
+    with pytest.raises(Exception, match='closed manifold'):
+        SilhouetteIndex(box_mesh((1, 1, 1))[:-1])
+
+
+def test_flipped_face_rejected():
+    cube = box_mesh((1, 1, 1))
+    cube[0] = cube[0, ::-1]
+
+    with pytest.raises(Exception, match='oriented'):
+        SilhouetteIndex(cube)
+
+
+def test_contour_area():
+    square = np.array([[0, 0], [2, 0], [2, 2], [0, 2]], dtype=np.float64)
+    loop = np.array([[0, 1], [1, 2], [2, 3], [3, 0]])
+
+    assert contour_area(square, loop) == pytest.approx(4)
+    assert contour_area(np.zeros((0, 2)), np.zeros((0, 2), dtype=int)) == 0
+
+    # two squares overlapping by a quarter: crossing contours
+    points = np.concatenate([square, square + 1])
+    edges = np.concatenate([loop, loop + 4])
+    assert contour_area(points, edges) == pytest.approx(7)
+
+
+def test_profile_areas_order():
+    cube = box_mesh((1, 1, 1))
+    reference = primitives(8)['cube'][1]
+
+    areas = list(silhouette.profile_areas(cube, DIRECTIONS, processes=2, chunk_size=2))
+
+    np.testing.assert_allclose(areas, [reference(long, lat) for long, lat in DIRECTIONS], rtol=1e-13)
@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+
+from XSection360.supersample import edge_mask, edge_rects, rect_border, rect_pixels, refined_area
+
+
+def disk(size, factor=1, center=(20.3, 18.7), radius=11.2):
+    """
+    Binary render of a disk at factor x the base resolution (pixel centre sampling)
+    :return: Coverage (y, x) of size * factor pixels square
+    """
+    coords = (np.arange(size * factor) + 0.5) / factor
+    x, y = np.meshgrid(coords, coords)
+    return ((x - center[0]) ** 2 + (y - center[1]) ** 2 <= radius ** 2).astype(np.float64)
+
+
+def test_edge_mask_binary():
+    weights = np.zeros((7, 7))
+    weights[2:5, 2:5] = 1
+
+    mask = edge_mask(weights)
+
+    # the covered square and its one-pixel ring, but not the square's centre
+    expected = np.zeros((7, 7), dtype=bool)
+    expected[1:6, 1:6] = True
+    expected[3, 3] = False
+    np.testing.assert_array_equal(mask, expected)
+
+
+def test_edge_mask_partial():
+    weights = np.zeros((5, 5))
+    weights[0, 4] = 0.3
+
+    assert edge_mask(weights)[0, 4]
+    assert not edge_mask(np.ones((5, 5))).any()
+    assert not edge_mask(np.zeros((5, 5))).any()
+
+
+def test_edge_rects_merge_tile_rows():
+    weights = np.zeros((8, 16))
+    weights[1, 1:15] = 1
+
+    rects = edge_rects(weights, tile=4)
+
+    # one tile row, all four tiles adjacent: a single rectangle
+    assert rects == [(0, 16, 0, 4)]
+
+
+def test_edge_rects_separate_runs():
+    weights = np.zeros((8, 16))
+    weights[5, 1] = 1
+    weights[5, 14] = 1
+
+    assert edge_rects(weights, tile=4) == [(0, 4, 4, 8), (12, 16, 4, 8)]
+    assert edge_rects(np.ones((8, 16)), tile=4) == []
+
+
+def test_edge_rects_offset():
+    # tiles stay aligned to the frame origin, rectangles stay within the bordered render
+    weights = np.zeros((6, 6))
+    weights[2, 2] = 1
+
+    rects = edge_rects(weights, tile=4, offset=(3, 5))
+
+    assert rects == [(4, 8, 5, 8), (4, 8, 8, 11)]
+    for x0, x1, y0, y1 in rects:
+        assert 3 <= x0 < x1 <= 9 and 5 <= y0 < y1 <= 11
+
+
+def test_edge_rects_max_rects():
+    weights = np.zeros((16, 16))
+    weights[2, 2] = weights[13, 13] = 1
+
+    assert len(edge_rects(weights, tile=2)) == 4
+    assert edge_rects(weights, tile=2, max_rects=3) == [(1, 15, 1, 15)]
+
+
+def test_rect_border():
+    assert rect_border((0, 10, 0, 8), (10, 8), 4) == (0.25 / 40, 1, 0.25 / 32, 1)
+    assert rect_border((2, 4, 3, 5), (10, 8), 4) == pytest.approx((8.25 / 40, 16.25 / 40, 12.25 / 32, 20.25 / 32))
+
+
+@pytest.mark.parametrize('offset', [(0, 0), (5, 3)])
+def test_refined_area_matches_full_supersampled_render(offset):
+    factor, size = 4, 40
+    ox, oy = offset
+    base = disk(size)
+    fine = disk(size, factor)
+
+    weights = base[oy:, ox:]
+    rects = edge_rects(weights, tile=4, offset=offset)
+    values = [fine[y0 * factor:y1 * factor, x0 * factor:x1 * factor].sum() for x0, x1, y0, y1 in rects]
+
+    area = refined_area(weights, rects, values, factor, offset)
+
+    assert area == pytest.approx(fine[oy * factor:, ox * factor:].sum() / factor ** 2, abs=1e-9)
+    assert rect_pixels(rects) < weights.size
+
+
+def test_refined_area_closer_to_analytic():
+    factor = 8
+    base = disk(40)
+    rects = edge_rects(base, tile=4)
+    fine = disk(40, factor)
+    values = [fine[y0 * factor:y1 * factor, x0 * factor:x1 * factor].sum() for x0, x1, y0, y1 in rects]
+
+    exact = np.pi * 11.2 ** 2
+    refined = refined_area(base, rects, values, factor)
+
+    assert abs(refined - exact) < abs(base.sum() - exact) / 4
+
+
+def test_rect_pixels():
+    assert rect_pixels([]) == 0
+    assert rect_pixels([(0, 4, 0, 2), (10, 11, 5, 8)]) == 11
@@ -0,0 +1,33 @@
+import sys
+
+from XSection360.supervisor import JobSupervisor, FINISHED, FAILED
+
+
+def test_names_unique_after_clear():
+    supervisor = JobSupervisor()
+    first = [supervisor.next_name('Scene') for _ in range(2)]
+
+    supervisor.clear()
+
+    assert first == ['Scene #1', 'Scene #2']
+    assert supervisor.next_name('Scene') == 'Scene #3'
+
+
+def test_run_and_clear():
+    supervisor = JobSupervisor(max_jobs=1)
+
+    # --cancel-file is appended to the command
+    ok = supervisor.submit(supervisor.next_name('a'), [sys.executable, '-c', 'import sys; sys.exit(0)'])
+    bad = supervisor.submit(supervisor.next_name('b'), [sys.executable, '-c', 'import sys; sys.exit(1)'])
+    assert len(supervisor.running()) == 1
+
+    # second job starts once the first has ended
+    ok.process.wait()
+    supervisor.update()
+    bad.process.wait()
+    supervisor.update()
+
+    assert (ok.state, bad.state) == (FINISHED, FAILED)
+
+    supervisor.clear()
+    assert supervisor.jobs == []
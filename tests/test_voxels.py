@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from XSection360 import voxels
+from XSection360.projection import camera_basis
+
+
+def test_load_occupancy(tmp_path):
+    density = np.zeros((4, 3, 2))
+    density[1, 2, 0] = 0.9
+    density[0, 0, 1] = 0.2
+
+    np.save(tmp_path / 'grid.npy', density)
+    np.savez(tmp_path / 'grid.npz', occupancy=density)
+
+    for name in ('grid.npy', 'grid.npz'):
+        occupancy = voxels.load_occupancy(str(tmp_path / name))
+        assert occupancy.dtype == bool
+        assert np.argwhere(occupancy).tolist() == [[1, 2, 0]]
+
+    assert voxels.load_occupancy(str(tmp_path / 'grid.npy'), threshold=0.1).sum() == 2
+
+    np.save(tmp_path / 'flat.npy', np.zeros((4, 4)))
+    with pytest.raises(Exception, match='3D'):
+        voxels.load_occupancy(str(tmp_path / 'flat.npy'))
+
+
+def test_voxel_centres():
+    occupancy = np.ones((2, 1, 1), dtype=bool)
+
+    assert voxels.voxel_centres(occupancy, 0.5).tolist() == [[-0.25, 0, 0], [0.25, 0, 0]]
+    assert voxels.voxel_centres(occupancy, 1, origin=(1, 2, 3)).tolist() == [[1, 2, 3], [2, 2, 3]]
+    assert len(voxels.sample_offsets(1, 3)) == 27
+
+
+def test_box_axis_views():
+    # 1.0 x 0.6 x 0.4 box
+    occupancy = np.ones((10, 6, 4), dtype=bool)
+    directions = [(0, 0), (90, 0), (0, 90)]
+
+    areas = list(voxels.profile_areas(occupancy, directions, 0.1, processes=1))
+    assert areas == pytest.approx([0.4, 0.24, 0.6], rel=1e-12)
+
+
+def test_box_oblique():
+    occupancy = np.ones((10, 6, 4), dtype=bool)
+    directions = [(30, 20), (-120, -45)]
+
+    areas = list(voxels.profile_areas(occupancy, directions, 0.1, processes=1))
+    for (long, lat), area in zip(directions, areas):
+        view = np.abs(camera_basis(long, lat)[2])
+        assert area == pytest.approx(np.dot(view, [0.24, 0.4, 0.6]), rel=0.05)
+
+
+def test_sphere():
+    size, count = 0.05, 40
+    axis = (np.arange(count) - (count - 1) / 2) * size
+    x, y, z = np.meshgrid(axis, axis, axis, indexing='ij')
+    occupancy = x ** 2 + y ** 2 + z ** 2 <= 1
+
+    # voxels with centres in the unit sphere reach up to a voxel beyond it
+    areas = list(voxels.profile_areas(occupancy, [(0, 0), (30, 20), (77, -50)], size, processes=2))
+    assert all(np.pi < area < np.pi * (1 + size) ** 2 for area in areas)
+
+
+def test_empty():
+    assert list(voxels.profile_areas(np.zeros((3, 3, 3), dtype=bool), [(0, 0), (10, 10)])) == [0.0, 0.0]
+
+
+def test_chunking_matches():
+    occupancy = np.random.default_rng(0).uniform(size=(8, 8, 8)) > 0.7
+    centres = voxels.voxel_centres(occupancy, 0.1)
+    offsets = voxels.sample_offsets(0.1, 2)
+
+    full = voxels.direction_areas(centres, offsets, [(10, 20)], 0.05, 1.0)
+    chunked = voxels.direction_areas(centres, offsets, [(10, 20)], 0.05, 1.0, chunk_size=7)
+    assert full == chunked